@@ -1,33 +1,72 @@
 # app.py
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 
-from config import UPLOAD_FOLDER
-from db import init_db
+from config import UPLOAD_FOLDER, MAX_CONTENT_LENGTH, METRICS_ENABLED
+from db import init_db, release_connection
+from commands import register_commands
+from utils.http_cache import register_http_cache
+from utils.metrics import register_metrics
+from utils.serializer import AppJSONProvider
+from utils.upload_gc import start_gc_scheduler
+from utils.upload_store import UploadRequest
 from routes.trades import trades_bp
 from routes.playbook import playbook_bp
 from routes.stats import stats_bp  
 from routes.reviews import reviews_bp 
+from routes.search import search_bp
+from routes.instruments import instruments_bp
 
 def create_app():
     app = Flask(__name__)
+    # Giới hạn UPLOAD_MAX_FILE_BYTES / file ngay khi parse multipart
+    app.request_class = UploadRequest
+    # jsonify qua orjson nếu có (JSON_BACKEND), body giống hệt json stdlib khi không có
+    app.json = AppJSONProvider(app)
 
     # CORS: áp dụng cho toàn bộ /api/*
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": "*"}},
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "Link", "ETag"],
+    )
     # Nếu bạn muốn chặt chẽ hơn:
     # CORS(app, resources={r"/api/*": {"origins": ["http://localhost:3000"]}})
 
     app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+    # Request lớn hơn bị từ chối (413) trước khi body được đọc / buffer
+    app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+
+    @app.errorhandler(413)
+    def too_large(e):
+        return jsonify({"error": e.description or "Upload too large"}), 413
 
     # Init DB (tạo file + bảng nếu chưa có)
     init_db()
 
+    # Kết thúc app context: rollback transaction dở, giữ connection SQLite cho request sau
+    app.teardown_appcontext(release_connection)
+
+    # Latency / SQL / serialize theo endpoint tại /api/_metrics (đăng ký trước ETag)
+    if METRICS_ENABLED:
+        register_metrics(app)
+
+    # ETag / 304 cho GET /api/trades, /api/stats, /api/playbook, /api/reviews, /api/search, /api/instruments
+    register_http_cache(app)
+
     # Register blueprints
     app.register_blueprint(trades_bp)
     app.register_blueprint(playbook_bp)
     app.register_blueprint(stats_bp)
     app.register_blueprint(reviews_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(instruments_bp)
+
+    # CLI: flask --app app <command>
+    register_commands(app)
 
+    # Dọn file upload mồ côi định kỳ (UPLOAD_GC_INTERVAL_SECONDS, mặc định tắt)
+    start_gc_scheduler()
 
     return app
 
@@ -0,0 +1,28 @@
+# asgi.py
+"""
+Chạy API dưới ASGI server (cùng routes / JSON contract như app.py):
+
+  uvicorn --factory asgi:create_asgi_app --port 5000
+  hypercorn "asgi:create_asgi_app()" --bind 127.0.0.1:5000
+
+Kết nối và body upload được xử lý bất đồng bộ trên event loop; Flask
+(SQLite, stats) chạy trong thread pool ASGI_WORKER_THREADS (utils/asgi.py).
+"""
+from app import create_app
+from config import (
+    ASGI_WORKER_THREADS,
+    ASGI_BODY_SPOOL_BYTES,
+    ASGI_FILE_CHUNK_BYTES,
+    MAX_CONTENT_LENGTH,
+)
+from utils.asgi import ASGIBridge
+
+
+def create_asgi_app():
+    return ASGIBridge(
+        create_app(),
+        max_workers=ASGI_WORKER_THREADS,
+        max_body_bytes=MAX_CONTENT_LENGTH,
+        spool_bytes=ASGI_BODY_SPOOL_BYTES,
+        file_chunk_bytes=ASGI_FILE_CHUNK_BYTES,
+    )
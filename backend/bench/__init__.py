@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""Benchmark + dữ liệu synthetic (xem bench/__main__.py). Không phải test: chạy tay / trong CI."""
@@ -0,0 +1,181 @@
+# bench/__main__.py
+"""
+Benchmark stats / endpoint trên dữ liệu giả lập (chạy trong thư mục backend/):
+
+  python -m bench generate --rows 100000            # tạo DB synthetic (bench/data/)
+  python -m bench run --rows 10000 --rows 100000    # đo + so với baseline, fail nếu hồi quy
+  python -m bench run --rows 10000 --save-baseline  # ghi kết quả làm baseline mới
+  python -m bench run --rows 1000000 --only stats   # chỉ các case có chứa "stats"
+
+Mỗi kích thước dataset chạy trong 1 process riêng (TRADE_DB_PATH trỏ vào DB
+synthetic tương ứng, peak memory không lẫn giữa các lần đo). DB synthetic được
+tạo 1 lần theo (rows, seed) rồi dùng lại.
+"""
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import click
+
+from bench.baseline import (
+    DEFAULT_BASELINE_PATH,
+    MEMORY_THRESHOLD,
+    TIME_THRESHOLD,
+    compare,
+    load_baseline,
+    save_baseline,
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(BENCH_DIR, "data")
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000)
+
+
+def _db_path(data_dir, rows, seed):
+    return os.path.join(data_dir, f"trades_{rows}_{seed}.db")
+
+
+def _run_child(args, db_path):
+    """Chạy `python -m bench <args>` với TRADE_DB_PATH = db_path, trả về stdout."""
+    env = dict(os.environ, TRADE_DB_PATH=db_path)
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench", *args],
+        cwd=os.path.dirname(BENCH_DIR),
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise click.ClickException(f"bench {args[0]} failed (exit {proc.returncode})")
+    return proc.stdout
+
+
+@click.group()
+def cli():
+    """Benchmark compute_* và endpoint trên DB synthetic."""
+
+
+@cli.command()
+@click.option("--rows", type=int, required=True)
+@click.option("--seed", type=int, default=None, help="Mặc định: BENCH_SEED.")
+@click.option("--data-dir", default=DEFAULT_DATA_DIR, show_default=True)
+@click.option("--force", is_flag=True, help="Tạo lại kể cả khi DB đã có.")
+def generate(rows, seed, data_dir, force):
+    """Tạo DB synthetic với ROWS lệnh."""
+    from bench.synthetic import BENCH_SEED
+
+    seed = BENCH_SEED if seed is None else seed
+    os.makedirs(data_dir, exist_ok=True)
+    path = _db_path(data_dir, rows, seed)
+    if os.path.exists(path):
+        if not force:
+            click.echo(f"{path} already exists")
+            return
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    _run_child(["fill", "--rows", str(rows), "--seed", str(seed)], path)
+    click.echo(f"Generated {rows} trades -> {path}")
+
+
+@cli.command(hidden=True)
+@click.option("--rows", type=int, required=True)
+@click.option("--seed", type=int, required=True)
+def fill(rows, seed):
+    """(process con) Ghi dữ liệu synthetic vào TRADE_DB_PATH."""
+    from db import get_connection, init_db, close_connection
+    from bench.synthetic import fill_database
+
+    init_db()
+    try:
+        written = fill_database(get_connection(), rows, seed)
+    finally:
+        close_connection()
+    click.echo(written, err=True)
+
+
+@cli.command(hidden=True)
+@click.option("--repeat", type=int, required=True)
+@click.option("--only", default=None)
+def measure(repeat, only):
+    """(process con) Đo trên TRADE_DB_PATH, in kết quả JSON ra stdout."""
+    from app import create_app
+    from bench.suite import run_suite
+    from config import STATS_ENGINE
+
+    def progress(name, result):
+        click.echo(
+            f"  {name:<62} {result['seconds'] * 1000:>10.1f} ms "
+            f"{result['peak_kib']:>12.1f} KiB {result['queries']:>5} q",
+            err=True,
+        )
+
+    # init_db in "Applied migration ..." ra stdout khi DB cũ được nâng cấp -> chuyển sang stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app()
+    results = run_suite(app, repeat=repeat, only=only, progress=progress)
+    click.echo(json.dumps({
+        "engine": STATS_ENGINE,
+        "python": platform.python_version(),
+        "results": results,
+    }))
+
+
+@cli.command()
+@click.option("--rows", type=int, multiple=True, help="Kích thước dataset (lặp lại được). Mặc định: 10k, 100k, 1M.")
+@click.option("--seed", type=int, default=None)
+@click.option("--repeat", type=int, default=3, show_default=True)
+@click.option("--only", default=None, help="Chỉ chạy case có tên chứa chuỗi này.")
+@click.option("--data-dir", default=DEFAULT_DATA_DIR, show_default=True)
+@click.option("--baseline", "baseline_path", default=DEFAULT_BASELINE_PATH, show_default=True)
+@click.option("--save-baseline", "save", is_flag=True, help="Ghi kết quả làm baseline (không fail).")
+@click.option("--time-threshold", type=float, default=TIME_THRESHOLD, show_default=True)
+@click.option("--memory-threshold", type=float, default=MEMORY_THRESHOLD, show_default=True)
+@click.pass_context
+def run(ctx, rows, seed, repeat, only, data_dir, baseline_path, save,
+        time_threshold, memory_threshold):
+    """Đo và so với baseline; exit code 1 nếu có hồi quy vượt ngưỡng."""
+    from bench.synthetic import BENCH_SEED
+
+    seed = BENCH_SEED if seed is None else seed
+    baseline = load_baseline(baseline_path)
+    failed = []
+
+    for n in rows or DEFAULT_ROWS:
+        path = _db_path(data_dir, n, seed)
+        if not os.path.exists(path):
+            ctx.invoke(generate, rows=n, seed=seed, data_dir=data_dir)
+
+        click.echo(f"== {n} rows ==")
+        current = json.loads(_run_child(["measure", "--repeat", str(repeat)] + (["--only", only] if only else []), path))
+
+        previous = baseline.get("runs", {}).get(str(n))
+        if save:
+            if only and previous:
+                # Chạy một phần: chỉ cập nhật các case đã đo
+                current["results"] = {**previous["results"], **current["results"]}
+            save_baseline(baseline_path, baseline, n, current)
+            click.echo(f"Baseline saved: {baseline_path} ({n} rows)")
+            continue
+        if previous is None:
+            click.echo("No baseline for this size (use --save-baseline)")
+            continue
+
+        regressions = compare(current["results"], previous["results"], time_threshold, memory_threshold)
+        for reg in regressions:
+            change = "" if reg["change"] is None else f" ({reg['change']:+.0%})"
+            click.echo(f"  REGRESSION {reg['case']} {reg['metric']}: {reg['baseline']} -> {reg['current']}{change}")
+        if regressions:
+            failed.append(n)
+        else:
+            click.echo("  no regressions")
+
+    if failed:
+        raise click.ClickException(f"Performance regressions at {', '.join(map(str, failed))} rows")
+
+
+if __name__ == "__main__":
+    cli(prog_name="python -m bench")
@@ -0,0 +1,87 @@
+# bench/baseline.py
+"""
+Lưu / so sánh kết quả benchmark với baseline (file JSON).
+
+Format:
+  {
+    "version": 1,
+    "runs": {
+      "10000": { "engine": "auto", "python": "3.12.1",
+                 "results": { "GET /api/stats/overview": {seconds, peak_kib, queries, ...}, ... } },
+      ...
+    }
+  }
+Hồi quy (regression):
+  - seconds  > baseline * (1 + time_threshold) và chậm hơn ít nhất MIN_SECONDS_DELTA
+  - peak_kib > baseline * (1 + memory_threshold) và tăng ít nhất MIN_KIB_DELTA
+  - queries  > baseline (số query không được tăng)
+Ngưỡng tuyệt đối để case rất nhanh (vài ms) không báo sai vì nhiễu.
+"""
+import json
+import os
+
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.25
+MIN_SECONDS_DELTA = 0.005
+MIN_KIB_DELTA = 256.0
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"version": 1, "runs": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, baseline: dict, rows: int, run: dict):
+    """Ghi (đè) kết quả của 1 kích thước dataset, giữ nguyên các kích thước khác."""
+    baseline.setdefault("runs", {})[str(rows)] = run
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def compare(
+    current: dict,
+    previous: dict,
+    time_threshold: float = TIME_THRESHOLD,
+    memory_threshold: float = MEMORY_THRESHOLD,
+) -> list:
+    """
+    current / previous: {tên case: kết quả}. Trả về list hồi quy:
+      [{"case", "metric", "baseline", "current", "change"}, ...]
+    Case không có trong baseline được bỏ qua (case mới).
+    """
+    regressions = []
+
+    def add(case, metric, old, new):
+        change = (new - old) / old if old else None
+        regressions.append({
+            "case": case,
+            "metric": metric,
+            "baseline": old,
+            "current": new,
+            "change": None if change is None else round(change, 3),
+        })
+
+    for case, result in current.items():
+        old = previous.get(case)
+        if old is None:
+            continue
+        if (
+            result["seconds"] > old["seconds"] * (1 + time_threshold)
+            and result["seconds"] - old["seconds"] >= MIN_SECONDS_DELTA
+        ):
+            add(case, "seconds", old["seconds"], result["seconds"])
+        if (
+            result["peak_kib"] > old["peak_kib"] * (1 + memory_threshold)
+            and result["peak_kib"] - old["peak_kib"] >= MIN_KIB_DELTA
+        ):
+            add(case, "peak_kib", old["peak_kib"], result["peak_kib"])
+        if result["queries"] > old["queries"]:
+            add(case, "queries", old["queries"], result["queries"])
+    return regressions
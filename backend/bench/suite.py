@@ -0,0 +1,182 @@
+# bench/suite.py
+"""
+Đo mọi hàm compute_* (utils/trade_stats, utils/columnar_stats, utils/rollup_stats)
+và mọi endpoint GET chính qua Flask test client trên DB hiện tại (TRADE_DB_PATH).
+
+Mỗi case cho:
+  - seconds / median_seconds: min / median của REPEAT lần chạy (sau 1 lần warm-up)
+  - peak_kib: peak memory Python (tracemalloc) của 1 lần chạy riêng
+  - queries: số câu SQL đã chạy (không tính PRAGMA khi mở connection và câu
+    lồng trong trigger / FTS5)
+Stats cache được xóa trước mỗi request -> đo đúng đường tính toán, không đo cache hit.
+"""
+import inspect
+import statistics
+import time
+import tracemalloc
+from datetime import date
+from functools import partial
+
+import db
+from utils import trade_stats, columnar_stats, rollup_stats
+from utils.stats_cache import stats_cache
+
+REPEAT = 3
+
+# Tham số cho các hàm compute_* cần thêm ngoài trades
+COMPUTE_ARGS = {
+    "compute_grouped_stats": {"group_key": "setup"},
+    "compute_pivot_stats": {"dims": ("setup", "session", "direction")},
+    "compute_rolling_stats": {"window": 50, "group_key": "setup"},
+    "compute_grouped_from_rollups": {"group_key": "setup"},
+    # 12 tháng cuối của dataset synthetic (kết thúc năm 2023)
+    "compute_period_reviews": {
+        "windows": trade_stats.period_windows("month", 12, date(2023, 12, 31)),
+    },
+}
+# Tính trên 1 lệnh -> đã nằm trong các hàm còn lại
+COMPUTE_SKIP = {"compute_r_multiple"}
+
+ENDPOINTS = (
+    "/api/trades",
+    "/api/trades?limit=100",
+    "/api/trades?limit=100&symbol=EURUSD&count=1",
+    "/api/trades?limit=1000&fields=id,date,symbol,setup,profit",
+    "/api/trades/export?format=csv",
+    "/api/trades/export?format=ndjson&gzip=1",
+    "/api/stats/overview",
+    "/api/stats/overview?from=1900-01-01",
+    "/api/stats/equity-curve",
+    "/api/stats/by-setup",
+    "/api/stats/by-session",
+    "/api/stats/by-timeframe",
+    "/api/stats/by-grade",
+    "/api/stats/monthly-pnl",
+    "/api/stats/mistakes",
+    "/api/stats/review",
+    "/api/stats/review?from=2023-01-01&to=2023-12-31",
+    "/api/stats/dashboard",
+    "/api/stats/periods?bucket=month&count=12&to=2023-12-31",
+    "/api/stats/pivot?dims=setup,session,direction",
+    "/api/stats/rolling?window=50&group_by=setup",
+    "/api/stats/monte-carlo?paths=1000",
+    "/api/playbook/setups",
+    "/api/reviews?period_type=month&period_key=2023-06",
+    "/api/search?q=stop loss",
+    "/api/search?q=retest&symbol=EURUSD&from=2023-01-01",
+)
+# Endpoint cần NumPy (trả 501 nếu chưa cài)
+NUMPY_ENDPOINTS = ("/api/stats/monte-carlo",)
+
+
+class QueryCounter:
+    """
+    Trace callback của sqlite3: đếm câu SQL mà code chạy. Bỏ PRAGMA lúc mở
+    connection và câu lồng trong trigger / FTS5 (SQLite trace chúng dạng "-- ...").
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement):
+        head = statement.lstrip()
+        if not head.startswith("--") and head[:6].upper() != "PRAGMA":
+            self.count += 1
+
+
+def install_query_counter() -> QueryCounter:
+    """Gắn counter vào mọi connection được mở từ giờ (db.get_connection)."""
+    counter = QueryCounter()
+    open_connection = db._open_connection
+
+    def open_counted():
+        conn = open_connection()
+        conn.set_trace_callback(counter)
+        return conn
+
+    db.close_connection()
+    db._open_connection = open_counted
+    return counter
+
+
+def measure(fn, counter: QueryCounter, repeat: int = REPEAT) -> dict:
+    fn()  # warm-up: statement cache, import lười...
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    before = counter.count
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": round(min(times), 6),
+        "median_seconds": round(statistics.median(times), 6),
+        "peak_kib": round(peak / 1024, 1),
+        "queries": counter.count - before,
+    }
+
+
+def _with_connection(fn, *args, **kwargs):
+    return fn(db.get_connection(), *args, **kwargs)
+
+
+def iter_compute_cases():
+    """(tên case, hàm không tham số) cho mọi compute_* của các engine."""
+    from routes.stats import _fetch_trades_with_filters
+
+    engines = [(trade_stats, _fetch_trades_with_filters({}))]
+    if columnar_stats.NUMPY_AVAILABLE:
+        engines.append((columnar_stats, columnar_stats.load_trade_columns(db.get_connection())))
+    engines.append((rollup_stats, None))
+
+    for module, data in engines:
+        short = module.__name__.rsplit(".", 1)[-1]
+        for name, fn in inspect.getmembers(module, inspect.isfunction):
+            if not name.startswith("compute_") or fn.__module__ != module.__name__:
+                continue
+            if name in COMPUTE_SKIP:
+                continue
+            kwargs = COMPUTE_ARGS.get(name, {})
+            if module is rollup_stats:
+                yield f"{short}.{name}", partial(_with_connection, fn, {}, **kwargs)
+            elif name == "compute_max_drawdown_from_curve":
+                yield f"{short}.{name}", partial(fn, module.compute_equity_curve(data))
+            else:
+                yield f"{short}.{name}", partial(fn, data, **kwargs)
+
+
+def _request(client, url):
+    stats_cache.clear()
+    response = client.get(url)
+    body = response.get_data()  # đọc hết (cả response dạng stream)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} -> {response.status_code}: {body[:200]!r}")
+    return len(body)
+
+
+def run_suite(app, repeat: int = REPEAT, only=None, progress=None) -> dict:
+    """Chạy toàn bộ case, trả về {tên case: kết quả measure}."""
+    counter = install_query_counter()
+    cases = list(iter_compute_cases())
+    # Không bọc app_context: mỗi request tự mở / đóng connection như khi chạy thật
+    client = app.test_client()
+    for url in ENDPOINTS:
+        if not columnar_stats.NUMPY_AVAILABLE and url.startswith(NUMPY_ENDPOINTS):
+            continue
+        cases.append((f"GET {url}", partial(_request, client, url)))
+
+    results = {}
+    for name, fn in cases:
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, counter, repeat)
+        if progress:
+            progress(name, results[name])
+    return results
@@ -0,0 +1,205 @@
+# bench/synthetic.py
+"""
+Sinh nhật ký giao dịch giả lập (đúng schema thật) cho benchmark.
+
+- Phân phối gần với journal thực tế: symbol / setup / session / timeframe có
+  trọng số, mỗi setup có winrate và RR riêng, vốn compounding theo lệnh
+  (risk 1%) nhưng bị giới hạn như tài khoản thật: lãi tới CAPITAL_WITHDRAW_AT
+  thì rút về START_CAPITAL, lỗ tới CAPITAL_REFILL_AT thì nạp lại -> profit
+  luôn cỡ journal thật ở mọi kích thước. Một phần lệnh hòa vốn / đóng sớm,
+  vài lệnh cuối còn mở.
+- Cùng (rows, seed) -> cùng dữ liệu: baseline so sánh được giữa các lần chạy.
+- Ghi qua executemany theo chunk trong transaction; trigger (rollups, refcount,
+  revision) chạy như khi thêm lệnh thật.
+"""
+import json
+import random
+from datetime import date, timedelta
+
+from models.trades import TRADE_COLUMNS
+
+BENCH_SEED = 20240101
+INSERT_CHUNK_SIZE = 10000
+
+SYMBOLS = {
+    # symbol: (trọng số, giá tham chiếu, khoảng SL điển hình)
+    "EURUSD": (30, 1.09, 0.0015),
+    "GBPUSD": (20, 1.27, 0.0020),
+    "XAUUSD": (20, 2000.0, 4.0),
+    "USDJPY": (10, 150.0, 0.25),
+    "NAS100": (10, 17000.0, 40.0),
+    "BTCUSD": (10, 45000.0, 400.0),
+}
+SETUPS = {
+    # setup: (trọng số, winrate, RR trung bình khi thắng)
+    "OB": (25, 0.42, 2.4),
+    "FVG": (20, 0.45, 2.0),
+    "BOS": (15, 0.50, 1.6),
+    "CHoCH": (15, 0.38, 3.0),
+    "Liquidity Sweep": (15, 0.40, 2.8),
+    "Breaker": (10, 0.47, 1.8),
+}
+SESSIONS = {"Asia": 15, "London": 40, "NY": 35, "": 10}
+TIMEFRAMES = {"M5": 15, "M15": 35, "H1": 35, "H4": 15}
+GRADES = {1: 5, 2: 15, 3: 35, 4: 30, 5: 15}
+MISTAKES = ("FOMO", "Moved SL", "Early exit", "Overtrade", "No confirmation", "Revenge")
+PSYCHOLOGICAL_TAGS = ("calm", "confident", "fearful", "greedy", "impatient", "tired")
+# Text cho note / lessons (full-text search): ghép ngẫu nhiên vài cụm
+NOTE_PHRASES = (
+    "vào lệnh sớm", "chờ retest", "news đỏ", "stop loss bị quét", "đóng lệnh sớm",
+    "sweep liquidity phiên Á", "order block H4", "FVG chưa lấp", "không có xác nhận",
+    "dời SL", "trend rõ", "sideway", "phá đỉnh", "kiên nhẫn", "quá tay",
+)
+LESSON_PHRASES = (
+    "đợi nến đóng", "giảm size sau chuỗi thua", "không trade khi có news",
+    "giữ SL cố định", "chốt một phần ở 1R", "chỉ vào lệnh theo HTF bias",
+)
+
+START_CAPITAL = 10000.0
+RISK_PERCENT = 0.01
+# Vốn vượt / tụt qua ngưỡng -> đưa về START_CAPITAL (rút lãi / nạp thêm)
+CAPITAL_WITHDRAW_AT = START_CAPITAL * 2
+CAPITAL_REFILL_AT = START_CAPITAL / 2
+BREAKEVEN_RATE = 0.08
+OPEN_TRADES = 0.005  # tỉ lệ lệnh cuối còn mở (profit NULL)
+TRADES_PER_DAY = 20  # mật độ lệnh / ngày giao dịch (journal trải dài nhiều năm)
+MAX_YEARS = 20       # dataset rất lớn (backtest) -> dày hơn thay vì dài hơn
+
+
+def _weighted(rnd, table):
+    keys = list(table)
+    weights = [v[0] if isinstance(v, tuple) else v for v in table.values()]
+    return lambda: rnd.choices(keys, weights)[0]
+
+
+def _tags(rnd, labels, rate):
+    if rnd.random() >= rate:
+        return "[]"
+    return json.dumps(rnd.sample(labels, rnd.randint(1, 2)))
+
+
+def iter_synthetic_trades(rows: int, seed: int = BENCH_SEED):
+    """Tuple theo TRADE_COLUMNS (bỏ id), theo thứ tự thời gian."""
+    rnd = random.Random(seed)
+    text_rnd = random.Random(seed + 1)  # riêng cho text -> số liệu không đổi theo text
+    pick_symbol = _weighted(rnd, SYMBOLS)
+    pick_setup = _weighted(rnd, SETUPS)
+    pick_session = _weighted(rnd, SESSIONS)
+    pick_timeframe = _weighted(rnd, TIMEFRAMES)
+    pick_grade = _weighted(rnd, GRADES)
+
+    days = min(max(365, rows // TRADES_PER_DAY * 7 // 5), MAX_YEARS * 365)  # chỉ giao dịch ngày thường
+    start = date(2024, 1, 1) - timedelta(days=days)
+    day_offsets = sorted(rnd.randrange(days) for _ in range(rows))
+    open_from = rows - int(rows * OPEN_TRADES)
+    capital = START_CAPITAL
+
+    for i, offset in enumerate(day_offsets):
+        day = start + timedelta(days=offset)
+        if day.weekday() >= 5:
+            day -= timedelta(days=day.weekday() - 4)
+
+        symbol = pick_symbol()
+        setup = pick_setup()
+        _, price, sl_dist = SYMBOLS[symbol]
+        _, winrate, avg_rr = SETUPS[setup]
+        direction = "long" if rnd.random() < 0.5 else "short"
+        sign = 1 if direction == "long" else -1
+
+        entry = price * rnd.uniform(0.9, 1.1)
+        sl_dist *= rnd.uniform(0.5, 1.5)
+        rr = round(max(1.0, rnd.gauss(avg_rr, 0.5)), 2)
+        sl = entry - sign * sl_dist
+        tp = entry + sign * sl_dist * rr
+
+        # Kết quả theo R: thắng (chạm TP hoặc chốt sớm), thua -1R (đôi khi cắt sớm), hòa
+        u = rnd.random()
+        if u < BREAKEVEN_RATE:
+            r = 0.0
+        elif u < BREAKEVEN_RATE + winrate * (1 - BREAKEVEN_RATE):
+            r = rr if rnd.random() < 0.7 else round(rnd.uniform(0.3, rr), 2)
+        else:
+            r = -1.0 if rnd.random() < 0.85 else -round(rnd.uniform(0.3, 1.0), 2)
+
+        if i >= open_from:
+            exit_price = profit = profit_pct = None
+        else:
+            exit_price = entry + sign * sl_dist * r
+            profit = round(r * capital * RISK_PERCENT, 2)
+            profit_pct = round(profit / capital * 100, 4)
+
+        row = {
+            "date": day.isoformat(),
+            "symbol": symbol,
+            "setup": setup,
+            "direction": direction,
+            "entry": round(entry, 5),
+            "sl": round(sl, 5),
+            "tp": round(tp, 5),
+            "exit": None if exit_price is None else round(exit_price, 5),
+            "capital": round(capital, 2),
+            "rr": rr,
+            "profit": profit,
+            "profit_pct": profit_pct,
+            "note": ", ".join(text_rnd.sample(NOTE_PHRASES, text_rnd.randint(0, 3))),
+            "lessons": ", ".join(text_rnd.sample(LESSON_PHRASES, text_rnd.randint(0, 2))),
+            "session": pick_session(),
+            "timeframe": pick_timeframe(),
+            "confluence": "[]",
+            "grade": pick_grade(),
+            "mistakes": _tags(rnd, MISTAKES, 0.3),
+            "psychological_tags": _tags(rnd, PSYCHOLOGICAL_TAGS, 0.5),
+        }
+        if profit is not None:
+            capital += profit
+            if not CAPITAL_REFILL_AT < capital < CAPITAL_WITHDRAW_AT:
+                capital = START_CAPITAL
+        yield tuple(row.get(c) for c in TRADE_COLUMNS[1:])
+
+
+def fill_database(conn, rows: int, seed: int = BENCH_SEED, chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+    """Ghi rows lệnh giả lập vào bảng trades (DB đã migrate), trả về số lệnh đã ghi."""
+    columns = TRADE_COLUMNS[1:]
+    sql = (
+        f"INSERT INTO trades ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    cur = conn.cursor()
+    written = 0
+    chunk = []
+    for row in iter_synthetic_trades(rows, seed):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            written += _insert_chunk(conn, cur, sql, chunk)
+            chunk = []
+    if chunk:
+        written += _insert_chunk(conn, cur, sql, chunk)
+
+    cur.executemany(
+        "INSERT INTO setups(name, version, instruments, timeframes) VALUES (?, '1', ?, ?)",
+        [(name, ",".join(SYMBOLS), ",".join(TIMEFRAMES)) for name in SETUPS],
+    )
+    # Review tháng cho năm cuối của journal
+    cur.executemany(
+        "INSERT OR IGNORE INTO reviews(period_type, period_key, from_date, to_date, "
+        "good_points, improvement_points, created_at, updated_at) "
+        "VALUES ('month', ?, ?, ?, 'Followed plan', 'Fewer impulsive entries', ?, ?)",
+        [
+            (f"2023-{m:02d}", f"2023-{m:02d}-01", f"2023-{m:02d}-28", "2024-01-01", "2024-01-01")
+            for m in range(1, 13)
+        ],
+    )
+    conn.commit()
+    cur.execute("ANALYZE")
+    return written
+
+
+def _insert_chunk(conn, cur, sql, chunk):
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.executemany(sql, chunk)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(chunk)
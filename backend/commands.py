@@ -0,0 +1,206 @@
+# commands.py
+"""
+CLI quản trị, chạy qua Flask CLI:
+  flask --app app db-migrate
+  flask --app app db-check-plans [--live]
+  flask --app app rollups-rebuild [--check-only]
+  flask --app app trades-import FILE [--format auto|csv|mt4|mt5] [--capital N]
+  flask --app app trades-reprice [--resume] [--include-imported] [--chunk-size N]
+  flask --app app images-backfill [--force]
+  flask --app app uploads-migrate
+  flask --app app uploads-gc [--dry-run] [--grace-seconds N]
+"""
+import click
+
+from db import get_connection, close_connection
+from migrations import run_migrations, get_schema_version, check_query_plans, QueryPlanError
+from config import IMPORT_CHUNK_SIZE, REPRICE_CHUNK_SIZE, UPLOAD_GC_GRACE_SECONDS, UPLOAD_GC_BATCH_SIZE
+from utils.rollup_stats import verify_rollups, rebuild_rollups
+from utils.files import allowed_file
+from utils.images import PIL_AVAILABLE, generate_derivatives, is_derivative
+from utils.repricer import reprice_trades
+from utils.trade_import import import_trades, IMPORT_FORMATS
+from utils.upload_gc import sweep_orphan_uploads
+from utils.upload_migrate import migrate_flat_uploads
+from utils.upload_store import iter_upload_names
+
+
+def register_commands(app):
+    app.cli.add_command(db_migrate)
+    app.cli.add_command(db_check_plans)
+    app.cli.add_command(rollups_rebuild)
+    app.cli.add_command(trades_import)
+    app.cli.add_command(trades_reprice)
+    app.cli.add_command(images_backfill)
+    app.cli.add_command(uploads_migrate)
+    app.cli.add_command(uploads_gc)
+
+
+@click.command("db-migrate")
+def db_migrate():
+    """Nâng cấp schema DB lên version mới nhất."""
+    conn = get_connection()
+    try:
+        applied = run_migrations(conn)
+        for version, name in applied:
+            click.echo(f"Applied migration {version}: {name}")
+        click.echo(f"Schema version: {get_schema_version(conn)}")
+    finally:
+        close_connection()
+
+
+@click.command("db-check-plans")
+@click.option("--live", is_flag=True, help="Kiểm tra trên DB thật (dùng thống kê ANALYZE hiện có).")
+def db_check_plans(live):
+    """Fail nếu query của endpoint nào quét cả bảng hoặc sort tạm."""
+    try:
+        if live:
+            try:
+                check_query_plans(get_connection())
+            finally:
+                close_connection()
+        else:
+            check_query_plans()
+        click.echo("Query plans OK")
+    except QueryPlanError as e:
+        raise click.ClickException(str(e))
+
+
+@click.command("rollups-rebuild")
+@click.option("--check-only", is_flag=True, help="Chỉ đối chiếu, không dựng lại.")
+def rollups_rebuild(check_only):
+    """Đối chiếu trade_rollups với full recompute, rồi dựng lại từ trades."""
+    conn = get_connection()
+    try:
+        problems = verify_rollups(conn)
+        for line in problems[:50]:
+            click.echo(f"  drift: {line}")
+        click.echo(f"Rollup drift: {len(problems)} mismatch(es)")
+
+        if check_only:
+            if problems:
+                raise click.ClickException("Rollups out of sync")
+            return
+
+        rebuild_rollups(conn)
+        remaining = verify_rollups(conn)
+        if remaining:
+            raise click.ClickException(f"Rollups still out of sync after rebuild: {len(remaining)}")
+        click.echo("Rollups rebuilt and verified")
+    finally:
+        close_connection()
+
+
+@click.command("trades-import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), default="auto", show_default=True)
+@click.option("--capital", type=float, default=0.0, help="Vốn mặc định khi file không có cột capital.")
+@click.option("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, show_default=True)
+def trades_import(path, fmt, capital, chunk_size):
+    """Import hàng loạt trades từ file CSV / statement MT4 / MT5."""
+    conn = get_connection()
+    try:
+        with open(path, "rb") as f:
+            report = import_trades(conn, f, fmt=fmt, default_capital=capital, chunk_size=chunk_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        close_connection()
+
+    for err in report["errors"]:
+        click.echo(f"  line {err['line']}: {err['error']}")
+    for dup in report["duplicate_rows"]:
+        click.echo(f"  line {dup['line']}: duplicate of {dup['import_key']}")
+    click.echo(
+        f"Format {report['format']}: {report['rows']} rows, {report['inserted']} inserted, "
+        f"{report['duplicates']} duplicates, {report['skipped']} skipped, {report['error_count']} errors"
+    )
+
+
+@click.command("trades-reprice")
+@click.option("--resume", is_flag=True, help="Chạy tiếp lần re-price trước bị dừng giữa chừng.")
+@click.option("--include-imported", is_flag=True, help="Tính lại cả lệnh import (profit từ statement).")
+@click.option("--chunk-size", type=int, default=REPRICE_CHUNK_SIZE, show_default=True)
+@click.option("--engine", type=click.Choice(("auto", "numpy", "python")), default="auto", show_default=True)
+def trades_reprice(resume, include_imported, chunk_size, engine):
+    """Tính lại rr / profit / profit_pct / risk_amount theo instrument_specs + risk model hiện tại."""
+
+    def progress(state):
+        done = state["scanned"] * 100 // state["total"] if state["total"] else 100
+        click.echo(
+            f"  {state['scanned']}/{state['total']} ({done}%) scanned, "
+            f"{state['updated']} updated, last id {state['last_id']}"
+        )
+
+    conn = get_connection()
+    try:
+        state = reprice_trades(
+            conn,
+            chunk_size=chunk_size,
+            resume=resume,
+            include_imported=include_imported,
+            progress=progress,
+            engine=engine,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        close_connection()
+    click.echo(
+        f"Repriced {state['scanned']} trade(s), {state['updated']} changed "
+        f"(started {state['started_at']}, finished {state['finished_at']})"
+    )
+
+
+@click.command("images-backfill")
+@click.option("--force", is_flag=True, help="Tạo lại cả các bản đã có.")
+def images_backfill(force):
+    """Tạo thumbnail / WebP cho các chart đã upload trước đây."""
+    if not PIL_AVAILABLE:
+        raise click.ClickException("Pillow is not installed (pip install Pillow)")
+
+    created = failed = 0
+    for name in sorted(iter_upload_names()):
+        if is_derivative(name) or not allowed_file(name):
+            continue
+        try:
+            created += generate_derivatives(name, force=force)
+        except Exception as e:
+            failed += 1
+            click.echo(f"  {name}: {e}")
+    click.echo(f"Derivatives created: {created}, failed: {failed}")
+
+
+@click.command("uploads-migrate")
+def uploads_migrate():
+    """Chuyển file upload dạng phẳng cũ sang kho theo nội dung (sha256, thư mục con)."""
+    conn = get_connection()
+    try:
+        result = migrate_flat_uploads(conn)
+    finally:
+        close_connection()
+    click.echo(
+        f"Migrated {result['files']} file(s), {result['deduplicated']} duplicate(s) merged, "
+        f"{result['references']} trade reference(s) rewritten"
+    )
+
+
+@click.command("uploads-gc")
+@click.option("--dry-run", is_flag=True, help="Chỉ báo cáo, không xóa.")
+@click.option("--grace-seconds", type=int, default=UPLOAD_GC_GRACE_SECONDS, show_default=True)
+@click.option("--batch-size", type=int, default=UPLOAD_GC_BATCH_SIZE, show_default=True)
+def uploads_gc(dry_run, grace_seconds, batch_size):
+    """Xóa file upload không còn trade nào tham chiếu (chạy bằng cron)."""
+    conn = get_connection()
+    try:
+        report = sweep_orphan_uploads(
+            conn, grace_seconds=grace_seconds, batch_size=batch_size, dry_run=dry_run
+        )
+    finally:
+        close_connection()
+    verb = "Would reclaim" if dry_run else "Reclaimed"
+    click.echo(
+        f"Scanned {report['scanned']} file(s): {report['orphans']} orphan(s), "
+        f"{report['derivatives']} derivative(s), {report['temp_files']} temp file(s). "
+        f"{verb} {report['bytes_reclaimed']} bytes"
+    )
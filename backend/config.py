@@ -9,5 +9,90 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 os.makedirs(INSTANCE_DIR, exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-DB_PATH = os.path.join(INSTANCE_DIR, "trade_manager.db")
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
\ No newline at end of file
+# TRADE_DB_PATH: dùng DB khác (vd: DB synthetic của bench/)
+DB_PATH = os.environ.get("TRADE_DB_PATH") or os.path.join(INSTANCE_DIR, "trade_manager.db")
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+
+# Giới hạn upload: cả request (Werkzeug trả 413 trước khi đọc body) và từng file
+MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+UPLOAD_MAX_FILE_BYTES = 20 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # đọc / hash / ghi file upload theo từng chunk
+UPLOAD_CACHE_MAX_AGE = 365 * 24 * 3600  # tên file upload không đổi nội dung -> immutable
+
+# Dọn file upload không còn trade nào tham chiếu (utils/upload_gc.py)
+UPLOAD_GC_GRACE_SECONDS = 3600      # bỏ qua file mới ghi (trade có thể chưa kịp INSERT)
+UPLOAD_GC_BATCH_SIZE = 500
+UPLOAD_GC_INTERVAL_SECONDS = None   # vd: 24 * 3600 để chạy định kỳ trong app; None = tắt
+
+# SQLite tuning (xem db.py)
+DB_TIMEOUT_SECONDS = 5.0         # busy handler: chờ tối đa khi DB đang bị lock
+DB_BUSY_RETRIES = 3              # số lần retry thêm khi vẫn "database is locked"
+DB_BUSY_RETRY_DELAY = 0.05       # giây, tăng dần theo số lần retry
+DB_CACHED_STATEMENTS = 256       # cache prepared statements / connection
+DB_CACHE_SIZE_KIB = 20000        # PRAGMA cache_size (KiB)
+DB_MMAP_SIZE = 256 * 1024 * 1024  # PRAGMA mmap_size (bytes)
+
+# Stats: đọc từ bảng trade_rollups khi request không filter theo ngày
+STATS_USE_ROLLUPS = True
+# Số trạng thái max drawdown (theo filter + nhóm) giữ lại để rollup chỉ đọc lệnh mới
+ROLLUP_DRAWDOWN_CACHE_ENTRIES = 128
+
+# /stats/periods: số kỳ (tuần / tháng) tối đa trong 1 request
+STATS_PERIODS_MAX = 120
+
+# Engine tính stats: "auto" (NumPy nếu đã cài), "numpy" hoặc "python"
+STATS_ENGINE = os.environ.get("STATS_ENGINE", "auto")
+
+# JSON response (utils/serializer.py): "auto" (orjson nếu đã cài), "orjson" hoặc "stdlib"
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+# Monte Carlo (utils/monte_carlo.py, cần NumPy)
+MONTE_CARLO_MAX_PATHS = 20000
+MONTE_CARLO_MAX_TRADES = 10000     # số lệnh tối đa / đường
+MONTE_CARLO_DEFAULT_PATHS = 1000
+MONTE_CARLO_SEED = 12345           # seed mặc định -> kết quả lặp lại được
+MONTE_CARLO_BLOCK_PATHS = 500      # số đường / block vector hóa (giới hạn RAM)
+MONTE_CARLO_WORKERS = 0            # > 1: chia block cho process pool
+MONTE_CARLO_POOL_MIN_CELLS = 5_000_000  # chỉ dùng pool khi paths x trades đủ lớn
+
+# Cache kết quả stats trong process (utils/stats_cache.py)
+STATS_CACHE_MAX_ENTRIES = 256
+STATS_CACHE_TTL_SECONDS = None  # None = chỉ invalidate theo revision dữ liệu
+
+# Import hàng loạt (utils/trade_import.py): số dòng / transaction
+IMPORT_CHUNK_SIZE = 5000
+
+# Tính profit khi đóng lệnh (utils/instruments.py)
+RISK_MODEL = os.environ.get("RISK_MODEL", "percent")  # percent: vốn x RISK_PERCENT | fixed: RISK_FIXED_AMOUNT $
+RISK_PERCENT = 0.01                # % vốn risk / lệnh (instrument_specs.risk_percent ghi đè theo symbol)
+RISK_FIXED_AMOUNT = 100.0          # $ risk / lệnh khi RISK_MODEL = "fixed"
+DEFAULT_PIP_SIZE = 0.0001          # symbol không có trong instrument_specs (4-digit broker)
+DEFAULT_PIP_VALUE_PER_LOT = 10.0   # $/pip cho 1 lot
+
+# Re-price hàng loạt khi đổi thông số (utils/repricer.py): số lệnh / transaction
+REPRICE_CHUNK_SIZE = 5000
+
+# POST /api/trades/bulk (utils/trade_bulk.py): số thao tác tối đa / request
+BULK_MAX_OPERATIONS = 5000
+
+# Export dạng stream (utils/trade_export.py): số dòng / lần fetchmany
+EXPORT_BATCH_SIZE = 1000
+
+# Bản WebP thu nhỏ của chart upload (utils/images.py, cần Pillow)
+IMAGE_DERIVATIVES = {"thumb": 320, "medium": 1280}  # tên -> cạnh dài tối đa (px)
+IMAGE_WEBP_QUALITY = 80
+IMAGE_WORKERS = 2  # số thread tạo ảnh ở background
+
+# Full-text search /api/search (models/search.py)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_SNIPPET_TOKENS = 12  # số token tối đa của mỗi snippet
+
+# Chạy dưới ASGI server (asgi.py, utils/asgi.py)
+ASGI_WORKER_THREADS = 16                # thread chạy Flask / SQLite / stats đồng thời
+ASGI_BODY_SPOOL_BYTES = 1024 * 1024     # body request lớn hơn -> ghi ra file tạm
+ASGI_FILE_CHUNK_BYTES = 64 * 1024       # kích thước chunk khi gửi file (uploads)
+
+# Metrics theo request tại /api/_metrics (utils/metrics.py)
+METRICS_ENABLED = True
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # giây
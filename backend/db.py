@@ -1,25 +1,186 @@
+import atexit
 import sqlite3
-import os
-from config import DB_PATH
-from models.trades import CREATE_TRADES_TABLE_SQL
-from models.setups import CREATE_SETUPS_TABLE_SQL
-from models.reviews import CREATE_REVIEWS_TABLE_SQL 
+import threading
+import time
+from config import (
+    DB_PATH,
+    DB_TIMEOUT_SECONDS,
+    DB_BUSY_RETRIES,
+    DB_BUSY_RETRY_DELAY,
+    DB_CACHED_STATEMENTS,
+    DB_CACHE_SIZE_KIB,
+    DB_MMAP_SIZE,
+)
+from migrations import run_migrations
+from utils.metrics import cursor_factory
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Connection dùng lại theo thread (mỗi request Flask chạy trên 1 thread), giữ qua
+# các request: PRAGMA + statement cache (DB_CACHED_STATEMENTS) chỉ tốn 1 lần / thread.
+# Đóng khi thread kết thúc hoặc process tắt (atexit).
+_local = threading.local()
+_open_connections = set()
+_open_lock = threading.Lock()
+
+
+class ManagedConnection(sqlite3.Connection):
+    """
+    Connection được dùng lại trong cùng thread / request.
+
+    Các route vẫn gọi conn.close() như cũ: ở đây close() chỉ rollback
+    transaction còn dở. Cuối request (teardown của app) release_connection()
+    cũng chỉ rollback; connection thật sự được đóng khi thread kết thúc,
+    khi process tắt, hoặc bằng close_connection() (CLI, init_db...).
+
+    Cursor trong request được ghi metrics là InstrumentedCursor (utils/metrics.py).
+    """
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or cursor_factory())
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        super().close()
+
+
+class _ThreadConnection:
+    """Giữ connection trong _local: thread kết thúc -> object bị thu hồi -> đóng connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        with _open_lock:
+            _open_connections.add(conn)
+
+    def __del__(self):
+        _dispose(self.conn)
+
+
+def _dispose(conn):
+    with _open_lock:
+        if conn not in _open_connections:
+            return
+        _open_connections.discard(conn)
+    try:
+        conn.dispose()
+    except sqlite3.Error:
+        pass
+
+
+def _is_busy_error(exc: Exception) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def _open_connection():
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_TIMEOUT_SECONDS,
+        cached_statements=DB_CACHED_STATEMENTS,
+        check_same_thread=False,
+        factory=ManagedConnection,
+    )
+    try:
+        _apply_pragmas(conn)
+    except Exception:
+        conn.dispose()
+        raise
     return conn
 
-def init_db():
-    create_new = not os.path.exists(DB_PATH)
-    conn = get_connection()
+
+def _apply_pragmas(conn):
     cur = conn.cursor()
+    cur.execute(f"PRAGMA busy_timeout = {int(DB_TIMEOUT_SECONDS * 1000)}")
+    # WAL: reader không bị chặn bởi writer (và ngược lại)
+    cur.execute("PRAGMA journal_mode = WAL")
+    cur.execute("PRAGMA synchronous = NORMAL")
+    cur.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KIB)}")
+    cur.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    cur.execute("PRAGMA temp_store = MEMORY")
+    cur.close()
+
+
+def run_with_busy_retry(fn, *args, **kwargs):
+    """
+    Chạy fn(*args, **kwargs), retry có giới hạn nếu SQLite báo busy/locked
+    sau khi busy_timeout đã hết. Dùng cho các thao tác ghi nặng (import, bulk...).
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not _is_busy_error(e) or attempt >= DB_BUSY_RETRIES:
+                raise
+            attempt += 1
+            time.sleep(DB_BUSY_RETRY_DELAY * attempt)
+
+
+def get_connection():
+    """
+    Trả về connection của thread hiện tại (tạo mới nếu chưa có).
+    Lỗi "database is locked" khi mở (vd: đang đổi journal_mode) được retry có giới hạn.
+    """
+    holder = getattr(_local, "holder", None)
+    if holder is not None:
+        return holder.conn
 
-    if create_new:
-        cur.execute(CREATE_TRADES_TABLE_SQL)
-        cur.execute(CREATE_SETUPS_TABLE_SQL)
-        cur.execute(CREATE_REVIEWS_TABLE_SQL)
+    conn = run_with_busy_retry(_open_connection)
+    _local.holder = _ThreadConnection(conn)
+    return conn
+
+
+def release_connection(exc=None):
+    """
+    Cuối request (teardown trong create_app): rollback transaction còn dở,
+    giữ connection cho request sau của thread. Connection lỗi thì đóng hẳn.
+    """
+    holder = getattr(_local, "holder", None)
+    if holder is None:
+        return
+    try:
+        if holder.conn.in_transaction:
+            holder.conn.rollback()
+    except sqlite3.Error:
+        close_connection()
+
+
+def close_connection(exc=None):
+    """Đóng hẳn connection của thread hiện tại (CLI, init_db, bench...)."""
+    holder = getattr(_local, "holder", None)
+    if holder is None:
+        return
+    _local.holder = None
+    try:
+        if holder.conn.in_transaction:
+            holder.conn.rollback()
+    except sqlite3.Error:
+        pass
+    finally:
+        _dispose(holder.conn)
 
-        print("Database created with pro fields!")
 
-    conn.commit()
-    conn.close()
+@atexit.register
+def close_all_connections():
+    """Đóng connection của mọi thread (process tắt)."""
+    with _open_lock:
+        connections = list(_open_connections)
+    for conn in connections:
+        _dispose(conn)
+
+
+def init_db():
+    """Tạo DB nếu chưa có và nâng cấp schema lên version mới nhất."""
+    conn = get_connection()
+    try:
+        for version, name in run_migrations(conn):
+            print(f"Applied migration {version}: {name}")
+    finally:
+        close_connection()
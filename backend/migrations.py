@@ -0,0 +1,307 @@
+# migrations.py
+"""
+Schema migrations theo version, lưu trong PRAGMA user_version.
+
+- Mỗi migration chạy trong 1 transaction riêng, thành công thì tăng user_version.
+- DB cũ (user_version = 0, đã có bảng) được nâng cấp tại chỗ: migration 1 dùng
+  CREATE TABLE IF NOT EXISTS nên không ảnh hưởng dữ liệu sẵn có.
+- Thêm migration mới: viết hàm nhận cursor và đăng ký bằng @migration(version, name).
+"""
+import sqlite3
+from itertools import combinations
+
+from models.trades import (
+    CREATE_TRADES_TABLE_SQL,
+    TRADE_INDEXES_SQL,
+    TRADE_FILTERS,
+    ADD_TRADE_IMPORT_KEY_SQL,
+    ADD_TRADE_RISK_AMOUNT_SQL,
+    build_trade_filters,
+)
+from models.setups import CREATE_SETUPS_TABLE_SQL
+from models.reviews import CREATE_REVIEWS_TABLE_SQL
+from models.rollups import (
+    CREATE_TRADE_ROLLUPS_TABLE_SQL,
+    CREATE_TRADE_ROLLUP_TRIGGERS_SQL,
+    CREATE_TRADE_ROLLUP_TRIGGERS_V3_SQL,
+    DROP_TRADE_ROLLUP_TRIGGERS_SQL,
+    REBUILD_TRADE_ROLLUPS_SQL,
+    REBUILD_TRADE_ROLLUPS_V3_SQL,
+    SEED_TRADES_HISTORY_REVISION_SQL,
+    CREATE_TRADES_HISTORY_TRIGGERS_SQL,
+    CREATE_TRADES_HISTORY_TRIGGERS_V11_SQL,
+    DROP_TRADES_HISTORY_TRIGGERS_SQL,
+    TRADES_HISTORY_REVISION,
+)
+from models.revisions import (
+    CREATE_DATA_REVISIONS_TABLE_SQL,
+    SEED_DATA_REVISIONS_SQL,
+    CREATE_REVISION_TRIGGERS_SQL,
+)
+from models.tags import (
+    CREATE_TRADE_TAGS_TABLE_SQL,
+    TRADE_TAG_INDEXES_SQL,
+    CREATE_TRADE_TAG_TRIGGERS_SQL,
+    REBUILD_TRADE_TAGS_SQL,
+)
+from models.search import (
+    CREATE_SEARCH_TABLES_SQL,
+    CREATE_SEARCH_TRIGGERS_SQL,
+    REBUILD_SEARCH_SQL,
+)
+from models.instruments import (
+    CREATE_INSTRUMENT_SPECS_TABLE_SQL,
+    DELETE_LEGACY_SEEDED_SPEC_SQL,
+    LEGACY_SEEDED_INSTRUMENT_SPECS,
+    SEED_INSTRUMENT_SPECS_REVISION_SQL,
+    CREATE_INSTRUMENT_SPECS_REVISION_TRIGGERS_SQL,
+    CREATE_REPRICE_STATE_TABLE_SQL,
+)
+from models.uploads import (
+    CREATE_UPLOADS_TABLE_SQL,
+    CREATE_UPLOAD_REFCOUNT_TRIGGERS_SQL,
+    REBUILD_UPLOAD_REFCOUNTS_SQL,
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int, name: str):
+    def decorator(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+@migration(1, "base schema")
+def _base_schema(cur):
+    cur.execute(CREATE_TRADES_TABLE_SQL)
+    cur.execute(CREATE_SETUPS_TABLE_SQL)
+    cur.execute(CREATE_REVIEWS_TABLE_SQL)
+
+
+@migration(2, "trade filter indexes")
+def _trade_filter_indexes(cur):
+    for sql in TRADE_INDEXES_SQL:
+        cur.execute(sql)
+
+
+@migration(3, "trade rollups")
+def _trade_rollups(cur):
+    cur.execute(CREATE_TRADE_ROLLUPS_TABLE_SQL)
+    for sql in CREATE_TRADE_ROLLUP_TRIGGERS_V3_SQL:
+        cur.execute(sql)
+    # Backfill từ dữ liệu sẵn có
+    for sql in REBUILD_TRADE_ROLLUPS_V3_SQL:
+        cur.execute(sql)
+
+
+@migration(4, "data revisions")
+def _data_revisions(cur):
+    cur.execute(CREATE_DATA_REVISIONS_TABLE_SQL)
+    for sql in SEED_DATA_REVISIONS_SQL + CREATE_REVISION_TRIGGERS_SQL:
+        cur.execute(sql)
+
+
+@migration(5, "trade import key")
+def _trade_import_key(cur):
+    for sql in ADD_TRADE_IMPORT_KEY_SQL:
+        cur.execute(sql)
+
+
+@migration(6, "upload refcounts")
+def _upload_refcounts(cur):
+    cur.execute(CREATE_UPLOADS_TABLE_SQL)
+    for sql in CREATE_UPLOAD_REFCOUNT_TRIGGERS_SQL + REBUILD_UPLOAD_REFCOUNTS_SQL:
+        cur.execute(sql)
+
+
+@migration(7, "trade tags")
+def _trade_tags(cur):
+    cur.execute(CREATE_TRADE_TAGS_TABLE_SQL)
+    for sql in TRADE_TAG_INDEXES_SQL + CREATE_TRADE_TAG_TRIGGERS_SQL:
+        cur.execute(sql)
+    # Backfill từ các cột JSON sẵn có
+    for sql in REBUILD_TRADE_TAGS_SQL:
+        cur.execute(sql)
+
+
+@migration(8, "full-text search")
+def _full_text_search(cur):
+    for sql in CREATE_SEARCH_TABLES_SQL + CREATE_SEARCH_TRIGGERS_SQL:
+        cur.execute(sql)
+    # Index text sẵn có của trades / setups
+    for sql in REBUILD_SEARCH_SQL:
+        cur.execute(sql)
+
+
+@migration(9, "instrument specs")
+def _instrument_specs(cur):
+    cur.execute(CREATE_INSTRUMENT_SPECS_TABLE_SQL)
+    cur.execute(SEED_INSTRUMENT_SPECS_REVISION_SQL)
+    for sql in CREATE_INSTRUMENT_SPECS_REVISION_TRIGGERS_SQL:
+        cur.execute(sql)
+    cur.execute(CREATE_REPRICE_STATE_TABLE_SQL)
+
+
+@migration(10, "trades history revision")
+def _trades_history_revision(cur):
+    cur.execute(SEED_TRADES_HISTORY_REVISION_SQL)
+    for sql in CREATE_TRADES_HISTORY_TRIGGERS_V11_SQL:
+        cur.execute(sql)
+
+
+@migration(11, "trades history tail")
+def _trades_history_tail(cur):
+    for sql in DROP_TRADES_HISTORY_TRIGGERS_SQL + CREATE_TRADES_HISTORY_TRIGGERS_V11_SQL:
+        cur.execute(sql)
+    # Trạng thái drawdown tạo theo trigger cũ không còn hợp lệ
+    cur.execute(
+        "UPDATE data_revisions SET revision = revision + 1 WHERE name = ?",
+        (TRADES_HISTORY_REVISION,),
+    )
+
+
+
+@migration(12, "unseed instrument specs")
+def _unseed_instrument_specs(cur):
+    # Bỏ thông số tham khảo bản cũ seed sẵn (dòng đã sửa qua API được giữ nguyên)
+    # -> symbol đó tính lại theo mặc định config.py như trước khi có bảng
+    cur.executemany(DELETE_LEGACY_SEEDED_SPEC_SQL, LEGACY_SEEDED_INSTRUMENT_SPECS)
+
+
+@migration(13, "trade risk amount")
+def _trade_risk_amount(cur):
+    for sql in ADD_TRADE_RISK_AMOUNT_SQL:
+        cur.execute(sql)
+    # R của rollup / lịch sử drawdown theo risk_amount. Mọi dòng đang NULL -> rollup
+    # không đổi, rebuild chỉ để chắc chắn khớp công thức mới
+    for sql in (
+        DROP_TRADE_ROLLUP_TRIGGERS_SQL + CREATE_TRADE_ROLLUP_TRIGGERS_SQL
+        + DROP_TRADES_HISTORY_TRIGGERS_SQL + CREATE_TRADES_HISTORY_TRIGGERS_SQL
+        + REBUILD_TRADE_ROLLUPS_SQL
+    ):
+        cur.execute(sql)
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn):
+    """
+    Chạy các migration có version > user_version hiện tại.
+    Trả về list (version, name) đã áp dụng.
+    """
+    current = get_schema_version(conn)
+    applied = []
+
+    for version, name, fn in MIGRATIONS:
+        if version <= current:
+            continue
+
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            fn(cur)
+            cur.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((version, name))
+
+    if applied:
+        # Cập nhật thống kê cho query planner sau khi đổi schema / index
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    return applied
+
+
+# === QUERY PLAN CHECK ===
+class QueryPlanError(Exception):
+    pass
+
+
+def _plan_sample_args():
+    """Các tổ hợp filter mà /trades và /stats/* thực sự gửi tới DB."""
+    sample = {
+        "symbol": "EURUSD",
+        "timeframe": "H1",
+        "session": "London",
+        "setup": "OB",
+        "from": "2024-01-01",
+        "to": "2024-12-31",
+    }
+    dims = [name for name, _ in TRADE_FILTERS if name not in ("from", "to")]
+
+    yield {}
+    yield {"from": sample["from"], "to": sample["to"]}
+    yield {"from": sample["from"]}
+    for n in (1, 2):
+        for combo in combinations(dims, n):
+            args = {d: sample[d] for d in combo}
+            yield args
+            yield {**args, "from": sample["from"], "to": sample["to"]}
+    yield dict(sample)
+
+
+def known_trade_queries():
+    """
+    (sql, params) của các query endpoint: list /trades (DESC, kể cả trang keyset)
+    và /stats (ASC).
+    """
+    for args in _plan_sample_args():
+        where_sql, params = build_trade_filters(args)
+        for order in ("ASC", "DESC"):
+            sql = f"SELECT * FROM trades{where_sql} ORDER BY date {order}, id {order}"
+            yield sql, params
+
+        joiner = " AND " if where_sql else " WHERE "
+        yield (
+            f"SELECT * FROM trades{where_sql}{joiner}(date, id) < (?, ?) "
+            f"ORDER BY date DESC, id DESC LIMIT ?",
+            [*params, "2024-06-01", 100, 51],
+        )
+
+
+def explain_query_plan(conn, sql, params=()):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [r[-1] for r in rows]
+
+
+def check_query_plans(conn=None, queries=None):
+    """
+    Kiểm tra không query nào quét cả bảng trades (SCAN khi có filter, hoặc
+    SCAN không dùng index) hoặc phải sort tạm (TEMP B-TREE) cho ORDER BY.
+
+    - conn = None: kiểm tra trên DB tạm trong RAM với schema mới nhất
+      (không phụ thuộc số lượng data hiện có, vì bảng nhỏ thì planner có thể
+      chọn SCAN một cách hợp lý).
+    Raise QueryPlanError liệt kê các query vi phạm.
+    """
+    scratch = None
+    if conn is None:
+        scratch = conn = sqlite3.connect(":memory:")
+        run_migrations(conn)
+
+    problems = []
+    try:
+        for sql, params in queries or known_trade_queries():
+            has_filter = " WHERE " in sql
+            for detail in explain_query_plan(conn, sql, params):
+                # Không filter: chấp nhận SCAN theo index (để khỏi sort);
+                # có filter: phải là SEARCH theo index
+                is_table_scan = detail.startswith("SCAN") and (
+                    has_filter or "USING" not in detail
+                )
+                is_temp_sort = "TEMP B-TREE" in detail
+                if is_table_scan or is_temp_sort:
+                    problems.append(f"{sql} -> {detail}")
+    finally:
+        if scratch is not None:
+            scratch.close()
+
+    if problems:
+        raise QueryPlanError("Query plan check failed:\n  " + "\n  ".join(problems))
@@ -0,0 +1,93 @@
+# models/instruments.py
+"""
+Thông số hợp đồng theo symbol (instrument_specs), dùng khi tính profit /
+profit_pct của lệnh (utils/instruments.py):
+  - pip_size          : giá trị 1 pip (EURUSD 0.0001, USDJPY 0.01, XAUUSD 0.1...)
+  - pip_value_per_lot : $ / pip cho 1 lot
+  - lot_step          : bước khối lượng của broker (0.01...), lot được làm tròn
+                        xuống theo bước này; NULL = không làm tròn
+  - risk_percent      : % vốn risk / lệnh riêng cho symbol; NULL = RISK_PERCENT
+
+Symbol không có trong bảng dùng thông số mặc định trong config.py.
+Revision 'instrument_specs' trong data_revisions được trigger tăng mỗi lần
+bảng thay đổi (invalidate cache / ETag).
+
+Trạng thái lần re-price gần nhất (utils/repricer.py) nằm trong reprice_state
+(1 dòng), được ghi cùng transaction với từng chunk -> chạy tiếp được sau khi
+bị dừng giữa chừng.
+"""
+
+CREATE_INSTRUMENT_SPECS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS instrument_specs(
+    symbol TEXT PRIMARY KEY,
+    pip_size REAL NOT NULL CHECK (pip_size > 0),
+    pip_value_per_lot REAL NOT NULL CHECK (pip_value_per_lot > 0),
+    lot_step REAL CHECK (lot_step IS NULL OR lot_step > 0),
+    risk_percent REAL CHECK (risk_percent IS NULL OR risk_percent > 0)
+)
+"""
+
+INSTRUMENT_SPEC_COLUMNS = ("symbol", "pip_size", "pip_value_per_lot", "lot_step", "risk_percent")
+
+# Bảng để trống khi tạo: symbol chưa khai báo tính như trước (mặc định config.py),
+# người dùng tự thêm thông số qua PUT /api/instruments/<symbol>.
+# Thông số tham khảo bản cũ từng seed sẵn (làm đổi profit khi nâng cấp): migration 12
+# xóa các dòng còn nguyên giá trị này.
+LEGACY_SEEDED_INSTRUMENT_SPECS = (
+    ("USDJPY", 0.01, 6.5, None, None),
+    ("EURJPY", 0.01, 6.5, None, None),
+    ("GBPJPY", 0.01, 6.5, None, None),
+    ("XAUUSD", 0.1, 10.0, None, None),
+    ("XAGUSD", 0.01, 50.0, None, None),
+    ("US30", 1.0, 1.0, None, None),
+    ("NAS100", 1.0, 1.0, None, None),
+    ("SPX500", 1.0, 1.0, None, None),
+)
+
+DELETE_LEGACY_SEEDED_SPEC_SQL = (
+    "DELETE FROM instrument_specs WHERE symbol = ? AND pip_size = ? AND pip_value_per_lot = ? "
+    "AND lot_step IS ? AND risk_percent IS ?"
+)
+
+UPSERT_INSTRUMENT_SPEC_SQL = (
+    f"INSERT INTO instrument_specs({', '.join(INSTRUMENT_SPEC_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in INSTRUMENT_SPEC_COLUMNS)}) "
+    "ON CONFLICT(symbol) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in INSTRUMENT_SPEC_COLUMNS[1:])
+)
+
+# Không nằm trong REVISION_TABLES: migration 4 tạo trigger trước khi có bảng này
+SEED_INSTRUMENT_SPECS_REVISION_SQL = (
+    "INSERT OR IGNORE INTO data_revisions(name, revision) VALUES ('instrument_specs', 0)"
+)
+
+CREATE_INSTRUMENT_SPECS_REVISION_TRIGGERS_SQL = tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_instrument_specs_revision_{event.lower()}
+    AFTER {event} ON instrument_specs
+    BEGIN
+        UPDATE data_revisions SET revision = revision + 1 WHERE name = 'instrument_specs';
+    END
+    """
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+CREATE_REPRICE_STATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS reprice_state(
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_id INTEGER NOT NULL DEFAULT 0,
+    include_imported INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    scanned INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    finished_at TEXT
+)
+"""
+
+
+def list_instrument_specs(conn):
+    """Mọi dòng của instrument_specs (dict), theo symbol."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT {', '.join(INSTRUMENT_SPEC_COLUMNS)} FROM instrument_specs ORDER BY symbol")
+    return [dict(zip(INSTRUMENT_SPEC_COLUMNS, row)) for row in cur.fetchall()]
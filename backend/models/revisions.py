@@ -0,0 +1,41 @@
+# models/revisions.py
+"""
+Revision dữ liệu (tăng đơn điệu) cho từng bảng, do trigger tăng trong cùng
+transaction với mọi INSERT / UPDATE / DELETE. Dùng cho ETag / cache.
+"""
+
+REVISION_TABLES = ("trades", "setups", "reviews")
+
+CREATE_DATA_REVISIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS data_revisions(
+    name TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+SEED_DATA_REVISIONS_SQL = tuple(
+    f"INSERT OR IGNORE INTO data_revisions(name, revision) VALUES ('{table}', 0)"
+    for table in REVISION_TABLES
+)
+
+CREATE_REVISION_TRIGGERS_SQL = tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_revision_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        UPDATE data_revisions SET revision = revision + 1 WHERE name = '{table}';
+    END
+    """
+    for table in REVISION_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+def get_revisions(conn, names=REVISION_TABLES):
+    """{name: revision} cho các bảng được yêu cầu."""
+    placeholders = ", ".join("?" for _ in names)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT name, revision FROM data_revisions WHERE name IN ({placeholders})",
+        tuple(names),
+    )
+    return dict(cur.fetchall())
@@ -0,0 +1,251 @@
+# models/rollups.py
+"""
+Bảng tổng hợp (rollup) cho stats, được trigger trên bảng trades cập nhật
+trong cùng transaction với mọi thao tác INSERT / UPDATE / DELETE.
+
+Key: (symbol, setup, session, timeframe, grade, month), NULL được lưu thành ''
+để UNIQUE index hoạt động (NULL luôn khác nhau trong SQLite).
+"""
+
+# R = profit / risk_amount; lệnh chưa có risk_amount: profit / (capital x ROLLUP_RISK_PERCENT)
+ROLLUP_RISK_PERCENT = 0.01  # phải khớp RISK_PERCENT_DEFAULT trong utils/trade_stats.py
+
+ROLLUP_DIMENSIONS = ("symbol", "setup", "session", "timeframe", "grade", "month")
+
+ROLLUP_METRICS = (
+    "trade_count",
+    "closed_count",
+    "win_count",
+    "loss_count",
+    "breakeven_count",
+    "sum_profit",
+    "sum_profit_pct",
+    "sum_r",
+    "sum_win_r",
+    "sum_loss_r",
+    "gross_profit",
+    "gross_loss",
+)
+
+CREATE_TRADE_ROLLUPS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS trade_rollups(
+    symbol TEXT NOT NULL,
+    setup TEXT NOT NULL,
+    session TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    grade NOT NULL,
+    month TEXT NOT NULL,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    closed_count INTEGER NOT NULL DEFAULT 0,
+    win_count INTEGER NOT NULL DEFAULT 0,
+    loss_count INTEGER NOT NULL DEFAULT 0,
+    breakeven_count INTEGER NOT NULL DEFAULT 0,
+    sum_profit REAL NOT NULL DEFAULT 0,
+    sum_profit_pct REAL NOT NULL DEFAULT 0,
+    sum_r REAL NOT NULL DEFAULT 0,
+    sum_win_r REAL NOT NULL DEFAULT 0,
+    sum_loss_r REAL NOT NULL DEFAULT 0,
+    gross_profit REAL NOT NULL DEFAULT 0,
+    gross_loss REAL NOT NULL DEFAULT 0,
+    UNIQUE(symbol, setup, session, timeframe, grade, month)
+)
+"""
+
+
+def _key_exprs(p):
+    return (
+        f"COALESCE({p}.symbol, '')",
+        f"COALESCE({p}.setup, '')",
+        f"COALESCE({p}.session, '')",
+        f"COALESCE({p}.timeframe, '')",
+        f"COALESCE({p}.grade, '')",
+        f"COALESCE(substr({p}.date, 1, 7), '')",
+    )
+
+
+def _metric_exprs(p, stored_risk=True):
+    """
+    Biểu thức SQL cho từng metric của 1 dòng trades (p = NEW / OLD / tên bảng).
+    stored_risk=False: schema trước migration 13 (chưa có cột risk_amount).
+    """
+    closed = f"({p}.profit IS NOT NULL)"
+    stored = f"WHEN {p}.risk_amount > 0 THEN {p}.profit / {p}.risk_amount " if stored_risk else ""
+    r = (
+        f"(CASE WHEN {p}.profit IS NULL THEN 0.0 {stored}"
+        f"WHEN {p}.capital > 0 THEN {p}.profit / ({p}.capital * {ROLLUP_RISK_PERCENT}) ELSE 0.0 END)"
+    )
+    profit = f"COALESCE({p}.profit, 0.0)"
+    return (
+        "1",
+        f"{closed}",
+        f"({closed} AND {r} > 0)",
+        f"({closed} AND {r} < 0)",
+        f"({closed} AND {r} = 0)",
+        profit,
+        f"(CASE WHEN {closed} THEN COALESCE({p}.profit_pct, 0.0) ELSE 0.0 END)",
+        r,
+        f"(CASE WHEN {r} > 0 THEN {r} ELSE 0.0 END)",
+        f"(CASE WHEN {r} < 0 THEN {r} ELSE 0.0 END)",
+        f"(CASE WHEN {profit} > 0 THEN {profit} ELSE 0.0 END)",
+        f"(CASE WHEN {profit} < 0 THEN {profit} ELSE 0.0 END)",
+    )
+
+
+def _upsert_sql(p, sign, stored_risk):
+    keys = ", ".join(_key_exprs(p))
+    values = ", ".join(f"{sign} * {expr}" for expr in _metric_exprs(p, stored_risk))
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in ROLLUP_METRICS)
+    return (
+        f"INSERT INTO trade_rollups({', '.join(ROLLUP_DIMENSIONS + ROLLUP_METRICS)}) "
+        f"VALUES ({keys}, {values}) "
+        f"ON CONFLICT({', '.join(ROLLUP_DIMENSIONS)}) DO UPDATE SET {updates};"
+    )
+
+
+_ROLLUP_SOURCE_COLUMNS = (
+    "date", "symbol", "setup", "session", "timeframe", "grade", "capital", "profit", "profit_pct",
+)
+
+TRADE_ROLLUP_TRIGGERS = (
+    "trg_trades_rollup_insert", "trg_trades_rollup_delete", "trg_trades_rollup_update",
+)
+
+
+def _rollup_triggers_sql(stored_risk):
+    columns = _ROLLUP_SOURCE_COLUMNS + (("risk_amount",) if stored_risk else ())
+    return (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_insert AFTER INSERT ON trades
+        BEGIN
+            {_upsert_sql("NEW", 1, stored_risk)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_delete AFTER DELETE ON trades
+        BEGIN
+            {_upsert_sql("OLD", -1, stored_risk)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_update
+        AFTER UPDATE OF {', '.join(columns)} ON trades
+        BEGIN
+            {_upsert_sql("OLD", -1, stored_risk)}
+            {_upsert_sql("NEW", 1, stored_risk)}
+        END
+        """,
+    )
+
+
+def _rebuild_rollups_sql(stored_risk):
+    return (
+        "DELETE FROM trade_rollups",
+        f"""
+        INSERT INTO trade_rollups({', '.join(ROLLUP_DIMENSIONS + ROLLUP_METRICS)})
+        SELECT {', '.join(_key_exprs("trades"))},
+               {', '.join(f"SUM({expr})" for expr in _metric_exprs("trades", stored_risk))}
+        FROM trades
+        GROUP BY 1, 2, 3, 4, 5, 6
+        """,
+    )
+
+
+CREATE_TRADE_ROLLUP_TRIGGERS_SQL = _rollup_triggers_sql(stored_risk=True)
+REBUILD_TRADE_ROLLUPS_SQL = _rebuild_rollups_sql(stored_risk=True)
+
+# Migration 3 (chưa có cột risk_amount); migration 13 thay bằng bản trên
+CREATE_TRADE_ROLLUP_TRIGGERS_V3_SQL = _rollup_triggers_sql(stored_risk=False)
+REBUILD_TRADE_ROLLUPS_V3_SQL = _rebuild_rollups_sql(stored_risk=False)
+
+DROP_TRADE_ROLLUP_TRIGGERS_SQL = tuple(
+    f"DROP TRIGGER IF EXISTS {name}" for name in TRADE_ROLLUP_TRIGGERS
+)
+
+# === LỊCH SỬ LỆNH ĐÃ ĐÓNG ===
+# Lệnh mở: add_trade ghi exit = 0, profit = 0 (import / synthetic: NULL).
+# Lệnh đã đóng: profit IS NOT NULL AND exit != 0.
+CLOSED_TRADE_SQL = "profit IS NOT NULL AND exit IS NOT NULL AND exit != 0"
+
+# Phần cuối (tail) của chuỗi lệnh theo (date, id): lệnh đã đóng cuối cùng + các
+# lệnh mở sau nó. Đây là nơi journal ghi hằng ngày (thêm lệnh, đóng lệnh, review).
+# Revision 'trades_history' chỉ tăng khi ghi vào lệnh nằm trước tail (thêm lệnh
+# lùi ngày, sửa / xóa lệnh cũ...) hoặc khi tail lùi về trước (xóa / mở lại / dời
+# ngày lệnh đã đóng cuối cùng) -> max drawdown của rollup_stats giữ trạng thái
+# tới trước tail và chỉ đọc lại tail khi revision này không đổi.
+TRADES_HISTORY_REVISION = "trades_history"
+
+# Cột ảnh hưởng tới drawdown: thứ tự, nhóm / filter của rollup, R, trạng thái đóng
+# (+ risk_amount từ migration 13)
+_HISTORY_COLUMNS = (
+    "id", "date", "symbol", "setup", "session", "timeframe", "grade", "capital", "profit", "exit",
+)
+
+SEED_TRADES_HISTORY_REVISION_SQL = (
+    f"INSERT OR IGNORE INTO data_revisions(name, revision) VALUES ('{TRADES_HISTORY_REVISION}', 0)"
+)
+
+
+def _in_history(p):
+    """Lệnh p nằm trước tail: có ngày và có lệnh đã đóng khác đứng sau, hoặc không có ngày."""
+    return (
+        f"({p}.profit IS NOT NULL AND ({p}.date IS NULL "
+        f"OR EXISTS (SELECT 1 FROM trades WHERE date > {p}.date AND id != {p}.id "
+        f"AND {CLOSED_TRADE_SQL}) "
+        f"OR EXISTS (SELECT 1 FROM trades WHERE date = {p}.date AND id > {p}.id "
+        f"AND {CLOSED_TRADE_SQL})))"
+    )
+
+
+def _closed(p):
+    return f"({p}.profit IS NOT NULL AND {p}.exit IS NOT NULL AND {p}.exit != 0)"
+
+
+_BUMP_TRADES_HISTORY_SQL = (
+    f"UPDATE data_revisions SET revision = revision + 1 WHERE name = '{TRADES_HISTORY_REVISION}';"
+)
+
+TRADES_HISTORY_TRIGGERS = (
+    "trg_trades_history_insert", "trg_trades_history_delete", "trg_trades_history_update",
+)
+
+
+def _history_triggers_sql(columns):
+    return (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_history_insert AFTER INSERT ON trades
+        WHEN {_in_history("NEW")}
+        BEGIN
+            {_BUMP_TRADES_HISTORY_SQL}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_history_delete AFTER DELETE ON trades
+        WHEN {_in_history("OLD")} OR {_closed("OLD")}
+        BEGIN
+            {_BUMP_TRADES_HISTORY_SQL}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_trades_history_update
+        AFTER UPDATE OF {', '.join(columns)} ON trades
+        WHEN ({' OR '.join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)})
+          AND ({_in_history("OLD")} OR {_in_history("NEW")}
+               OR ({_closed("OLD")} AND (NOT {_closed("NEW")}
+                   OR OLD.date IS NOT NEW.date OR OLD.id IS NOT NEW.id)))
+        BEGIN
+            {_BUMP_TRADES_HISTORY_SQL}
+        END
+        """,
+    )
+
+
+CREATE_TRADES_HISTORY_TRIGGERS_SQL = _history_triggers_sql(_HISTORY_COLUMNS + ("risk_amount",))
+
+# Migration 10 / 11 (chưa có cột risk_amount); migration 13 thay bằng bản trên
+CREATE_TRADES_HISTORY_TRIGGERS_V11_SQL = _history_triggers_sql(_HISTORY_COLUMNS)
+
+# Migration 11: thay trigger của migration 10 (coi lệnh profit = 0 của add_trade là đã đóng)
+# Migration 13: thay trigger của migration 11 (theo dõi thêm risk_amount)
+DROP_TRADES_HISTORY_TRIGGERS_SQL = tuple(
+    f"DROP TRIGGER IF EXISTS {name}" for name in TRADES_HISTORY_TRIGGERS
+)
@@ -0,0 +1,173 @@
+# models/search.py
+"""
+Full-text search (SQLite FTS5) trên text của journal và playbook:
+  - trades_fts: note, lessons, entry_reason, exit_reason của trades
+  - setups_fts: name, context, entry_rules, mistakes của setups
+
+Bảng FTS dạng external content (không lưu bản sao text, chỉ index), rowid =
+id của dòng gốc, được trigger cập nhật trong cùng transaction với mọi INSERT /
+UPDATE / DELETE. Tokenizer unicode61 bỏ dấu -> "vao lenh" khớp "vào lệnh".
+"""
+import html
+
+# bảng FTS -> (bảng gốc, cột được index, trọng số bm25 theo cột)
+SEARCH_INDEXES = {
+    "trades_fts": ("trades", ("note", "lessons", "entry_reason", "exit_reason"), (1.0, 2.0, 1.0, 1.0)),
+    "setups_fts": ("setups", ("name", "context", "entry_rules", "mistakes"), (4.0, 1.0, 1.0, 1.0)),
+}
+
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Đánh dấu từ khớp trong snippet: FTS5 chèn ký tự điều khiển, text được
+# escape HTML rồi mới đổi ký tự đó thành <mark> -> snippet an toàn để render HTML
+SNIPPET_MARK = ("<mark>", "</mark>")
+_SNIPPET_SENTINELS = ("\x02", "\x03")
+
+
+def _create_fts_sql(fts, table, columns):
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{', '.join(columns)}, content='{table}', content_rowid='id', "
+        f"tokenize='{SEARCH_TOKENIZER}')"
+    )
+
+
+def _fts_insert_sql(fts, columns):
+    return (
+        f"INSERT INTO {fts}(rowid, {', '.join(columns)}) "
+        f"VALUES (NEW.id, {', '.join(f'NEW.{c}' for c in columns)});"
+    )
+
+
+def _fts_delete_sql(fts, columns):
+    # External content: xóa bằng lệnh 'delete' kèm đúng giá trị cũ đã index
+    return (
+        f"INSERT INTO {fts}({fts}, rowid, {', '.join(columns)}) "
+        f"VALUES ('delete', OLD.id, {', '.join(f'OLD.{c}' for c in columns)});"
+    )
+
+
+def _fts_triggers_sql(fts, table, columns):
+    return (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+        BEGIN
+            {_fts_insert_sql(fts, columns)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            {_fts_delete_sql(fts, columns)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+        AFTER UPDATE OF id, {', '.join(columns)} ON {table}
+        BEGIN
+            {_fts_delete_sql(fts, columns)}
+            {_fts_insert_sql(fts, columns)}
+        END
+        """,
+    )
+
+
+CREATE_SEARCH_TABLES_SQL = tuple(
+    _create_fts_sql(fts, table, columns)
+    for fts, (table, columns, _) in SEARCH_INDEXES.items()
+)
+
+CREATE_SEARCH_TRIGGERS_SQL = tuple(
+    sql
+    for fts, (table, columns, _) in SEARCH_INDEXES.items()
+    for sql in _fts_triggers_sql(fts, table, columns)
+)
+
+# Index lại toàn bộ từ bảng gốc (backfill / sửa lệch)
+REBUILD_SEARCH_SQL = tuple(
+    f"INSERT INTO {fts}({fts}) VALUES ('rebuild')" for fts in SEARCH_INDEXES
+)
+
+
+def build_match_query(q: str) -> str:
+    """
+    Text người dùng gõ -> câu MATCH an toàn của FTS5: mỗi từ là 1 phrase
+    (không bị hiểu thành toán tử / cú pháp), AND với nhau, từ cuối khớp prefix
+    (gõ tới đâu tìm tới đó). Trả về "" nếu không có từ nào.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    if not terms:
+        return ""
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _bm25(fts):
+    _, _, weights = SEARCH_INDEXES[fts]
+    return f"bm25({fts}, {', '.join(str(w) for w in weights)})"
+
+
+def _snippet(fts, tokens):
+    # Cột -1: FTS5 tự chọn cột khớp tốt nhất
+    start, end = (f"char({ord(c)})" for c in _SNIPPET_SENTINELS)
+    return f"snippet({fts}, -1, {start}, {end}, '…', {int(tokens)})"
+
+
+def _render_snippet(raw):
+    """Snippet thô (ký tự đánh dấu) -> HTML: text đã escape, từ khớp bọc <mark>."""
+    if raw is None:
+        return None
+    # Text gốc có sẵn \x02 / \x03 (hiếm) cũng thành <mark>: không mở lỗ XSS
+    escaped = html.escape(raw)
+    return escaped.replace(_SNIPPET_SENTINELS[0], SNIPPET_MARK[0]).replace(
+        _SNIPPET_SENTINELS[1], SNIPPET_MARK[1]
+    )
+
+
+def _ranked_sql(fts, table, columns, where_sql, tokens):
+    """
+    2 bước: xếp hạng bm25 + LIMIT chỉ trên rowid (join bảng gốc khi có filter),
+    rồi mới lấy cột và snippet cho LIMIT dòng đầu -> không đọc dòng gốc / tính
+    snippet cho mọi dòng khớp.
+    """
+    return (
+        f"SELECT {', '.join(f'{table}.{c}' for c in columns)}, ranked.score, {_snippet(fts, tokens)} "
+        f"FROM ("
+        f"SELECT {fts}.rowid AS id, {_bm25(fts)} AS score "
+        f"FROM {fts}{f' JOIN {table} ON {table}.id = {fts}.rowid' if where_sql else ''} "
+        f"WHERE {fts} MATCH ?{where_sql} "
+        f"ORDER BY score, id LIMIT ?"
+        f") AS ranked "
+        # CROSS JOIN giữ thứ tự join: tra rowid của LIMIT dòng, không quét lại mọi dòng khớp
+        f"CROSS JOIN {table} ON {table}.id = ranked.id "
+        f"CROSS JOIN {fts} ON {fts}.rowid = ranked.id AND {fts} MATCH ? "
+        f"ORDER BY ranked.score, ranked.id"
+    )
+
+
+def search_trades(conn, match, where_sql="", params=(), limit=20, tokens=12):
+    """
+    Trades khớp match (đã qua build_match_query hoặc cú pháp FTS5), lọc thêm
+    theo where_sql của build_trade_filters, xếp theo bm25 (liên quan nhất trước).
+    """
+    # where_sql dùng tên cột trần của trades (không trùng cột của trades_fts)
+    extra = where_sql.replace(" WHERE ", " AND ", 1) if where_sql else ""
+    columns = ("id", "date", "symbol", "setup", "direction", "profit")
+    sql = _ranked_sql("trades_fts", "trades", columns, extra, tokens)
+    rows = conn.execute(sql, (match, *params, limit, match)).fetchall()
+    return [
+        {**dict(zip(columns, r)), "score": round(-r[6], 6), "snippet": _render_snippet(r[7])}
+        for r in rows
+    ]
+
+
+def search_setups(conn, match, name=None, limit=20, tokens=12):
+    """Setups trong playbook khớp match, lọc theo tên setup nếu có."""
+    columns = ("id", "name", "version")
+    sql = _ranked_sql("setups_fts", "setups", columns, " AND setups.name = ?" if name else "", tokens)
+    params = (match, *((name,) if name else ()), limit, match)
+    rows = conn.execute(sql, params).fetchall()
+    return [
+        {**dict(zip(columns, r)), "score": round(-r[3], 6), "snippet": _render_snippet(r[4])}
+        for r in rows
+    ]
@@ -0,0 +1,101 @@
+# models/tags.py
+"""
+Bảng trade_tags(trade_id, kind, tag): các cột tag dạng JSON list của trades
+(confluence, entry_model, mistakes, psychological_tags) tách thành 1 dòng / tag,
+có index -> đếm bằng GROUP BY và filter bằng index lookup thay vì json.loads
+từng dòng.
+
+Được trigger trên bảng trades cập nhật trong cùng transaction với mọi thao tác
+INSERT / UPDATE / DELETE (routes/trades.py, import, ...). Parse giống
+utils/trade_stats._iter_mistakes: chỉ nhận JSON list, phần tử string / số được
+strip, bỏ phần tử rỗng. Tag lặp trong 1 lệnh được giữ nguyên (đếm như cũ).
+"""
+
+TAG_KINDS = ("confluence", "entry_model", "mistakes", "psychological_tags")
+
+CREATE_TRADE_TAGS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS trade_tags(
+    trade_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    tag TEXT NOT NULL
+)
+"""
+
+TRADE_TAG_INDEXES_SQL = (
+    # đếm theo kind (covering) + filter kind/tag -> trade_id
+    "CREATE INDEX IF NOT EXISTS idx_trade_tags_kind_tag ON trade_tags(kind, tag, trade_id)",
+    "CREATE INDEX IF NOT EXISTS idx_trade_tags_trade ON trade_tags(trade_id)",
+)
+
+# Khoảng trắng bị strip (tương đương str.strip() với dữ liệu thực tế)
+_WHITESPACE = "' ' || char(9, 10, 11, 12, 13)"
+
+
+def _tag_rows_sql(p, kind):
+    """SELECT (trade_id, kind, tag) từ cột kind của dòng p (NEW trong trigger / trades)."""
+    column = f"{p}.{kind}"
+    # CASE lồng nhau: json_type() lỗi với JSON hỏng nên chỉ gọi khi json_valid()
+    source = (
+        f"CASE WHEN json_valid({column}) THEN "
+        f"CASE WHEN json_type({column}) = 'array' THEN {column} END END"
+    )
+    tag = f"trim(j.value, {_WHITESPACE})"
+    tables = "" if p == "NEW" else f"{p}, "
+    return (
+        f"SELECT {p}.id, '{kind}', {tag} FROM {tables}json_each({source}) AS j "
+        f"WHERE j.type IN ('text', 'integer', 'real') AND {tag} != ''"
+    )
+
+
+def _insert_tags_sql(p):
+    return " ".join(
+        f"INSERT INTO trade_tags(trade_id, kind, tag) {_tag_rows_sql(p, kind)};"
+        for kind in TAG_KINDS
+    )
+
+
+CREATE_TRADE_TAG_TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_trades_tags_insert AFTER INSERT ON trades
+    BEGIN
+        {_insert_tags_sql("NEW")}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trades_tags_delete AFTER DELETE ON trades
+    BEGIN
+        DELETE FROM trade_tags WHERE trade_id = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_trades_tags_update
+    AFTER UPDATE OF id, {", ".join(TAG_KINDS)} ON trades
+    BEGIN
+        DELETE FROM trade_tags WHERE trade_id = OLD.id;
+        {_insert_tags_sql("NEW")}
+    END
+    """,
+)
+
+# Dựng lại toàn bộ từ bảng trades (backfill / sửa lệch)
+REBUILD_TRADE_TAGS_SQL = ("DELETE FROM trade_tags",) + tuple(
+    f"INSERT INTO trade_tags(trade_id, kind, tag) {_tag_rows_sql('trades', kind)}"
+    for kind in TAG_KINDS
+)
+
+
+def tag_filter_condition(kind):
+    """Điều kiện WHERE trên trades: lệnh có tag = ? (index idx_trade_tags_kind_tag)."""
+    return f"id IN (SELECT trade_id FROM trade_tags WHERE kind = '{kind}' AND tag = ?)"
+
+
+def count_trade_tags(conn, kind, where_sql="", params=()):
+    """
+    Đếm số lần xuất hiện của mỗi tag thuộc kind, trên các trades khớp where_sql
+    (từ build_trade_filters). Output: { "FOMO": 10, "No SL": 3, ... }
+    """
+    sql = "SELECT tag, COUNT(*) FROM trade_tags WHERE kind = ?"
+    if where_sql:
+        sql += f" AND trade_id IN (SELECT id FROM trades{where_sql})"
+    sql += " GROUP BY tag"
+    return dict(conn.execute(sql, (kind, *params)).fetchall())
@@ -1,5 +1,7 @@
+from models.tags import TAG_KINDS, tag_filter_condition
+
 CREATE_TRADES_TABLE_SQL = """
-CREATE TABLE trades(
+CREATE TABLE IF NOT EXISTS trades(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     date TEXT,
     symbol TEXT,
@@ -41,6 +43,107 @@ CREATE TABLE trades(
 )
 """
 
+# Index khớp với các query thực tế: filter = ? + ORDER BY date, id
+# (rowid/id được SQLite tự nối vào cuối mỗi index nên (x, date) cũng cho thứ tự date, id)
+TRADE_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_trades_date_id ON trades(date, id)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_symbol_date ON trades(symbol, date)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_setup_date ON trades(setup, date)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_session_date ON trades(session, date)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_timeframe_date ON trades(timeframe, date)",
+)
+
+
+# Filter dùng chung cho /trades và /stats: query param -> điều kiện SQL
+TRADE_FILTERS = (
+    ("symbol", "symbol = ?"),
+    ("timeframe", "timeframe = ?"),
+    ("session", "session = ?"),
+    ("setup", "setup = ?"),
+    ("from", "date >= ?"),
+    ("to", "date <= ?"),
+)
+
+
+# Filter theo tag (bảng trade_tags, models/tags.py): query param = tên cột tag,
+# vd: ?mistakes=FOMO&confluence=OB
+TRADE_TAG_FILTERS = tuple((kind, tag_filter_condition(kind)) for kind in TAG_KINDS)
+
+
+def build_trade_filters(args):
+    """
+    Build mệnh đề WHERE từ query string (hoặc dict) cho bảng trades.
+    Trả về (where_sql, params); where_sql = "" nếu không có filter.
+    """
+    conditions = []
+    params = []
+    for arg_name, condition in TRADE_FILTERS + TRADE_TAG_FILTERS:
+        value = args.get(arg_name)
+        if value:
+            conditions.append(condition)
+            params.append(value)
+
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+
+# Thứ tự cột của bảng trades (= thứ tự trong dict_trade / SELECT *)
+TRADE_COLUMNS = (
+    "id", "date", "symbol", "setup", "direction",
+    "entry", "sl", "tp", "exit", "capital",
+    "rr", "profit", "profit_pct", "note",
+    "session", "timeframe", "confluence", "grade",
+    "mistakes", "entry_reason", "exit_reason",
+    "htf_bias", "trend_direction", "structure_event",
+    "entry_model", "partial_tp", "be_trigger",
+    "scale_mode", "chart_before", "chart_after",
+    "psychological_tags", "lessons",
+)
+
+
+def parse_trade_fields(raw):
+    """
+    Parse query param fields=a,b,c -> tuple cột hợp lệ (giữ thứ tự, bỏ trùng).
+    None / "" -> None (= tất cả cột). Raise ValueError nếu có cột lạ.
+    """
+    if not raw:
+        return None
+    fields = []
+    for name in raw.split(","):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in TRADE_COLUMNS:
+            raise ValueError(f"Unknown field: {name}")
+        fields.append(name)
+    return tuple(fields) or None
+
+
+# Natural key của lệnh import từ file (migration 5): ticket broker hoặc hash các
+# trường chính. Lệnh nhập tay để NULL nên UNIQUE index không ảnh hưởng.
+ADD_TRADE_IMPORT_KEY_SQL = (
+    "ALTER TABLE trades ADD COLUMN import_key TEXT",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_import_key ON trades(import_key)",
+)
+
+# $ risk (= 1R) dùng lúc tính profit (migration 13): theo instrument_specs + RISK_MODEL
+# (utils/instruments.risk_for), ghi cùng profit. NULL (lệnh chưa đóng / tính trước
+# migration) -> R theo capital x RISK_PERCENT_DEFAULT như trước.
+ADD_TRADE_RISK_AMOUNT_SQL = (
+    "ALTER TABLE trades ADD COLUMN risk_amount REAL",
+)
+
+# Cột được ghi khi import (bỏ id, thêm risk_amount, import_key cuối cùng)
+IMPORT_TRADE_COLUMNS = TRADE_COLUMNS[1:] + ("risk_amount", "import_key")
+
+# OR IGNORE: dòng trùng import_key (đã import trước đó / lặp trong file) bị bỏ qua
+INSERT_IMPORTED_TRADE_SQL = (
+    f"INSERT OR IGNORE INTO trades ({', '.join(IMPORT_TRADE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in IMPORT_TRADE_COLUMNS)})"
+)
+
+
 def dict_trade(r):
     return {
         "id": r[0], "date": r[1], "symbol": r[2], "setup": r[3], "direction": r[4],
@@ -0,0 +1,68 @@
+# models/uploads.py
+"""
+Reference count cho file upload (chart_before / chart_after của trades).
+
+File được lưu theo nội dung (sha256) nên nhiều trade có thể dùng chung 1 file;
+refcount do trigger trên trades cập nhật trong cùng transaction, file chỉ bị
+xóa khi refcount về 0 (utils/upload_store.release_upload).
+"""
+
+CHART_COLUMNS = ("chart_before", "chart_after")
+
+CREATE_UPLOADS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS uploads(
+    name TEXT PRIMARY KEY,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _acquire_sql(p, column):
+    return (
+        f"INSERT INTO uploads(name, refcount) SELECT {p}.{column}, 1 "
+        f"WHERE {p}.{column} IS NOT NULL AND {p}.{column} != '' "
+        f"ON CONFLICT(name) DO UPDATE SET refcount = refcount + 1;"
+    )
+
+
+def _release_sql(p, column):
+    return f"UPDATE uploads SET refcount = refcount - 1 WHERE name = {p}.{column};"
+
+
+CREATE_UPLOAD_REFCOUNT_TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_trades_uploads_insert AFTER INSERT ON trades
+    BEGIN
+        {" ".join(_acquire_sql("NEW", c) for c in CHART_COLUMNS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_trades_uploads_delete AFTER DELETE ON trades
+    BEGIN
+        {" ".join(_release_sql("OLD", c) for c in CHART_COLUMNS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_trades_uploads_update
+    AFTER UPDATE OF {", ".join(CHART_COLUMNS)} ON trades
+    BEGIN
+        {" ".join(_release_sql("OLD", c) for c in CHART_COLUMNS)}
+        {" ".join(_acquire_sql("NEW", c) for c in CHART_COLUMNS)}
+    END
+    """,
+)
+
+# Đếm lại refcount từ bảng trades (backfill / sửa lệch)
+REBUILD_UPLOAD_REFCOUNTS_SQL = (
+    "UPDATE uploads SET refcount = 0",
+    f"""
+    INSERT INTO uploads(name, refcount)
+    SELECT name, COUNT(*) FROM (
+        {" UNION ALL ".join(f"SELECT {c} AS name FROM trades" for c in CHART_COLUMNS)}
+    )
+    WHERE name IS NOT NULL AND name != ''
+    GROUP BY name
+    ON CONFLICT(name) DO UPDATE SET refcount = excluded.refcount
+    """,
+)
@@ -0,0 +1,122 @@
+# routes/instruments.py
+from flask import Blueprint, request, jsonify
+
+from config import RISK_FIXED_AMOUNT, RISK_MODEL, RISK_PERCENT
+from db import get_connection
+from models.instruments import UPSERT_INSTRUMENT_SPEC_SQL, list_instrument_specs
+from utils.http_cache import no_etag
+from utils.instruments import DEFAULT_SPEC, normalize_symbol
+from utils.repricer import get_reprice_state
+
+instruments_bp = Blueprint("instruments", __name__, url_prefix="/api/instruments")
+
+
+def _positive(data, name, required):
+    """Giá trị số > 0 của field name (None nếu không bắt buộc và bỏ trống)."""
+    value = data.get(name)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{name} is required")
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if value <= 0:
+        raise ValueError(f"{name} must be > 0")
+    return value
+
+
+@instruments_bp.get("")
+def get_instruments():
+    """
+    Thông số hợp đồng theo symbol + risk model đang dùng để tính profit.
+    Output:
+      {
+        "risk_model": "percent" | "fixed", "risk_percent": 0.01, "risk_fixed_amount": 100.0,
+        "default": {pip_size, pip_value_per_lot},   # symbol chưa khai báo
+        "instruments": [ {symbol, pip_size, pip_value_per_lot, lot_step, risk_percent}, ... ]
+      }
+    """
+    conn = get_connection()
+    try:
+        return jsonify({
+            "risk_model": RISK_MODEL,
+            "risk_percent": RISK_PERCENT,
+            "risk_fixed_amount": RISK_FIXED_AMOUNT,
+            "default": {
+                "pip_size": DEFAULT_SPEC.pip_size,
+                "pip_value_per_lot": DEFAULT_SPEC.pip_value_per_lot,
+            },
+            "instruments": list_instrument_specs(conn),
+        }), 200
+    finally:
+        conn.close()
+
+
+@instruments_bp.get("/reprice")
+@no_etag
+def get_reprice_progress():
+    """
+    Tiến độ lần re-price gần nhất (flask --app app trades-reprice):
+    {last_id, include_imported, total, scanned, updated, started_at, finished_at}
+    hoặc {} nếu chưa chạy lần nào.
+    """
+    conn = get_connection()
+    try:
+        return jsonify(get_reprice_state(conn) or {}), 200
+    finally:
+        conn.close()
+
+
+@instruments_bp.put("/<symbol>")
+def save_instrument(symbol):
+    """
+    Thêm / sửa thông số 1 symbol.
+    Body: {pip_size, pip_value_per_lot, lot_step?, risk_percent?}
+    Lệnh đã đóng không tự đổi profit: chạy flask --app app trades-reprice.
+    """
+    symbol = normalize_symbol(symbol)
+    data = request.get_json(silent=True) or {}
+    try:
+        values = (
+            symbol,
+            _positive(data, "pip_size", required=True),
+            _positive(data, "pip_value_per_lot", required=True),
+            _positive(data, "lot_step", required=False),
+            _positive(data, "risk_percent", required=False),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_connection()
+    try:
+        conn.execute(UPSERT_INSTRUMENT_SPEC_SQL, values)
+        conn.commit()
+        spec = next(s for s in list_instrument_specs(conn) if s["symbol"] == symbol)
+        return jsonify(spec), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+
+@instruments_bp.delete("/<symbol>")
+def delete_instrument(symbol):
+    """Xóa thông số của symbol (quay về mặc định trong config)."""
+    conn = get_connection()
+    try:
+        cur = conn.execute(
+            "DELETE FROM instrument_specs WHERE symbol = ?", (normalize_symbol(symbol),)
+        )
+        if cur.rowcount == 0:
+            conn.rollback()
+            return jsonify({"error": "Instrument not found"}), 404
+        conn.commit()
+        return jsonify({"message": "Instrument deleted", "symbol": normalize_symbol(symbol)}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
@@ -0,0 +1,90 @@
+# routes/search.py
+import sqlite3
+
+from flask import Blueprint, request, jsonify
+
+from config import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_SNIPPET_TOKENS
+from db import get_connection
+from models.search import build_match_query, search_trades, search_setups
+from models.trades import build_trade_filters
+from utils.pagination import parse_limit
+
+search_bp = Blueprint("search", __name__, url_prefix="/api")
+
+SEARCH_SCOPES = ("all", "trades", "setups")
+
+
+@search_bp.get("/search")
+def search():
+    """
+    Full-text search trên note / lessons / entry_reason / exit_reason của trades
+    và name / context / entry_rules / mistakes của playbook setups (FTS5).
+    Query:
+      - q: text cần tìm (bắt buộc), các từ AND với nhau, từ cuối khớp prefix,
+           không phân biệt dấu ("vao lenh" khớp "vào lệnh")
+      - syntax=fts5 -> q là câu MATCH của FTS5 (OR, NOT, "cụm từ", note:xxx...)
+      - scope: all | trades | setups (mặc định all)
+      - limit: số kết quả tối đa mỗi loại (mặc định SEARCH_DEFAULT_LIMIT)
+      - filter trades như GET /trades: symbol, timeframe, session, setup, from, to,
+        confluence / entry_model / mistakes / psychological_tags
+        (setup cũng lọc setups theo name)
+    Output (liên quan nhất trước, score càng lớn càng liên quan):
+      {
+        "query": "...",
+        "trades": [ {id, date, symbol, setup, direction, profit, score, snippet}, ... ],
+        "setups": [ {id, name, version, score, snippet}, ... ]
+      }
+    snippet: đoạn text quanh từ khớp, từ khớp bọc trong <mark>...</mark>
+    (text gốc đã được escape HTML, render trực tiếp được).
+    syntax=fts5 với filter cột chỉ có ở 1 loại (vd: lessons:xxx) -> loại kia trả [].
+    Ví dụ:
+      /api/search?q=fomo news&symbol=XAUUSD&from=2024-01-01
+      /api/search?q=lessons:(sl OR stop)&syntax=fts5&scope=trades
+    """
+    args = request.args
+    q = (args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+
+    scope = args.get("scope") or "all"
+    if scope not in SEARCH_SCOPES:
+        return jsonify({"error": f"Unknown scope: {scope}"}), 400
+
+    try:
+        limit = parse_limit(args.get("limit"), SEARCH_MAX_LIMIT) or SEARCH_DEFAULT_LIMIT
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    raw_syntax = args.get("syntax") == "fts5"
+    match = q if raw_syntax else build_match_query(q)
+    where_sql, params = build_trade_filters(args)
+    searches = {
+        "trades": lambda conn: search_trades(
+            conn, match, where_sql, params, limit=limit, tokens=SEARCH_SNIPPET_TOKENS
+        ),
+        "setups": lambda conn: search_setups(
+            conn, match, name=args.get("setup"), limit=limit, tokens=SEARCH_SNIPPET_TOKENS
+        ),
+    }
+    if scope != "all":
+        searches = {scope: searches[scope]}
+
+    conn = get_connection()
+    result = {"query": q}
+    errors = []
+    try:
+        for name, run in searches.items():
+            try:
+                result[name] = run(conn)
+            except sqlite3.OperationalError as e:
+                # Cú pháp FTS5 sai / cột không có trong index này (chỉ với syntax=fts5)
+                if not raw_syntax:
+                    raise
+                result[name] = []
+                errors.append(str(e))
+    finally:
+        conn.close()
+
+    if len(errors) == len(searches):
+        return jsonify({"error": f"Invalid search query: {errors[0]}"}), 400
+    return jsonify(result), 200
@@ -1,68 +1,51 @@
 # routes/stats.py
+from datetime import date, datetime, timedelta
+
 from flask import Blueprint, request, jsonify
 
+from config import (
+    STATS_USE_ROLLUPS,
+    STATS_ENGINE,
+    STATS_PERIODS_MAX,
+    MONTE_CARLO_DEFAULT_PATHS,
+    MONTE_CARLO_MAX_PATHS,
+    MONTE_CARLO_MAX_TRADES,
+    MONTE_CARLO_SEED,
+)
 from db import get_connection
-from models.trades import dict_trade
+from models.tags import TAG_KINDS, count_trade_tags
+from models.trades import build_trade_filters, TRADE_COLUMNS
+from utils import trade_stats, columnar_stats
 from utils.trade_stats import (
-    compute_overview_stats,
-    compute_equity_curve,
     compute_grouped_stats,
-    compute_monthly_pnl,
-    compute_mistakes_counts,
     compute_review_package,
+    compute_overview_stats,
+    compute_period_reviews,
+    period_windows,
+    DASHBOARD_SECTIONS,
+    PERIOD_BUCKETS,
+    PIVOT_DIMENSIONS,
+    PIVOT_MAX_DIMS,
+    ROLLING_UNITS,
+    ROLLING_GROUP_KEYS,
+)
+from utils.columnar_stats import load_trade_columns, closed_r_values
+from utils.monte_carlo import MONTE_CARLO_METHODS, run_monte_carlo, parse_thresholds
+from utils.http_cache import no_etag
+from utils.serializer import RowEncoder
+from utils.stats_cache import cached_stats, stats_cache, normalize_args, trades_revision
+from utils.rollup_stats import (
+    rollups_supported,
+    compute_overview_from_rollups,
+    compute_grouped_from_rollups,
+    compute_monthly_pnl_from_rollups,
 )
 
 stats_bp = Blueprint("stats", __name__, url_prefix="/api/stats")
 
 
-def _build_filters_from_request(args):
-    """
-    Dùng chung cho tất cả stats endpoint.
-    Hỗ trợ query string:
-      - symbol
-      - timeframe
-      - session
-      - setup
-      - from (date >=)
-      - to (date <=)
-    """
-    symbol = args.get("symbol")
-    timeframe = args.get("timeframe")
-    session = args.get("session")
-    setup = args.get("setup")
-    date_from = args.get("from")
-    date_to = args.get("to")
-
-    query = "SELECT * FROM trades"
-    conditions = []
-    params = []
-
-    if symbol:
-        conditions.append("symbol = ?")
-        params.append(symbol)
-    if timeframe:
-        conditions.append("timeframe = ?")
-        params.append(timeframe)
-    if session:
-        conditions.append("session = ?")
-        params.append(session)
-    if setup:
-        conditions.append("setup = ?")
-        params.append(setup)
-    if date_from:
-        conditions.append("date >= ?")
-        params.append(date_from)
-    if date_to:
-        conditions.append("date <= ?")
-        params.append(date_to)
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
-    # Với stats & equity curve: nên ORDER BY date, id ASC
-    query += " ORDER BY date ASC, id ASC"
-
-    return query, params
+# Cột của trade dict cho engine Python (thêm risk_amount ngoài TRADE_COLUMNS)
+STATS_TRADE_COLUMNS = TRADE_COLUMNS + ("risk_amount",)
 
 
 def _fetch_trades_with_filters(args):
@@ -73,67 +56,91 @@ def _fetch_trades_with_filters(args):
       - setup
       - session
       - timeframe
-    Trả về list[dict_trade]
+    Trả về list dict (key của dict_trade + risk_amount cho R-multiple,
+    dựng theo tên cột của cursor)
     """
-    conn = get_connection()
-    cur = conn.cursor()
-
-    query = "SELECT * FROM trades WHERE 1=1"
-    params = []
-
-    date_from = args.get("from")
-    date_to = args.get("to")
-    symbol = args.get("symbol")
-    setup = args.get("setup")
-    session = args.get("session")
-    timeframe = args.get("timeframe")
-
-    if date_from:
-        query += " AND date >= ?"
-        params.append(date_from)
-    if date_to:
-        query += " AND date <= ?"
-        params.append(date_to)
-    if symbol:
-        query += " AND symbol = ?"
-        params.append(symbol)
-    if setup:
-        query += " AND setup = ?"
-        params.append(setup)
-    if session:
-        query += " AND session = ?"
-        params.append(session)
-    if timeframe:
-        query += " AND timeframe = ?"
-        params.append(timeframe)
+    where_sql, params = build_trade_filters(args)
 
     # Có thể bỏ backtest tại đây nếu bạn có cột type:
     # query += " AND (type IS NULL OR type != 'backtest')"
 
-    query += " ORDER BY date ASC, id ASC"
+    # Với stats & equity curve: ORDER BY date, id ASC
+    query = "SELECT * FROM trades" + where_sql + " ORDER BY date ASC, id ASC"
 
+    conn = get_connection()
+    cur = conn.cursor()
     cur.execute(query, params)
+    encoder = RowEncoder.from_cursor(cur, STATS_TRADE_COLUMNS)
     rows = cur.fetchall()
     conn.close()
 
-    return [dict_trade(r) for r in rows]
+    return encoder.objects(rows)
+
+
+# Engine NumPy (dạng cột) nếu được bật và đã cài numpy
+_USE_COLUMNAR = STATS_ENGINE != "python" and columnar_stats.NUMPY_AVAILABLE
+
+
+def _load_stats_data(args):
+    """
+    Load trades cho các endpoint tính stats, trả về (engine, data):
+      - engine NumPy: (columnar_stats, TradeColumns)
+      - engine Python: (trade_stats, list[dict_trade])
+    Hai engine có cùng tên hàm compute_* và cùng output.
+    """
+    if _USE_COLUMNAR:
+        where_sql, params = build_trade_filters(args)
+        return columnar_stats, load_trade_columns(get_connection(), where_sql, params)
+    return trade_stats, _fetch_trades_with_filters(args)
+
+
+def _use_rollups(args):
+    """Không filter ngày -> trả lời từ trade_rollups (O(số nhóm))."""
+    return STATS_USE_ROLLUPS and rollups_supported(args)
+
+
+def _grouped_stats_response(group_key):
+    if _use_rollups(request.args):
+        grouped = compute_grouped_from_rollups(get_connection(), request.args, group_key)
+    else:
+        engine, trades = _load_stats_data(request.args)
+        grouped = engine.compute_grouped_stats(trades, group_key=group_key)
+    return jsonify(grouped), 200
+
+
+def _int_arg(args, name, default, low, high):
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < low or value > high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
 
 
 # === OVERVIEW STATS ===
 @stats_bp.get("/overview")
+@cached_stats
 def stats_overview():
     """
     Tổng quan:
       - winrate, expectancy, net_r, max_drawdown, v.v.
     Hỗ trợ filter như /trades.
     """
-    trades = _fetch_trades_with_filters(request.args)
-    stats = compute_overview_stats(trades)
+    if _use_rollups(request.args):
+        return jsonify(compute_overview_from_rollups(get_connection(), request.args)), 200
+
+    engine, trades = _load_stats_data(request.args)
+    stats = engine.compute_overview_stats(trades)
     return jsonify(stats), 200
 
 
 # === EQUITY CURVE ===
 @stats_bp.get("/equity-curve")
+@cached_stats
 def stats_equity_curve():
     """
     Equity curve theo R, dùng vẽ chart:
@@ -142,13 +149,14 @@ def stats_equity_curve():
         ...
       ]
     """
-    trades = _fetch_trades_with_filters(request.args)
-    curve = compute_equity_curve(trades)
+    engine, trades = _load_stats_data(request.args)
+    curve = engine.compute_equity_curve(trades)
     return jsonify(curve), 200
 
 
 # === BY SETUP ===
 @stats_bp.get("/by-setup")
+@cached_stats
 def stats_by_setup():
     """
     Stats theo từng setup:
@@ -161,56 +169,94 @@ def stats_by_setup():
         ...
       ]
     """
-    trades = _fetch_trades_with_filters(request.args)
-    grouped = compute_grouped_stats(trades, group_key="setup")
-    return jsonify(grouped), 200
+    return _grouped_stats_response("setup")
 
 
 # === BY SESSION ===
 @stats_bp.get("/by-session")
+@cached_stats
 def stats_by_session():
     """
     Stats theo từng session (Asia / London / NewYork ...).
     """
-    trades = _fetch_trades_with_filters(request.args)
-    grouped = compute_grouped_stats(trades, group_key="session")
-    return jsonify(grouped), 200
+    return _grouped_stats_response("session")
 
 
 # === BY TIMEFRAME ===
 @stats_bp.get("/by-timeframe")
+@cached_stats
 def stats_by_timeframe():
     """
     Stats theo timeframe (M15, H1, H4, D1...).
     """
-    trades = _fetch_trades_with_filters(request.args)
-    grouped = compute_grouped_stats(trades, group_key="timeframe")
-    return jsonify(grouped), 200
+    return _grouped_stats_response("timeframe")
+
+
 # === MONTHLY PNL ===
 @stats_bp.get("/monthly-pnl")
+@cached_stats
 def stats_monthly_pnl():
     """
     P&L theo tháng (YYYY-MM), dùng cho chart MonthlyPnL.
     """
-    trades = _fetch_trades_with_filters(request.args)
-    monthly = compute_monthly_pnl(trades)
+    if _use_rollups(request.args):
+        return jsonify(compute_monthly_pnl_from_rollups(get_connection(), request.args)), 200
+
+    engine, trades = _load_stats_data(request.args)
+    monthly = engine.compute_monthly_pnl(trades)
     return jsonify(monthly), 200
 
 
 # === MISTAKES ANALYSIS ===
 @stats_bp.get("/mistakes")
+@cached_stats
 def stats_mistakes():
     """
     Đếm tần suất mistakes, dùng cho MistakesAnalysis (doughnut chart).
     Output dạng:
       { "FOMO": 10, "No SL": 3, ... }
+    GROUP BY trên bảng trade_tags (không parse JSON từng lệnh).
+    """
+    where_sql, params = build_trade_filters(request.args)
+    return jsonify(count_trade_tags(get_connection(), "mistakes", where_sql, params)), 200
+
+
+# === TAG COUNTS ===
+@stats_bp.get("/tags")
+@cached_stats
+def stats_tags():
     """
-    trades = _fetch_trades_with_filters(request.args)
-    mistakes_counts = compute_mistakes_counts(trades)
-    return jsonify(mistakes_counts), 200
+    Đếm tần suất tag của 1 cột tag (cùng filter với các endpoint stats khác).
+    Query:
+      - kind: confluence | entry_model | mistakes | psychological_tags (mặc định mistakes)
+    Output: { "OB": 12, "FVG": 7, ... }
+    Ví dụ:
+      /api/stats/tags?kind=confluence&setup=OB
+      /api/stats/tags?kind=psychological_tags&mistakes=FOMO
+    """
+    kind = request.args.get("kind") or "mistakes"
+    if kind not in TAG_KINDS:
+        return jsonify({"error": f"Unknown tag kind: {kind}"}), 400
+    where_sql, params = build_trade_filters(request.args)
+    return jsonify(count_trade_tags(get_connection(), kind, where_sql, params)), 200
 
 # === REVIEW (TUẦN / THÁNG / CUSTOM) ===
+def _review_window(window_args):
+    """
+    (review package, setup stats) cho 1 khoảng thời gian + filter.
+    Cache theo từng khoảng: kỳ "previous" của tháng này chính là kỳ "current"
+    của lần xem tháng trước.
+    """
+    def compute():
+        trades = _fetch_trades_with_filters(window_args)
+        return compute_review_package(trades), compute_grouped_stats(trades, group_key="setup")
+
+    key = ("review_window", normalize_args(window_args))
+    return stats_cache.get_or_compute(key, trades_revision(), compute)
+
+
 @stats_bp.get("/review")
+@cached_stats
 def stats_review():
     """
     Review cho một khoảng thời gian:
@@ -225,9 +271,8 @@ def stats_review():
     date_from = args.get("from")
     date_to = args.get("to")
 
-    # trades kỳ hiện tại
-    trades_current = _fetch_trades_with_filters(args)
-    current = compute_review_package(trades_current)
+    # kỳ hiện tại
+    current, setup_stats = _review_window(args)
 
     previous = None
     prev_from_str = None
@@ -259,13 +304,10 @@ def stats_review():
                 **{k: v for k, v in base_filters.items() if v},
             }
 
-            trades_previous = _fetch_trades_with_filters(prev_args)
-            previous = compute_review_package(trades_previous)
+            previous, _ = _review_window(prev_args)
         except Exception:
             previous = None
 
-    setup_stats = compute_grouped_stats(trades_current, group_key="setup")
-
     return jsonify(
         {
             "current": current,
@@ -281,11 +323,210 @@ def stats_review():
     ), 200
 
 
+@stats_bp.get("/periods")
+@no_etag
+def stats_periods():
+    """
+    Review (overview, best/worst trade, win streak) cho N kỳ gần nhất trong
+    1 request: 1 query cho cả khoảng, chia kỳ trong 1 lần duyệt.
+      /stats/periods?bucket=month&count=12
+    Query:
+      - bucket: week | month (mặc định month, tuần bắt đầu thứ Hai)
+      - count: số kỳ (mặc định 12)
+      - to: ngày thuộc kỳ cuối (YYYY-MM-DD, mặc định hôm nay)
+      - filter như /trades (symbol, setup, session, timeframe, tag...);
+        from bị bỏ qua (khoảng do bucket / count / to quyết định)
+    Output:
+      {
+        "bucket": "month",
+        "range": {"from": ..., "to": ...},
+        "periods": [ {period, from, to, overview, best_trade, worst_trade, win_streak}, ... ]  # cũ -> mới
+      }
+    Mỗi kỳ cho cùng kết quả với /stats/review?from=...&to=... của kỳ đó.
+    Không dùng ETag / cached_stats: kỳ mặc định phụ thuộc ngày hiện tại.
+    """
+    args = request.args
+    bucket = args.get("bucket") or "month"
+    if bucket not in PERIOD_BUCKETS:
+        return jsonify({"error": f"Unknown bucket: {bucket}"}), 400
+    try:
+        count = _int_arg(args, "count", 12, 1, STATS_PERIODS_MAX)
+        anchor = date.fromisoformat(args["to"]) if args.get("to") else date.today()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    windows = period_windows(bucket, count, anchor)
+    window_args = {k: v for k, v in args.items() if k not in ("from", "to", "bucket", "count")}
+    window_args.update({"from": windows[0]["from"], "to": windows[-1]["to"]})
+
+    def compute():
+        return compute_period_reviews(_fetch_trades_with_filters(window_args), windows)
+
+    key = ("periods", bucket, normalize_args(window_args))
+    periods = stats_cache.get_or_compute(key, trades_revision(), compute)
+    return jsonify(
+        {
+            "bucket": bucket,
+            "range": {"from": windows[0]["from"], "to": windows[-1]["to"]},
+            "periods": periods,
+        }
+    ), 200
+
+
 @stats_bp.get("/by-grade")
+@cached_stats
 def stats_by_grade():
     """
     Group theo grade (A/B/C...) để xem quality process.
     """
-    trades = _fetch_trades_with_filters(request.args)
-    grouped = compute_grouped_stats(trades, "grade")  # dùng positional, không dùng key=
-    return jsonify(grouped), 200
\ No newline at end of file
+    return _grouped_stats_response("grade")
+
+# === DASHBOARD BUNDLE ===
+@stats_bp.get("/dashboard")
+@cached_stats
+def stats_dashboard():
+    """
+    Toàn bộ stats cho Dashboard trong 1 request (1 lần query + 1 lần duyệt trades):
+      /stats/dashboard?from=...&to=...&sections=overview,equity_curve
+    - sections (tùy chọn): danh sách section cách nhau bởi dấu phẩy,
+      mặc định trả về tất cả: overview, equity_curve, by_setup, by_session,
+      by_timeframe, by_grade, monthly_pnl, mistakes
+    Hỗ trợ filter như /trades.
+    """
+    raw_sections = request.args.get("sections")
+    if raw_sections:
+        sections = [s.strip() for s in raw_sections.split(",") if s.strip()]
+        unknown = [s for s in sections if s not in DASHBOARD_SECTIONS]
+        if unknown:
+            return jsonify({"error": f"Unknown sections: {', '.join(unknown)}"}), 400
+    else:
+        sections = list(DASHBOARD_SECTIONS)
+
+    engine, trades = _load_stats_data(request.args)
+    bundle = engine.compute_dashboard_stats(trades, sections)
+    return jsonify(bundle), 200
+
+
+# === PIVOT (NHIỀU CHIỀU) ===
+_PIVOT_SORT_KEYS = tuple(compute_overview_stats([]).keys())
+
+
+@stats_bp.get("/pivot")
+@cached_stats
+def stats_pivot():
+    """
+    Bảng pivot: stats cho mọi ô theo tổ hợp dims + các tổng biên, 1 lần duyệt.
+    Query:
+      - dims=setup,session,direction (bắt buộc, tối đa PIVOT_MAX_DIMS chiều)
+        chiều hợp lệ: setup, session, timeframe, grade, symbol, direction, month
+      - sort=net_r (key bất kỳ của overview), order=desc|asc
+      - limit=N -> top N cho cells và từng margin
+      - filter như /trades
+    """
+    args = request.args
+    dims = [d.strip() for d in (args.get("dims") or "").split(",") if d.strip()]
+    if not dims:
+        return jsonify({"error": "dims is required"}), 400
+    unknown = [d for d in dims if d not in PIVOT_DIMENSIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown dims: {', '.join(unknown)}"}), 400
+    if len(set(dims)) != len(dims) or len(dims) > PIVOT_MAX_DIMS:
+        return jsonify({"error": f"dims must be 1-{PIVOT_MAX_DIMS} distinct dimensions"}), 400
+
+    sort = args.get("sort") or "net_r"
+    if sort not in _PIVOT_SORT_KEYS:
+        return jsonify({"error": f"Unknown sort: {sort}"}), 400
+    order = args.get("order") or "desc"
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be asc or desc"}), 400
+    try:
+        limit = _int_arg(args, "limit", None, 1, 10000)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    engine, trades = _load_stats_data(args)
+    pivot = engine.compute_pivot_stats(
+        trades, dims, sort=sort, descending=(order == "desc"), limit=limit
+    )
+    return jsonify(pivot), 200
+
+
+# === ROLLING (CỬA SỔ TRƯỢT) ===
+@stats_bp.get("/rolling")
+@cached_stats
+def stats_rolling():
+    """
+    Chỉ số trên cửa sổ trượt để phát hiện edge suy giảm (1 lần duyệt, O(n)).
+    Query:
+      - window=N (mặc định 20), unit=trades|days (N lệnh / N ngày gần nhất)
+      - group_by=setup|session|timeframe|grade|symbol|direction -> 1 series / nhóm
+      - min_trades=K: chỉ trả điểm khi cửa sổ có >= K lệnh
+        (mặc định: N với unit=trades, 1 với unit=days)
+      - filter như /trades
+    """
+    args = request.args
+    unit = args.get("unit") or "trades"
+    if unit not in ROLLING_UNITS:
+        return jsonify({"error": "unit must be trades or days"}), 400
+    group_key = args.get("group_by") or None
+    if group_key is not None and group_key not in ROLLING_GROUP_KEYS:
+        return jsonify({"error": f"Unknown group_by: {group_key}"}), 400
+    try:
+        window = _int_arg(args, "window", 20, 1, 10000)
+        min_trades = _int_arg(args, "min_trades", None, 1, 10000)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    engine, trades = _load_stats_data(args)
+    rolling = engine.compute_rolling_stats(
+        trades, window, unit=unit, group_key=group_key, min_trades=min_trades
+    )
+    return jsonify(rolling), 200
+
+
+# === MONTE CARLO ===
+@stats_bp.get("/monte-carlo")
+@cached_stats
+def stats_monte_carlo():
+    """
+    Monte Carlo equity (R) từ các lệnh đã đóng khớp filter (như /trades).
+    Query (tùy chọn):
+      - paths=1000 (số đường, tối đa MONTE_CARLO_MAX_PATHS)
+      - trades=N (số lệnh / đường, mặc định = số lệnh thực tế)
+      - method=bootstrap|shuffle
+      - seed=12345 (cùng seed -> cùng kết quả)
+      - ruin=10,20,50 (ngưỡng risk-of-ruin theo R)
+    Trả về: steps + bands (p5..p95), max_drawdown_r, final_equity_r, risk_of_ruin.
+    """
+    if not columnar_stats.NUMPY_AVAILABLE:
+        return jsonify({"error": "Monte Carlo requires numpy"}), 501
+
+    args = request.args
+    method = args.get("method") or "bootstrap"
+    if method not in MONTE_CARLO_METHODS:
+        return jsonify({"error": f"Unknown method: {method}"}), 400
+    try:
+        paths = _int_arg(args, "paths", MONTE_CARLO_DEFAULT_PATHS, 1, MONTE_CARLO_MAX_PATHS)
+        n_trades = _int_arg(args, "trades", None, 1, MONTE_CARLO_MAX_TRADES)
+        seed = _int_arg(args, "seed", MONTE_CARLO_SEED, 0, 2**63 - 1)
+        thresholds = parse_thresholds(args.get("ruin"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    where_sql, params = build_trade_filters(args)
+    r = closed_r_values(load_trade_columns(get_connection(), where_sql, params))
+    if n_trades is None:
+        n_trades = min(len(r), MONTE_CARLO_MAX_TRADES)
+
+    result = run_monte_carlo(
+        r, paths, n_trades=n_trades, method=method, seed=seed, ruin_thresholds=thresholds
+    )
+    return jsonify(result), 200
+
+
+# === STATS CACHE COUNTERS ===
+@stats_bp.get("/cache")
+@no_etag
+def stats_cache_info():
+    """Hit / miss / eviction counters của cache stats trong process."""
+    return jsonify(stats_cache.stats()), 200
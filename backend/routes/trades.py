@@ -1,23 +1,90 @@
 # routes/trades.py
-from flask import Blueprint, request, jsonify, send_from_directory
-import json
+from flask import (
+    Blueprint,
+    Response,
+    request,
+    jsonify,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
 import os
 
-from config import UPLOAD_FOLDER
+from config import BULK_MAX_OPERATIONS, UPLOAD_FOLDER, UPLOAD_CACHE_MAX_AGE
 from db import get_connection
-from models.trades import dict_trade
+from models.trades import (
+    dict_trade,
+    build_trade_filters,
+    parse_trade_fields,
+    TRADE_COLUMNS,
+)
 from utils.files import save_upload
+from utils.images import (
+    CHART_URL_FIELDS,
+    add_chart_urls,
+    remove_derivatives,
+    schedule_derivatives,
+    split_derivative_name,
+)
 from utils.json_helpers import to_json_list
-from utils.risk import calculate_profit_and_pct
+from utils.pagination import parse_limit, encode_cursor, decode_cursor
+from utils.risk import calculate_rr
+from utils.serializer import RowEncoder
+from utils.instruments import load_instrument_specs, price_exit, risk_for, spec_for
+from utils.trade_bulk import (
+    apply_bulk,
+    review_values,
+    UPDATE_EXIT_SQL,
+    UPDATE_REVIEW_SQL,
+)
+from utils.trade_export import export_chunks, EXPORT_FORMATS
+from utils.trade_import import import_trades, IMPORT_FORMATS
+from utils.upload_store import (
+    is_content_addressed,
+    release_upload,
+    upload_path,
+    upload_relpath,
+)
 
 trades_bp = Blueprint("trades", __name__, url_prefix="/api")
 
 
 # === GET ALL / FILTERED TRADES ===
+def _fetch_trades_page(cur, columns, where_sql, params, cursor, limit):
+    """
+    Keyset pagination theo (date DESC, id DESC), trả về tối đa limit + 1 rows
+    (dòng thừa để biết còn trang sau).
+
+    Khi sort DESC, SQLite để date NULL ở cuối và (date, id) < (?, ?) luôn loại
+    dòng NULL, nên sau khi hết các dòng có date sẽ lấy tiếp nhóm date IS NULL.
+    """
+    select_sql = f"SELECT {', '.join(columns)} FROM trades{where_sql}"
+    joiner = " AND " if where_sql else " WHERE "
+    order_sql = " ORDER BY date DESC, id DESC LIMIT ?"
+    want = limit + 1
+
+    def run(condition, extra_params, n):
+        sql = select_sql + (joiner + condition if condition else "") + order_sql
+        cur.execute(sql, (*params, *extra_params, n))
+        return cur.fetchall()
+
+    if cursor is None:
+        return run("", [], want)
+
+    cursor_date, cursor_id = cursor
+    if cursor_date is None:
+        return run("date IS NULL AND id < ?", [cursor_id], want)
+
+    rows = run("(date, id) < (?, ?)", [cursor_date, cursor_id], want)
+    if len(rows) < want:
+        rows += run("date IS NULL", [], want - len(rows))
+    return rows
+
+
 @trades_bp.get("/trades")
 def get_trades():
     """
-    Trả về list trades.
+    Trả về list trades (mới nhất trước).
     Hỗ trợ filter basic qua query string (tùy chọn):
       - symbol
       - timeframe
@@ -25,51 +92,77 @@ def get_trades():
       - setup
       - from (date >=)
       - to (date <=)
+      - confluence / entry_model / mistakes / psychological_tags (lệnh có tag này)
+    Phân trang / projection (tùy chọn):
+      - fields=id,date,symbol,... -> chỉ SELECT các cột này
+      - limit=N -> keyset pagination, header X-Next-Cursor (+ Link rel="next")
+        chứa cursor của trang kế tiếp
+      - cursor=... -> lấy trang sau cursor
+      - count=1 -> header X-Total-Count (tổng số trades khớp filter)
+      - shape=rows -> {"columns": [...], "rows": [[...], ...]} thay vì list object
+        (nhỏ hơn, encode nhanh hơn cho bảng lớn)
     Ví dụ:
       /api/trades?symbol=EURUSD&session=London&from=2024-01-01&to=2024-12-31
+      /api/trades?limit=100&fields=id,date,symbol,profit
+      /api/trades?fields=id,date,profit&shape=rows
     """
-    symbol = request.args.get("symbol")
-    timeframe = request.args.get("timeframe")
-    session = request.args.get("session")
-    setup = request.args.get("setup")
-    date_from = request.args.get("from")
-    date_to = request.args.get("to")
-
-    query = "SELECT * FROM trades"
-    conditions = []
-    params = []
-
-    if symbol:
-        conditions.append("symbol = ?")
-        params.append(symbol)
-    if timeframe:
-        conditions.append("timeframe = ?")
-        params.append(timeframe)
-    if session:
-        conditions.append("session = ?")
-        params.append(session)
-    if setup:
-        conditions.append("setup = ?")
-        params.append(setup)
-    if date_from:
-        conditions.append("date >= ?")
-        params.append(date_from)
-    if date_to:
-        conditions.append("date <= ?")
-        params.append(date_to)
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-
-    query += " ORDER BY date DESC, id DESC"
+    args = request.args
+    try:
+        fields = parse_trade_fields(args.get("fields"))
+        limit = parse_limit(args.get("limit"))
+        cursor = decode_cursor(args["cursor"]) if args.get("cursor") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if cursor is not None and limit is None:
+        return jsonify({"error": "cursor requires limit"}), 400
+
+    shape = args.get("shape", "objects")
+    if shape not in ("objects", "rows"):
+        return jsonify({"error": "shape must be objects or rows"}), 400
+
+    where_sql, params = build_trade_filters(args)
+    output_fields = fields or TRADE_COLUMNS
+    # id + date luôn được SELECT để tạo cursor
+    columns = list(output_fields) + [c for c in ("id", "date") if c not in output_fields]
 
     conn = get_connection()
     c = conn.cursor()
-    c.execute(query, tuple(params))
-    rows = c.fetchall()
+
+    if limit is None:
+        c.execute(
+            f"SELECT {', '.join(columns)} FROM trades{where_sql} ORDER BY date DESC, id DESC",
+            tuple(params),
+        )
+        rows = c.fetchall()
+        next_cursor = None
+    else:
+        rows = _fetch_trades_page(c, columns, where_sql, params, cursor, limit)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([last[columns.index("date")], last[columns.index("id")]])
+
+    total = None
+    if args.get("count") in ("1", "true"):
+        c.execute(f"SELECT COUNT(*) FROM trades{where_sql}", tuple(params))
+        total = c.fetchone()[0]
     conn.close()
 
-    return jsonify([dict_trade(r) for r in rows]), 200
+    encoder = RowEncoder(columns, output_fields, CHART_URL_FIELDS)
+    payload = encoder.arrays(rows) if shape == "rows" else encoder.objects(rows)
+    response = jsonify(payload)
+
+    if next_cursor:
+        next_args = args.to_dict()
+        next_args.pop("count", None)
+        next_args["cursor"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{url_for("trades.get_trades", **next_args)}>; rel="next"'
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response, 200
 
 
 # === ADD TRADE ===
@@ -95,7 +188,7 @@ def add_trade():
     capital = float(data.get("capital") or 0)
 
     # Tính RR (risk:reward)
-    rr = abs((tp - entry) / (entry - sl)) if entry != sl and sl != 0 else 0
+    rr = calculate_rr(entry, sl, tp)
 
     conn = get_connection()
     c = conn.cursor()
@@ -156,7 +249,92 @@ def add_trade():
         conn.close()
 
 
+# === EXPORT (CSV / NDJSON, STREAMING) ===
+@trades_bp.get("/trades/export")
+def export_trades():
+    """
+    Export trades dạng stream (chunked), cùng filter + fields với GET /trades,
+    thứ tự mới nhất trước.
+      - format=csv|ndjson (mặc định csv)
+      - gzip=1 -> file .gz (nén dạng stream)
+    Ví dụ:
+      /api/trades/export?format=ndjson&symbol=EURUSD&gzip=1
+    """
+    args = request.args
+    fmt = args.get("format") or "csv"
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown export format: {fmt}"}), 400
+    try:
+        columns = parse_trade_fields(args.get("fields")) or TRADE_COLUMNS
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    gzip = args.get("gzip") in ("1", "true")
+
+    where_sql, params = build_trade_filters(args)
+    sql = f"SELECT {', '.join(columns)} FROM trades{where_sql} ORDER BY date DESC, id DESC"
+
+    def generate():
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, tuple(params))
+            yield from export_chunks(cur, columns, fmt, gzip=gzip)
+        finally:
+            conn.close()
+
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    filename = f"trades.{ext}"
+    if gzip:
+        mimetype, filename = "application/gzip", filename + ".gz"
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# === BULK IMPORT (CSV / MT4 / MT5) ===
+@trades_bp.post("/trades/import")
+def import_trades_file():
+    """
+    Import hàng loạt trades từ file (multipart field "file").
+    Form (tùy chọn):
+      - format=auto|csv|mt4|mt5 (mặc định auto: nhận dạng theo header)
+      - capital=... vốn dùng khi file không có cột capital (MT4 / MT5)
+    Trả về report: rows / inserted / duplicates / duplicate_rows / skipped / error_count / errors.
+    """
+    file = request.files.get("file")
+    if not file or file.filename == "":
+        return jsonify({"error": "No file"}), 400
+
+    fmt = request.form.get("format") or "auto"
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": f"Unknown import format: {fmt}"}), 400
+    try:
+        capital = float(request.form.get("capital") or 0)
+    except ValueError:
+        return jsonify({"error": "capital must be a number"}), 400
+
+    conn = get_connection()
+    try:
+        report = import_trades(conn, file.stream, fmt=fmt, default_capital=capital)
+        return jsonify(report), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+
 # === UPLOAD CHART AFTER ===
+def _release_chart(conn, filename):
+    """Bỏ 1 tham chiếu tới chart (sau commit); không còn trade nào dùng thì xóa file."""
+    if not release_upload(conn, filename):
+        return False
+    remove_derivatives(filename)
+    return True
+
+
 @trades_bp.post("/trades/<int:trade_id>/chart-after")
 def upload_chart_after(trade_id):
     if "chart_after" not in request.files:
@@ -170,13 +348,18 @@ def upload_chart_after(trade_id):
     conn = get_connection()
     c = conn.cursor()
     try:
+        c.execute("SELECT chart_after FROM trades WHERE id = ?", (trade_id,))
+        previous = c.fetchone()
         c.execute(
             "UPDATE trades SET chart_after = ? WHERE id = ?", (filename, trade_id)
         )
         conn.commit()
+        # Chart cũ bị thay thế
+        if previous and previous[0] != filename:
+            _release_chart(conn, previous[0])
         c.execute("SELECT * FROM trades WHERE id = ?", (trade_id,))
         row = c.fetchone()
-        return jsonify(dict_trade(row)), 200
+        return jsonify(add_chart_urls(dict_trade(row))), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
@@ -188,8 +371,8 @@ def upload_chart_after(trade_id):
 def delete_chart_after(trade_id):
     """
     Xóa chart_after của trade.
-    - Xóa file trên server
     - Cập nhật DB: chart_after = NULL
+    - Xóa file trên server nếu không còn trade nào dùng chung
     - Trả về trade đã cập nhật
     """
     conn = get_connection()
@@ -203,23 +386,17 @@ def delete_chart_after(trade_id):
 
         current_filename = row[0]
 
-        # Xóa file nếu tồn tại
-        if current_filename:
-            filepath = os.path.join(UPLOAD_FOLDER, current_filename)
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-            except Exception as e:
-                print(f"[DELETE CHART_AFTER] Cannot remove file {current_filename}: {e}")
-
         # Cập nhật DB
         c.execute("UPDATE trades SET chart_after = NULL WHERE id = ?", (trade_id,))
         conn.commit()
 
+        # Xóa file nếu refcount về 0
+        _release_chart(conn, current_filename)
+
         # Trả về trade mới
         c.execute("SELECT * FROM trades WHERE id = ?", (trade_id,))
         updated_row = c.fetchone()
-        return jsonify(dict_trade(updated_row)), 200
+        return jsonify(add_chart_urls(dict_trade(updated_row))), 200
 
     except Exception as e:
         conn.rollback()
@@ -243,26 +420,15 @@ def delete_trade(id):
 
         chart_before, chart_after = row
 
-        def safe_remove(filename):
-            if not filename:
-                return False
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                    return True
-            except Exception as e:
-                print(f"[DELETE] Cannot remove {filename}: {e}")
-            return False
-
-        before_ok = safe_remove(chart_before)
-        after_ok = safe_remove(chart_after)
-
         c.execute("DELETE FROM trades WHERE id = ?", (id,))
         if c.rowcount == 0:
             return jsonify({"error": "Trade not deleted"}), 500
 
         conn.commit()
+
+        # File chart chỉ bị xóa khi không còn trade nào dùng chung
+        before_ok = _release_chart(conn, chart_before)
+        after_ok = _release_chart(conn, chart_after)
         return (
             jsonify(
                 {
@@ -296,7 +462,7 @@ def update_exit(id):
     try:
         c.execute(
             """
-            SELECT entry, direction, capital, sl, tp
+            SELECT symbol, entry, direction, capital, sl, tp
             FROM trades WHERE id = ?
         """,
             (id,),
@@ -305,33 +471,16 @@ def update_exit(id):
         if not row:
             return jsonify({"error": "Trade not found"}), 404
 
-        entry, direction, capital, sl, tp = row
-
-        profit, profit_pct = calculate_profit_and_pct(
-            exit_price=exit_price,
-            entry=entry,
-            direction=direction,
-            capital=capital,
-            sl=sl,
-            tp=tp,
-            risk_percent=0.01,       # có thể chuyển sang config
-            pip_multiplier=10000,    # 4-digit broker
-            pip_value_per_lot=10.0,  # $/pip cho 1 lot
-        )
+        symbol, entry, direction, capital, sl, tp = row
 
-        c.execute(
-            """
-            UPDATE trades
-            SET exit = ?, profit = ?, profit_pct = ?
-            WHERE id = ?
-        """,
-            (exit_price, profit, profit_pct, id),
-        )
+        spec = spec_for(load_instrument_specs(conn), symbol)
+        profit, profit_pct = price_exit(spec, exit_price, entry, direction, capital, sl, tp)
+        c.execute(UPDATE_EXIT_SQL, (exit_price, profit, profit_pct, risk_for(spec, capital), id))
         conn.commit()
 
         c.execute("SELECT * FROM trades WHERE id = ?", (id,))
         updated = c.fetchone()
-        return jsonify(dict_trade(updated)), 200
+        return jsonify(add_chart_urls(dict_trade(updated))), 200
 
     except Exception as e:
         conn.rollback()
@@ -340,57 +489,107 @@ def update_exit(id):
         conn.close()
 
 
+# === BULK EXIT / REVIEW / DELETE ===
+@trades_bp.post("/trades/bulk")
+def bulk_update_trades():
+    """
+    Nhiều thao tác exit / review / delete trong 1 request + 1 transaction
+    (vd: đóng và chấm điểm các lệnh cuối ngày).
+    Body:
+      {
+        "operations": [
+          {"op": "exit", "id": 12, "exit": 1.0875},
+          {"op": "review", "id": 12, "grade": "A", "mistakes": [...], "note": "...", ...},
+          {"op": "delete", "id": 13}
+        ]
+      }
+    - exit: như POST /update_exit/<id>; review: như PATCH /trades/<id>
+      (field thiếu bị ghi đè rỗng); delete: như DELETE /trades/<id>
+    - Thao tác được áp dụng theo thứ tự; thao tác lỗi bị bỏ qua, phần còn lại
+      vẫn được ghi.
+    Output:
+      {
+        "results": [
+          {"index": 0, "op": "exit", "id": 12, "status": 200, "exit": ..., "profit": ..., "profit_pct": ...},
+          {"index": 1, "op": "review", "id": 12, "status": 200},
+          {"index": 2, "op": "delete", "id": 13, "status": 404, "error": "Trade not found"}
+        ],
+        "applied": 2,
+        "failed": 1
+      }
+    Delete thành công có thêm files_removed {chart_before, chart_after}.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > BULK_MAX_OPERATIONS:
+        return jsonify({"error": f"Too many operations (max {BULK_MAX_OPERATIONS})"}), 400
+
+    conn = get_connection()
+    try:
+        results, released = apply_bulk(conn, operations)
+        # File chart chỉ bị xóa khi không còn trade nào dùng chung
+        for result, chart_before, chart_after in released:
+            result["files_removed"] = {
+                "chart_before": _release_chart(conn, chart_before),
+                "chart_after": _release_chart(conn, chart_after),
+            }
+        applied = sum(1 for r in results if r["status"] == 200)
+        failed = len(results) - applied
+        return jsonify({"results": results, "applied": applied, "failed": failed}), 200
+    except Exception as e:
+        print(f"[BULK ERROR] {e}")
+        return jsonify({"error": "Server error"}), 500
+    finally:
+        conn.close()
+
+
 # === SERVE UPLOADS ===
 @trades_bp.route("/uploads/<filename>")
 def uploaded_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    """
+    File upload + bản phái sinh (abc.png.thumb.webp...).
+    - Tên file không bao giờ đổi nội dung -> Cache-Control immutable 1 năm,
+      ETag (sha256 với file theo nội dung), hỗ trợ If-None-Match và Range (206).
+    - Bản phái sinh chưa có (đang tạo / chưa backfill) -> trả file gốc, không
+      cache lâu, và xếp lịch tạo.
+    """
+    original, size = split_derivative_name(filename)
+    if size and not os.path.isfile(upload_path(filename)):
+        schedule_derivatives(original)
+        response = send_from_directory(UPLOAD_FOLDER, upload_relpath(original), max_age=0)
+        response.cache_control.no_cache = True
+        return response
+
+    etag = filename.split(".", 1)[0] if is_content_addressed(filename) else True
+    response = send_from_directory(
+        UPLOAD_FOLDER,
+        upload_relpath(filename),
+        max_age=UPLOAD_CACHE_MAX_AGE,
+        etag=etag,
+        conditional=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 
 # === UPDATE REVIEW ===
 @trades_bp.patch("/trades/<int:id>")
 def update_trade_review(id):
     data = request.get_json() or {}
-    grade = data.get("grade")
-    exit_reason = data.get("exit_reason", "")
-    note = data.get("note", "")
-    lessons = data.get("lessons", "")
-
-    mistakes = data.get("mistakes", [])
-    psych_tags = data.get("psychological_tags", [])
-
-    # Normalize list -> JSON string
-    mistakes_json = json.dumps(mistakes) if isinstance(mistakes, list) else "[]"
-    psych_tags_json = (
-        json.dumps(psych_tags) if isinstance(psych_tags, list) else "[]"
-    )
-
     conn = get_connection()
     c = conn.cursor()
     try:
-        c.execute(
-            """
-            UPDATE trades SET
-                grade = ?, mistakes = ?, exit_reason = ?,
-                note = ?, psychological_tags = ?, lessons = ?
-            WHERE id = ?
-        """,
-            (
-                grade,
-                mistakes_json,
-                exit_reason,
-                note,
-                psych_tags_json,
-                lessons,
-                id,
-            ),
-        )
+        c.execute(UPDATE_REVIEW_SQL, (*review_values(data), id))
         conn.commit()
 
         c.execute("SELECT * FROM trades WHERE id = ?", (id,))
         row = c.fetchone()
         if not row:
             return jsonify({"error": "Not found"}), 404
-        return jsonify(dict_trade(row)), 200
+        return jsonify(add_chart_urls(dict_trade(row))), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,64 @@
+# tests/conftest.py
+"""
+Chạy trong thư mục backend/:  python -m pytest -q tests
+
+DB test là file tạm riêng (TRADE_DB_PATH đặt trước khi import config),
+không đụng vào instance/trade_manager.db.
+"""
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix="trade_manager_tests_")
+os.environ["TRADE_DB_PATH"] = os.path.join(_db_dir, "trades.db")
+
+from app import create_app  # noqa: E402
+from db import get_connection  # noqa: E402
+
+
+def _sample_trades():
+    """Lệnh mẫu: có / không chart, lệnh mở (NULL), text non-ASCII, số thực lẻ."""
+    rows = []
+    for i in range(40):
+        closed = i % 7 != 0
+        rows.append((
+            f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            ("EURUSD", "XAUUSD", "NAS100")[i % 3],
+            ("OB", "FVG", None)[i % 3],
+            "long" if i % 2 else "short",
+            1.0853 + i / 1000, 1.0821, 1.0917, 1.0899 if closed else 0,
+            10000.0, 2.0,
+            round((i - 17) * 13.37, 2) if closed else None,
+            round((i - 17) * 0.1337, 4) if closed else None,
+            "chờ retest, stop loss bị quét" if i % 4 == 0 else "",
+            json.dumps(["FOMO", "Dời SL"][: i % 3]),
+            f"{i:04x}.png" if i % 3 == 0 else None,
+            f"after-{i}.webp" if i % 5 == 0 else None,
+        ))
+    return rows
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO trades (date, symbol, setup, direction, entry, sl, tp, exit, "
+        "capital, rr, profit, profit_pct, note, mistakes, chart_before, chart_after) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _sample_trades(),
+    )
+    conn.commit()
+    conn.close()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
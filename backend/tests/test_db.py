@@ -0,0 +1,32 @@
+# tests/test_db.py
+"""
+Connection theo thread được giữ qua các request (chỉ rollback ở teardown),
+đóng khi thread kết thúc.
+"""
+import threading
+
+import db
+from db import get_connection
+
+
+def test_connection_kept_across_requests(client):
+    conn = get_connection()
+    conn.execute("UPDATE trades SET note = note WHERE id = 1")
+    assert conn.in_transaction
+
+    for _ in range(2):
+        assert client.get("/api/trades?limit=1").status_code == 200
+        # Teardown: transaction dở bị rollback, connection vẫn là cái cũ
+        assert get_connection() is conn
+        assert not conn.in_transaction
+    assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_connection_closed_on_thread_exit():
+    opened = []
+    thread = threading.Thread(target=lambda: opened.append(get_connection()))
+    thread.start()
+    thread.join()
+
+    assert opened and opened[0] is not get_connection()
+    assert opened[0] not in db._open_connections
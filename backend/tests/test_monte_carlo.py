@@ -0,0 +1,23 @@
+# tests/test_monte_carlo.py
+"""Ngưỡng risk-of-ruin (ruin=...) phải là số hữu hạn > 0."""
+import pytest
+
+from utils.columnar_stats import NUMPY_AVAILABLE
+from utils.monte_carlo import parse_thresholds
+
+
+@pytest.mark.parametrize("raw", ["nan", "inf", "10,-inf", "0", "-5", "10,abc"])
+def test_parse_thresholds_rejects_invalid(raw):
+    with pytest.raises(ValueError):
+        parse_thresholds(raw)
+
+
+def test_parse_thresholds_values():
+    assert parse_thresholds("") == [10.0, 20.0, 50.0]
+    assert parse_thresholds("5, 12.5") == [5.0, 12.5]
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy is not installed")
+@pytest.mark.parametrize("raw", ["nan", "inf"])
+def test_monte_carlo_rejects_non_finite_ruin(client, raw):
+    assert client.get(f"/api/stats/monte-carlo?paths=10&ruin={raw}").status_code == 400
@@ -0,0 +1,71 @@
+# tests/test_r_multiple.py
+"""
+R-multiple của stats dùng đúng $ risk lúc tính profit (trades.risk_amount):
+risk_percent riêng của symbol -> 1 lệnh đóng đúng SL = -1R ở mọi engine.
+"""
+import pytest
+
+from db import get_connection
+from routes.stats import _fetch_trades_with_filters
+from utils import columnar_stats, trade_stats
+from utils.columnar_stats import load_trade_columns
+from utils.rollup_stats import compute_overview_from_rollups, verify_rollups
+
+SYMBOL = "GBPJPY"
+FILTER = {"symbol": SYMBOL}
+
+
+@pytest.fixture
+def spec(client):
+    response = client.put(f"/api/instruments/{SYMBOL}", json={
+        "pip_size": 0.01, "pip_value_per_lot": 6.5, "risk_percent": 0.02,
+    })
+    assert response.status_code == 200
+    yield
+    assert client.delete(f"/api/instruments/{SYMBOL}").status_code == 200
+
+
+def _add(client, conn, date):
+    response = client.post("/api/trades", data={
+        "date": date, "symbol": SYMBOL, "direction": "long",
+        "entry": "190.00", "sl": "189.50", "tp": "191.00", "capital": "10000",
+    })
+    assert response.status_code == 201
+    return conn.execute("SELECT MAX(id) FROM trades").fetchone()[0]
+
+
+def _overviews(conn):
+    trades = _fetch_trades_with_filters(FILTER)
+    overviews = [
+        trade_stats.compute_overview_stats(trades),
+        compute_overview_from_rollups(conn, FILTER),
+    ]
+    if columnar_stats.NUMPY_AVAILABLE:
+        cols = load_trade_columns(conn, " WHERE symbol = ?", [SYMBOL])
+        overviews.append(columnar_stats.compute_overview_stats(cols))
+    return overviews
+
+
+def test_r_uses_risk_amount_from_pricing(app, client, spec):
+    with app.app_context():
+        conn = get_connection()
+        ids = []
+        try:
+            ids = [_add(client, conn, "2019-02-01"), _add(client, conn, "2019-02-02")]
+            # Thắng 2R rồi thua đúng SL
+            for trade_id, exit_price in zip(ids, (191.00, 189.50)):
+                response = client.post(f"/api/update_exit/{trade_id}", json={"exit": exit_price})
+                assert response.status_code == 200
+
+            rows = conn.execute(
+                "SELECT profit, risk_amount FROM trades WHERE id IN (?, ?) ORDER BY id", ids
+            ).fetchall()
+            assert rows == [(400.0, 200.0), (-200.0, 200.0)]
+
+            for overview in _overviews(conn):
+                assert (overview["net_r"], overview["max_drawdown_r"]) == (1.0, 1.0)
+            assert verify_rollups(conn) == []
+        finally:
+            for trade_id in ids:
+                client.delete(f"/api/trades/{trade_id}")
+            conn.close()
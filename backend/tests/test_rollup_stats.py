@@ -0,0 +1,154 @@
+# tests/test_rollup_stats.py
+"""
+Max drawdown của rollup_stats (trạng thái giữ trong process, chỉ đọc lại tail)
+khớp với tính lại từ đầu bằng trade_stats sau mọi kiểu ghi qua API.
+"""
+import pytest
+
+from db import get_connection
+from models.revisions import get_revisions
+from models.rollups import TRADES_HISTORY_REVISION
+from routes.stats import _fetch_trades_with_filters
+from utils.rollup_stats import (
+    clear_drawdown_cache,
+    compute_grouped_from_rollups,
+    compute_overview_from_rollups,
+)
+from utils.trade_stats import compute_grouped_stats, compute_overview_stats
+
+FILTERS = ({}, {"symbol": "EURUSD"}, {"setup": "OB", "session": "London"})
+GROUPS = ("setup", "symbol", "grade")
+
+
+def _assert_drawdowns_match(conn):
+    for args in FILTERS:
+        trades = _fetch_trades_with_filters(args)
+        expected = compute_overview_stats(trades)["max_drawdown_r"]
+        assert compute_overview_from_rollups(conn, args)["max_drawdown_r"] == expected, args
+        for group_key in GROUPS:
+            expected = {
+                g["key"]: g["stats"]["max_drawdown_r"]
+                for g in compute_grouped_stats(trades, group_key=group_key)
+            }
+            actual = {
+                g["key"]: g["stats"]["max_drawdown_r"]
+                for g in compute_grouped_from_rollups(conn, args, group_key)
+            }
+            assert actual == expected, (args, group_key)
+
+
+def _history_revision(conn):
+    return get_revisions(conn, (TRADES_HISTORY_REVISION,))[TRADES_HISTORY_REVISION]
+
+
+def _scans(conn, fn):
+    """Câu SELECT ... FROM trades (trừ câu tìm đầu tail) mà fn() chạy."""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if "FROM trades" in s and "LIMIT 1" not in s]
+
+
+class Journal:
+    """Ghi lệnh qua API như frontend (add_trade lưu lệnh mở với exit = profit = 0)."""
+
+    def __init__(self, client, conn):
+        self.client = client
+        self.conn = conn
+
+    def add(self, date, symbol="EURUSD", setup="OB", direction="long"):
+        response = self.client.post("/api/trades", data={
+            "date": date, "symbol": symbol, "setup": setup, "direction": direction,
+            "entry": "1.1000", "sl": "1.0950", "tp": "1.1100", "capital": "10000",
+            "session": "London",
+        })
+        assert response.status_code == 201
+        return self.conn.execute("SELECT MAX(id) FROM trades").fetchone()[0]
+
+    def close(self, trade_id, exit_price):
+        response = self.client.post(f"/api/update_exit/{trade_id}", json={"exit": exit_price})
+        assert response.status_code == 200
+
+    def review(self, trade_id, **fields):
+        response = self.client.patch(f"/api/trades/{trade_id}", json=fields)
+        assert response.status_code == 200
+
+    def delete(self, trade_id):
+        assert self.client.delete(f"/api/trades/{trade_id}").status_code == 200
+
+
+@pytest.fixture
+def conn(app):
+    clear_drawdown_cache()
+    with app.app_context():
+        conn = get_connection()
+        yield conn
+        conn.close()
+
+
+@pytest.fixture
+def journal(client, conn):
+    return Journal(client, conn)
+
+
+def _step(conn, write, bumps_history):
+    before = _history_revision(conn)
+    result = write()
+    assert (_history_revision(conn) != before) == bumps_history
+    _assert_drawdowns_match(conn)
+    return result
+
+
+def test_drawdowns_follow_api_writes(conn, journal):
+    _assert_drawdowns_match(conn)
+
+    # Journal hằng ngày: thêm, đóng, review lệnh cuối -> chỉ tail đổi
+    last = _step(conn, lambda: journal.add("2026-01-05"), False)
+    _step(conn, lambda: journal.close(last, 1.0920), False)
+    _step(conn, lambda: journal.review(last, grade=4, mistakes=["FOMO"]), False)
+    _step(conn, lambda: journal.close(last, 1.0980), False)  # sửa exit lệnh cuối
+
+    older = _step(conn, lambda: journal.add("2026-01-06", symbol="XAUUSD", setup="FVG"), False)
+    newer = _step(conn, lambda: journal.add("2026-01-07"), False)
+    _step(conn, lambda: journal.close(newer, 1.1100), False)
+    # older giờ nằm trước lệnh đã đóng cuối cùng
+    _step(conn, lambda: journal.close(older, 1.0900), True)
+    _step(conn, lambda: journal.review(older, grade=2), True)
+    _step(conn, lambda: journal.review(older, grade=2, note="đóng sớm"), False)
+
+    # Lệnh mở ở cuối: thêm / xóa không ảnh hưởng lịch sử
+    pending = _step(conn, lambda: journal.add("2026-02-01"), False)
+    _step(conn, lambda: journal.delete(pending), False)
+
+    # Thêm lệnh lùi ngày, xóa lệnh đã đóng cuối cùng -> đọc lại từ đầu
+    _step(conn, lambda: journal.add("2023-05-01", setup="BOS"), True)
+    _step(conn, lambda: journal.delete(newer), True)
+    _step(conn, lambda: journal.review(older, grade=5), False)  # older là lệnh đóng cuối
+
+
+def test_unchanged_trades_read_no_rows(conn):
+    compute_overview_from_rollups(conn, {})
+    assert not _scans(conn, lambda: compute_overview_from_rollups(conn, {}))
+
+
+def test_closing_and_reviewing_last_trade_reads_only_tail(conn, journal):
+    trade_id = journal.add("2030-01-01")
+    compute_overview_from_rollups(conn, {})
+    before = _history_revision(conn)
+
+    for write in (
+        lambda: journal.close(trade_id, 1.1050),
+        lambda: journal.review(trade_id, grade=3, note="chờ retest"),
+    ):
+        write()
+        scans = _scans(conn, lambda: compute_overview_from_rollups(conn, {}))
+        assert len(scans) == 1 and "(date, id) >" in scans[0]
+        # tail lúc lưu trạng thái: (lệnh đã đóng cuối cùng trước đó,) trade_id
+        ids = [r[-1] for r in conn.execute(scans[0]).fetchall()]
+        assert ids[-1] == trade_id and len(ids) <= 2
+
+    assert _history_revision(conn) == before
+    _assert_drawdowns_match(conn)
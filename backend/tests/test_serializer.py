@@ -0,0 +1,148 @@
+# tests/test_serializer.py
+"""
+utils/serializer.py cho cùng kết quả với cách cũ:
+  - RowEncoder.objects() == dict_trade (+ projection fields, + chart URL)
+  - arrays() / shape=rows == dạng object
+  - AppJSONProvider.encode: stdlib giống hệt jsonify, orjson cùng giá trị JSON
+"""
+import json
+from datetime import date, datetime
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from db import get_connection
+from models.trades import TRADE_COLUMNS, dict_trade
+from routes.stats import _fetch_trades_with_filters
+from utils import serializer
+from utils.images import CHART_URL_FIELDS, add_chart_urls
+from utils.serializer import ORJSON_AVAILABLE, RowEncoder
+
+FIELD_SETS = [
+    None,
+    ("id", "date", "symbol", "profit"),
+    ("profit",),  # 1 cột: _project không dùng itemgetter
+    ("chart_after", "symbol", "chart_before"),
+    ("note", "mistakes", "chart_before"),
+]
+
+
+def _rows(sql="SELECT * FROM trades ORDER BY date DESC, id DESC"):
+    conn = get_connection()
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def _expected(rows, fields):
+    """Payload kiểu cũ: dict_trade -> chọn fields -> add_chart_urls."""
+    fields = fields or TRADE_COLUMNS
+    out = []
+    for r in rows:
+        trade = dict_trade(r)
+        out.append(add_chart_urls({f: trade[f] for f in fields}))
+    return out
+
+
+def _route_encoder(fields):
+    """Giống GET /api/trades: SELECT fields + id, date (cho cursor)."""
+    output_fields = fields or TRADE_COLUMNS
+    columns = list(output_fields) + [c for c in ("id", "date") if c not in output_fields]
+    rows = _rows(f"SELECT {', '.join(columns)} FROM trades ORDER BY date DESC, id DESC")
+    return RowEncoder(columns, output_fields, CHART_URL_FIELDS), rows
+
+
+@pytest.mark.parametrize("fields", FIELD_SETS)
+def test_objects_match_dict_trade(app, fields):
+    with app.test_request_context():
+        encoder, rows = _route_encoder(fields)
+        assert encoder.objects(rows) == _expected(_rows(), fields)
+
+
+@pytest.mark.parametrize("fields", FIELD_SETS)
+def test_arrays_match_objects(app, fields):
+    with app.test_request_context():
+        encoder, rows = _route_encoder(fields)
+        arrays = encoder.arrays(rows)
+        rebuilt = [dict(zip(arrays["columns"], values)) for values in arrays["rows"]]
+        assert rebuilt == encoder.objects(rows)
+
+
+def test_arrays_identity_returns_rows(app):
+    rows = _rows("SELECT * FROM trades")
+    columns = TRADE_COLUMNS + ("import_key", "risk_amount")
+    encoder = RowEncoder(columns)
+    assert encoder.arrays(rows) == {"columns": list(columns), "rows": rows}
+    assert encoder.arrays(iter(rows))["rows"] == rows
+
+
+def test_stats_loader_matches_dict_trade(app):
+    with app.app_context():
+        trades = _fetch_trades_with_filters({})
+    expected = [
+        {**dict_trade(r), "risk_amount": r[-1]}
+        for r in _rows("SELECT *, risk_amount FROM trades ORDER BY date ASC, id ASC")
+    ]
+    assert trades == expected
+
+
+@pytest.mark.parametrize("fields", FIELD_SETS)
+def test_get_trades_shapes_match(app, client, fields):
+    query = f"fields={','.join(fields)}" if fields else ""
+    objects = client.get(f"/api/trades?{query}")
+    arrays = client.get(f"/api/trades?{query}&shape=rows")
+    assert objects.status_code == arrays.status_code == 200
+
+    with app.test_request_context():
+        assert objects.get_json() == json.loads(json.dumps(_expected(_rows(), fields)))
+    body = arrays.get_json()
+    assert [dict(zip(body["columns"], values)) for values in body["rows"]] == objects.get_json()
+
+
+def test_get_trades_rejects_unknown_shape(client):
+    assert client.get("/api/trades?shape=table").status_code == 400
+
+
+# === AppJSONProvider ===
+PAYLOADS = [
+    {"win_rate": 41.67, "profit_factor": 1.2345678901234567, "max_drawdown": -1234.5},
+    {"equity": [0.1 + 0.2, 1e16, 1e-7, -0.0, 123456789.125], "count": 0},
+    {"note": "chờ retest — stop loss bị quét", "tags": ["FOMO", "Dời SL"]},
+    {"nested": {"b": [1, None, True], "a": {"z": "", "y": [[]]}}},
+    {"date": date(2024, 3, 5), "at": datetime(2024, 3, 5, 10, 15, 22)},
+    {"big": 2 ** 70, "small": -(2 ** 63)},  # orjson không encode được -> stdlib
+    [{"id": 1, "profit": None}, {"id": 2, "profit": -12.5}],
+]
+
+
+@pytest.fixture
+def provider(app, monkeypatch):
+    def make(use_orjson):
+        monkeypatch.setattr(serializer, "_USE_ORJSON", use_orjson)
+        return app.json
+    return make
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_stdlib_encode_matches_jsonify(app, provider, payload):
+    encoded = provider(False).encode(payload)
+    with app.app_context():
+        previous = DefaultJSONProvider(app).response(payload).get_data()
+    assert encoded + b"\n" == previous
+
+
+@pytest.mark.skipif(not ORJSON_AVAILABLE, reason="orjson is not installed")
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_orjson_encode_matches_stdlib_values(provider, payload):
+    stdlib = provider(False).encode(payload)
+    fast = provider(True).encode(payload)
+    assert json.loads(fast) == json.loads(stdlib)
+
+
+@pytest.mark.skipif(not ORJSON_AVAILABLE, reason="orjson is not installed")
+def test_orjson_encode_trades_payload(app, provider):
+    with app.test_request_context():
+        encoder, rows = _route_encoder(None)
+        for payload in (encoder.objects(rows), encoder.arrays(rows)):
+            assert json.loads(provider(True).encode(payload)) == json.loads(provider(False).encode(payload))
@@ -0,0 +1,15 @@
+# tests/test_trade_bulk.py
+"""POST /api/trades/bulk: lỗi không mong đợi không lộ chi tiết ra response."""
+import routes.trades
+
+
+def test_bulk_server_error_is_generic(client, monkeypatch, capsys):
+    def fail(conn, operations):
+        raise RuntimeError("disk I/O error at /var/lib/secret.db")
+
+    monkeypatch.setattr(routes.trades, "apply_bulk", fail)
+    response = client.post("/api/trades/bulk", json={"operations": [{"op": "delete", "id": 1}]})
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Server error"}
+    assert "[BULK ERROR] disk I/O error" in capsys.readouterr().out
@@ -0,0 +1,64 @@
+# tests/test_trade_import.py
+"""
+Import không có ticket: scale-in / re-entry giống nhau vẫn được ghi đủ,
+import lại cùng file không tạo trùng và liệt kê dòng trùng trong report.
+"""
+import io
+
+import pytest
+
+from db import get_connection
+
+CSV = (
+    "date,symbol,direction,entry,sl,tp,exit,capital,size\n"
+    "2031-03-02 09:15,EURUSD,long,1.1,1.095,1.11,1.105,10000,1\n"
+    "2031-03-02 09:15,EURUSD,long,1.1,1.095,1.11,1.105,10000,1\n"  # scale-in cùng giá
+    "2031-03-02 09:15,EURUSD,long,1.1,1.095,1.11,1.105,10000,0.5\n"
+    "2031-03-02 14:40,EURUSD,long,1.1,1.095,1.11,1.105,10000,1\n"  # re-entry cùng ngày
+)
+
+
+def _import(client, text):
+    response = client.post(
+        "/api/trades/import",
+        data={"file": (io.BytesIO(text.encode("utf-8")), "history.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.fixture
+def cleanup(app):
+    yield
+    with app.app_context():
+        conn = get_connection()
+        conn.execute("DELETE FROM trades WHERE date = '2031-03-02'")
+        conn.commit()
+        conn.close()
+
+
+def _imported(app):
+    with app.app_context():
+        conn = get_connection()
+        try:
+            return conn.execute(
+                "SELECT import_key FROM trades WHERE date = '2031-03-02' ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+
+def test_reimport_keeps_scale_ins_and_reports_duplicates(app, client, cleanup):
+    report = _import(client, CSV)
+    assert (report["rows"], report["inserted"], report["duplicates"]) == (4, 4, 0)
+    assert report["duplicate_rows"] == []
+    keys = [k for (k,) in _imported(app)]
+    assert len(set(keys)) == 4 and keys[1] == keys[0] + "#2"
+
+    report = _import(client, CSV)
+    assert (report["inserted"], report["duplicates"]) == (0, 4)
+    assert report["duplicate_rows"] == [
+        {"line": line, "import_key": key} for line, key in zip(range(2, 6), keys)
+    ]
+    assert len(_imported(app)) == 4
@@ -0,0 +1,228 @@
+# utils/asgi.py
+"""
+Chạy Flask app (WSGI) dưới ASGI server (uvicorn, hypercorn...) mà không cần
+thư viện ngoài: cùng blueprints, hooks (ETag, metrics, stats cache) và JSON
+contract, chỉ khác cách phục vụ kết nối.
+
+- Event loop giữ các kết nối (hàng trăm client chờ không tốn thread).
+- Body request (upload chart, import) được đọc bất đồng bộ vào
+  SpooledTemporaryFile trước khi giao cho Flask: client upload chậm không
+  giữ worker thread. Body vượt max_body_bytes thì dừng đọc, Flask trả 413.
+- Flask (SQLite, stats) chạy trong thread pool có giới hạn (max_workers).
+  Mỗi request nằm trọn trong 1 thread: connection SQLite theo thread (db.py),
+  thread-local của metrics và generator của response stream không bị đổi thread.
+- Response có Content-Length (JSON...) được gom trong worker rồi event loop
+  gửi; response stream (export) được gửi từ chính worker đó (chờ từng chunk
+  gửi xong -> có backpressure); file (send_file / uploads) được event loop
+  đọc từng chunk qua thread pool (wsgi.file_wrapper).
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FileWrapper:
+    """wsgi.file_wrapper: file của send_file, được ASGIBridge đọc không chặn event loop."""
+
+    def __init__(self, file, buffer_size=8192):
+        self.file = file
+        self.buffer_size = buffer_size
+
+    def __iter__(self):
+        while True:
+            chunk = self.file.read(self.buffer_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def _unsupported_write(data):
+    raise NotImplementedError("write() callable of start_response is not supported")
+
+
+class ASGIBridge:
+    """ASGI app bọc 1 WSGI app (Flask) -> asgi.create_asgi_app()."""
+
+    def __init__(
+        self,
+        wsgi_app,
+        max_workers: int = 16,
+        max_body_bytes=None,
+        spool_bytes: int = 1024 * 1024,
+        file_chunk_bytes: int = 64 * 1024,
+    ):
+        self.wsgi_app = wsgi_app
+        self.max_body_bytes = max_body_bytes
+        self.spool_bytes = spool_bytes
+        self.file_chunk_bytes = file_chunk_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi-worker")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = await self._read_body(scope, receive)
+        if body is None:
+            return  # client ngắt kết nối khi đang gửi body
+        stream, length = body
+
+        loop = asyncio.get_running_loop()
+        try:
+            environ = self._build_environ(scope, stream, length)
+            result = await loop.run_in_executor(self.executor, self._run_wsgi, environ, loop, send)
+        finally:
+            stream.close()
+
+        if result is None:
+            return  # response stream đã được gửi từ worker
+        status, headers, content = result
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if isinstance(content, FileWrapper):
+            await self._send_file(loop, content, send)
+        else:
+            await send({"type": "http.response.body", "body": content})
+
+    # === REQUEST ===
+    def _declared_length(self, scope):
+        for name, value in scope.get("headers", ()):
+            if name.lower() == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    async def _read_body(self, scope, receive):
+        """(file body, độ dài) hoặc None nếu client ngắt kết nối."""
+        stream = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        limit = self.max_body_bytes
+        declared = self._declared_length(scope)
+        if limit is not None and declared is not None and declared > limit:
+            # Không đọc body: Flask thấy Content-Length quá lớn và trả 413
+            return stream, declared
+
+        loop = asyncio.get_running_loop()
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                stream.close()
+                return None
+            chunk = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not chunk:
+                continue
+            if size + len(chunk) > self.spool_bytes:
+                # Đã / sắp ghi ra file tạm: ghi đĩa trong thread, không chặn event loop
+                await loop.run_in_executor(None, stream.write, chunk)
+            else:
+                stream.write(chunk)
+            size += len(chunk)
+            if limit is not None and size > limit:
+                break  # phần còn lại bị bỏ, Flask trả 413 theo độ dài đã đọc
+        stream.seek(0)
+        return stream, size
+
+    def _build_environ(self, scope, stream, length):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1] or 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "CONTENT_LENGTH": str(length),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": stream,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": FileWrapper,
+        }
+        for name, value in scope.get("headers", ()):
+            key = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if key == "CONTENT_LENGTH":
+                continue  # = độ dài body thật đã đọc
+            if key != "CONTENT_TYPE":
+                key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    # === RESPONSE ===
+    def _run_wsgi(self, environ, loop, send):
+        """
+        (worker thread) Gọi Flask. Trả về (status, headers, bytes | FileWrapper)
+        để event loop gửi, hoặc None nếu đã tự gửi response stream.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return _unsupported_write
+
+        app_iter = self.wsgi_app(environ, start_response)
+        if isinstance(app_iter, FileWrapper):
+            return started["status"], started["headers"], app_iter
+
+        try:
+            if any(name == b"content-length" for name, _ in started["headers"]):
+                return started["status"], started["headers"], b"".join(app_iter)
+
+            # Response stream: gửi từ thread này, chờ từng chunk được gửi xong
+            def push(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            push({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+            for chunk in app_iter:
+                if chunk:
+                    push({"type": "http.response.body", "body": chunk, "more_body": True})
+            push({"type": "http.response.body", "body": b""})
+            return None
+        finally:
+            close = getattr(app_iter, "close", None)
+            if close is not None:
+                close()
+
+    async def _send_file(self, loop, wrapper, send):
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, wrapper.file.read, self.file_chunk_bytes)
+                if not chunk:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            wrapper.close()
+
+    # === LIFESPAN ===
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,432 @@
+# utils/columnar_stats.py
+"""
+Engine stats dạng cột (NumPy) cho dataset lớn (vd: 500k+ lệnh backtest).
+
+- Load các cột cần thiết từ cursor 1 lần (không tạo dict_trade cho từng dòng).
+- Các hàm có cùng tên / output với utils/trade_stats.py:
+    compute_overview_stats, compute_equity_curve, compute_grouped_stats,
+    compute_monthly_pnl, compute_mistakes_counts, compute_dashboard_stats,
+    compute_pivot_stats, compute_rolling_stats
+- Kết quả giống hệt engine Python:
+    + tổng float dùng cumsum / bincount (cộng tuần tự đúng thứ tự như sum())
+    + round 2 chữ số khớp round() của Python (xem _round2)
+
+NumPy là dependency tùy chọn: NUMPY_AVAILABLE = False nếu chưa cài.
+"""
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy là tùy chọn
+    np = None
+
+from utils.trade_stats import (
+    RISK_PERCENT_DEFAULT,
+    DASHBOARD_SECTIONS,
+    StatsAccumulator,
+    _DASHBOARD_GROUP_KEYS,
+    _grouped_result,
+    _iter_mistakes,
+    _pivot_result,
+    _rolling_result,
+    pivot_subsets,
+    _safe_float,
+)
+
+NUMPY_AVAILABLE = np is not None
+
+# Cột text dùng làm group key / output
+_TEXT_COLUMNS = ("date", "symbol", "setup", "session", "timeframe", "grade", "direction", "mistakes")
+_NUMERIC_COLUMNS = ("capital", "profit", "profit_pct", "risk_amount")
+
+COLUMNS_SELECT_SQL = (
+    f"SELECT id, {', '.join(_TEXT_COLUMNS + _NUMERIC_COLUMNS)} FROM trades"
+)
+
+
+def _float_column(values) -> "np.ndarray":
+    """None -> 0.0; fallback _safe_float nếu cột có giá trị lạ (text...)."""
+    try:
+        arr = np.array(values, dtype=float)
+        return np.where(np.isnan(arr), 0.0, arr)
+    except (TypeError, ValueError):
+        return np.fromiter((_safe_float(v, 0.0) for v in values), dtype=float, count=len(values))
+
+
+class TradeColumns:
+    """
+    Trades dạng cột.
+      - id: int64, capital / profit / profit_pct / risk_amount: float64 (None -> 0.0)
+      - closed: bool (profit IS NOT NULL)
+      - date / symbol / setup / ...: list Python (giữ nguyên giá trị gốc)
+    """
+
+    def __init__(self, ids, text_columns: Dict[str, list], capital, profit, profit_pct, risk_amount,
+                 closed, time_ordered: bool = False):
+        self.ids = ids
+        self.text = text_columns
+        self.capital = capital
+        self.profit = profit
+        self.profit_pct = profit_pct
+        self.risk_amount = risk_amount
+        self.closed = closed
+        # True nếu các dòng đã theo đúng thứ tự (date or "", id)
+        self.time_ordered = time_ordered
+        self._time_rank = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def time_rank(self) -> "np.ndarray":
+        """Thứ hạng của từng dòng theo (date or "", id), tính 1 lần."""
+        if self._time_rank is None:
+            dates = np.array([d or "" for d in self.text["date"]], dtype=str)
+            perm = np.lexsort((self.ids, dates))
+            rank = np.empty(len(perm), dtype=np.int64)
+            rank[perm] = np.arange(len(perm))
+            self._time_rank = rank
+        return self._time_rank
+
+    @classmethod
+    def from_rows(cls, rows, sql_ordered: bool = False) -> "TradeColumns":
+        """
+        rows: tuple theo thứ tự COLUMNS_SELECT_SQL.
+        sql_ordered: rows đã ORDER BY date, id -> chỉ lệch thứ tự Python khi có
+        cả date NULL lẫn date '' (SQL xếp NULL trước, Python coi cả hai là "").
+        """
+        if not rows:
+            empty = np.zeros(0)
+            return cls(
+                np.zeros(0, dtype=np.int64),
+                {c: [] for c in _TEXT_COLUMNS},
+                empty, empty, empty, empty, np.zeros(0, dtype=bool), True,
+            )
+
+        # List comprehension theo cột nhanh hơn zip(*rows) với vài trăm nghìn dòng
+        cols = [[r[i] for r in rows] for i in range(len(rows[0]))]
+        ids = np.array(cols[0], dtype=np.int64)
+        text = {name: cols[i + 1] for i, name in enumerate(_TEXT_COLUMNS)}
+        capital_raw, profit_raw, pct_raw, risk_raw = cols[len(_TEXT_COLUMNS) + 1:]
+        closed = np.array([p is not None for p in profit_raw], dtype=bool)
+        dates = text["date"]
+        time_ordered = sql_ordered and not (None in dates and "" in dates)
+        return cls(
+            ids,
+            text,
+            _float_column(capital_raw),
+            _float_column(profit_raw),
+            _float_column(pct_raw),
+            _float_column(risk_raw),
+            closed,
+            time_ordered,
+        )
+
+    @classmethod
+    def from_trades(cls, trades: List[Dict[str, Any]]) -> "TradeColumns":
+        """Từ list dict_trade (tiện để so sánh với engine Python)."""
+        keys = ("id",) + _TEXT_COLUMNS + _NUMERIC_COLUMNS
+        return cls.from_rows([tuple(t.get(k) for k in keys) for t in trades])
+
+
+def load_trade_columns(conn, where_sql: str = "", params=()) -> TradeColumns:
+    cur = conn.cursor()
+    cur.execute(COLUMNS_SELECT_SQL + where_sql + " ORDER BY date ASC, id ASC", params)
+    return TradeColumns.from_rows(cur.fetchall(), sql_ordered=True)
+
+
+# === HELPERS ===
+def _round2(values: "np.ndarray") -> "np.ndarray":
+    """
+    round(x, 2) giống Python cho cả mảng.
+    np.round chỉ có thể khác round() khi x*100 sát biên .5 -> các phần tử đó
+    được round lại bằng Python.
+    """
+    out = np.round(values, 2)
+    scaled = values * 100.0
+    dist = np.abs(scaled - np.floor(scaled) - 0.5)
+    tol = 1e-6 + np.abs(scaled) * 1e-13
+    for i in np.flatnonzero(dist < tol):
+        out[i] = round(float(values[i]), 2)
+    return out
+
+
+def _seq_sum(values: "np.ndarray") -> float:
+    """Tổng cộng tuần tự (khớp sum() của Python, khác np.sum dùng pairwise)."""
+    if len(values) == 0:
+        return 0.0
+    return float(np.cumsum(values)[-1])
+
+
+def _r_values(cols: TradeColumns, risk_percent: float) -> "np.ndarray":
+    """Như trade_stats.r_multiple: profit / risk_amount, chưa có thì capital x risk_percent."""
+    stored = cols.risk_amount > 0
+    risk_amount = np.where(stored, cols.risk_amount, cols.capital * risk_percent)
+    valid = stored | ((cols.capital > 0) & (risk_percent > 0) & (risk_amount != 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(valid, cols.profit / np.where(valid, risk_amount, 1.0), 0.0)
+    return r
+
+
+def _time_order(cols: TradeColumns, idx: "np.ndarray") -> "np.ndarray":
+    """Sắp xếp idx (tăng dần) theo (date or "", id) như compute_equity_curve."""
+    if cols.time_ordered or len(idx) < 2:
+        return idx
+    return idx[np.argsort(cols.time_rank()[idx], kind="stable")]
+
+
+def _max_drawdown(r_in_time_order: "np.ndarray") -> float:
+    if len(r_in_time_order) == 0:
+        return 0.0
+    equity = _round2(np.cumsum(r_in_time_order))
+    peak = np.maximum.accumulate(equity)
+    return float(max(0.0, float(np.max(peak - equity))))
+
+
+def _totals(r: "np.ndarray", profit: "np.ndarray", pct: "np.ndarray") -> Dict[str, Any]:
+    """Tổng cho StatsAccumulator.from_totals (r/profit/pct của lệnh đã đóng, theo thứ tự input)."""
+    return {
+        "closed_count": len(r),
+        "win_count": int(np.count_nonzero(r > 0)),
+        "loss_count": int(np.count_nonzero(r < 0)),
+        "breakeven_count": int(np.count_nonzero(r == 0)),
+        "sum_profit": _seq_sum(profit),
+        "sum_profit_pct": _seq_sum(pct),
+        "sum_r": _seq_sum(r),
+        "sum_win_r": _seq_sum(r[r > 0]),
+        "sum_loss_r": _seq_sum(r[r < 0]),
+        "gross_profit": _seq_sum(profit[profit > 0]),
+        "gross_loss": _seq_sum(profit[profit < 0]),
+    }
+
+
+def _factorize(values: Iterable[Any]):
+    """Mã hóa key (falsy -> "UNKNOWN") theo thứ tự xuất hiện đầu tiên."""
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(v or "UNKNOWN", len(index)) for v in values),
+        dtype=np.int64,
+    )
+    return codes, list(index)
+
+
+def closed_r_values(cols: TradeColumns, risk_percent: float = RISK_PERCENT_DEFAULT) -> "np.ndarray":
+    """R-multiple của các lệnh đã đóng, theo thứ tự thời gian (date, id)."""
+    return _r_values(cols, risk_percent)[_time_order(cols, np.flatnonzero(cols.closed))]
+
+
+# === ENGINE ===
+def compute_overview_stats(cols: TradeColumns, risk_percent: float = RISK_PERCENT_DEFAULT) -> Dict[str, Any]:
+    closed_idx = np.flatnonzero(cols.closed)
+    r = _r_values(cols, risk_percent)
+    totals = _totals(r[closed_idx], cols.profit[closed_idx], cols.profit_pct[closed_idx])
+    max_dd = _max_drawdown(r[_time_order(cols, closed_idx)])
+    return StatsAccumulator.from_totals(totals, max_dd).to_dict()
+
+
+def compute_equity_curve(cols: TradeColumns, risk_percent: float = RISK_PERCENT_DEFAULT):
+    order = _time_order(cols, np.flatnonzero(cols.closed))
+    r = _r_values(cols, risk_percent)[order]
+    r_rounded = _round2(r).tolist()
+    equity = _round2(np.cumsum(r)).tolist()
+    dates = cols.text["date"]
+    symbols = cols.text["symbol"]
+    return [
+        {"id": tid, "date": dates[i], "symbol": symbols[i], "r": rr, "equity_r": eq}
+        for tid, i, rr, eq in zip(cols.ids[order].tolist(), order.tolist(), r_rounded, equity)
+    ]
+
+
+def _group_accumulators(
+    cols: TradeColumns,
+    codes: "np.ndarray",
+    n_groups: int,
+    r: "np.ndarray",
+) -> List[StatsAccumulator]:
+    """StatsAccumulator cho từng nhóm (codes: mã nhóm 0..n_groups-1 của từng dòng)."""
+    closed_idx = np.flatnonzero(cols.closed)
+    c_codes = codes[closed_idx]
+    c_r = r[closed_idx]
+    c_profit = cols.profit[closed_idx]
+    c_pct = cols.profit_pct[closed_idx]
+
+    def bsum(weights):
+        # bincount cộng tuần tự theo thứ tự input trong từng nhóm
+        return np.bincount(c_codes, weights=weights, minlength=n_groups)
+
+    def bcount(mask):
+        return np.bincount(c_codes[mask], minlength=n_groups)
+
+    counts = np.bincount(c_codes, minlength=n_groups)
+    wins = bcount(c_r > 0)
+    losses = bcount(c_r < 0)
+    breakeven = bcount(c_r == 0)
+    sum_profit = bsum(c_profit)
+    sum_pct = bsum(c_pct)
+    sum_r = bsum(c_r)
+    sum_win_r = bsum(np.where(c_r > 0, c_r, 0.0))
+    sum_loss_r = bsum(np.where(c_r < 0, c_r, 0.0))
+    gross_profit = bsum(np.where(c_profit > 0, c_profit, 0.0))
+    gross_loss = bsum(np.where(c_profit < 0, c_profit, 0.0))
+
+    # Drawdown từng nhóm: chia lệnh (theo thời gian) thành các đoạn liên tiếp theo nhóm
+    ordered = _time_order(cols, closed_idx)
+    o_codes = codes[ordered]
+    o_r = r[ordered]
+    perm = np.argsort(o_codes, kind="stable")
+    bounds = np.searchsorted(o_codes[perm], np.arange(n_groups + 1))
+    max_dd = [
+        _max_drawdown(o_r[perm[bounds[g]:bounds[g + 1]]]) for g in range(n_groups)
+    ]
+
+    accs = []
+    for g in range(n_groups):
+        totals = {
+            "closed_count": int(counts[g]),
+            "win_count": int(wins[g]),
+            "loss_count": int(losses[g]),
+            "breakeven_count": int(breakeven[g]),
+            "sum_profit": float(sum_profit[g]),
+            "sum_profit_pct": float(sum_pct[g]),
+            "sum_r": float(sum_r[g]),
+            "sum_win_r": float(sum_win_r[g]),
+            "sum_loss_r": float(sum_loss_r[g]),
+            "gross_profit": float(gross_profit[g]),
+            "gross_loss": float(gross_loss[g]),
+        }
+        accs.append(StatsAccumulator.from_totals(totals, max_dd[g]))
+    return accs
+
+
+def compute_grouped_stats(
+    cols: TradeColumns,
+    group_key: str,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> List[Dict[str, Any]]:
+    codes, keys = _factorize(cols.text[group_key])
+    if not keys:
+        return []
+
+    accs = _group_accumulators(cols, codes, len(keys), _r_values(cols, risk_percent))
+    return _grouped_result(dict(zip(keys, accs)))
+
+
+def compute_monthly_pnl(cols: TradeColumns):
+    # "YYYY-MM" = 7 ký tự đầu của date (dtype U7 tự cắt); date rỗng / NULL bị bỏ qua
+    months = np.array([d or "" for d in cols.text["date"]], dtype="U7")
+    idx = np.flatnonzero(months != "")
+    if len(idx) == 0:
+        return []
+    keys, codes = np.unique(months[idx], return_inverse=True)
+    sums = np.bincount(codes.ravel(), weights=cols.profit[idx], minlength=len(keys))
+    return [
+        {"month": str(month), "profit": round(float(pnl), 2)}
+        for month, pnl in zip(keys, sums)
+    ]
+
+
+def compute_mistakes_counts(cols: TradeColumns):
+    counts = {}
+    for raw in cols.text["mistakes"]:
+        for label in _iter_mistakes(raw):
+            counts[label] = counts.get(label, 0) + 1
+    return counts
+
+
+def compute_dashboard_stats(
+    cols: TradeColumns,
+    sections: Optional[Iterable[str]] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    wanted = set(DASHBOARD_SECTIONS if sections is None else sections)
+
+    result = {}
+    if "overview" in wanted:
+        result["overview"] = compute_overview_stats(cols, risk_percent)
+    if "equity_curve" in wanted:
+        result["equity_curve"] = compute_equity_curve(cols, risk_percent)
+    for section, key in _DASHBOARD_GROUP_KEYS.items():
+        if section in wanted:
+            result[section] = compute_grouped_stats(cols, key, risk_percent)
+    if "monthly_pnl" in wanted:
+        result["monthly_pnl"] = compute_monthly_pnl(cols)
+    if "mistakes" in wanted:
+        result["mistakes"] = compute_mistakes_counts(cols)
+    return result
+
+
+def _pivot_column(cols: TradeColumns, dim: str):
+    if dim == "month":
+        return [str(d)[:7] if d else "UNKNOWN" for d in cols.text["date"]]
+    return cols.text[dim]
+
+
+def compute_pivot_stats(
+    cols: TradeColumns,
+    dims: Iterable[str],
+    sort: str = "net_r",
+    descending: bool = True,
+    limit: Optional[int] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    dims = tuple(dims)
+    r = _r_values(cols, risk_percent)
+    closed_idx = np.flatnonzero(cols.closed)
+    total = StatsAccumulator.from_totals(
+        _totals(r[closed_idx], cols.profit[closed_idx], cols.profit_pct[closed_idx]),
+        _max_drawdown(r[_time_order(cols, closed_idx)]),
+    )
+
+    factorized = {d: _factorize(_pivot_column(cols, d)) for d in dims}
+    # Thứ tự xuất hiện theo thời gian (để ô bằng điểm sort giống engine Python)
+    time_order = _time_order(cols, np.arange(len(cols)))
+
+    cells = {}
+    for subset in pivot_subsets(dims):
+        # Mã ô = mixed radix của mã từng chiều, rồi nén lại theo thứ tự xuất hiện
+        combined = np.zeros(len(cols), dtype=np.int64)
+        for d in subset:
+            codes, keys = factorized[d]
+            combined = combined * len(keys) + codes
+        uniq, first, inverse = np.unique(combined[time_order], return_index=True, return_inverse=True)
+        rank = np.empty(len(uniq), dtype=np.int64)
+        rank[np.argsort(first, kind="stable")] = np.arange(len(uniq))
+        codes = np.empty(len(cols), dtype=np.int64)
+        codes[time_order] = rank[inverse.ravel()]
+
+        accs = _group_accumulators(cols, codes, len(uniq), r)
+        order = np.argsort(first, kind="stable")
+        groups = {}
+        for g, u in enumerate(order):
+            row = time_order[first[u]]
+            groups[tuple(factorized[d][1][factorized[d][0][row]] for d in subset)] = accs[g]
+        cells[subset] = groups
+
+    return _pivot_result(dims, cells, total, sort, descending, limit)
+
+
+def compute_rolling_stats(
+    cols: TradeColumns,
+    window: int,
+    unit: str = "trades",
+    group_key: Optional[str] = None,
+    min_trades: Optional[int] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    # Cửa sổ trượt là tuần tự -> NumPy chỉ lo R / thứ tự thời gian, phần còn lại dùng chung
+    order = _time_order(cols, np.flatnonzero(cols.closed))
+    idx = order.tolist()
+    dates = cols.text["date"]
+    if group_key:
+        values = cols.text[group_key]
+        groups = [values[i] or "UNKNOWN" for i in idx]
+    else:
+        groups = repeat("ALL")
+    rows = zip(
+        groups,
+        cols.ids[order].tolist(),
+        [dates[i] for i in idx],
+        _r_values(cols, risk_percent)[order].tolist(),
+        cols.profit[order].tolist(),
+    )
+    return _rolling_result(rows, window, unit, group_key, min_trades)
@@ -1,7 +1,7 @@
 # utils/files.py
-import os
-import uuid
-from config import ALLOWED_EXTENSIONS, UPLOAD_FOLDER
+from config import ALLOWED_EXTENSIONS
+from utils.images import schedule_derivatives
+from utils.upload_store import store_stream
 
 
 def allowed_file(filename: str) -> bool:
@@ -10,7 +10,10 @@ def allowed_file(filename: str) -> bool:
 
 def save_upload(file_storage):
     """
-    Lưu file upload vào UPLOAD_FOLDER và trả về tên file (hoặc None nếu không hợp lệ).
+    Lưu file upload vào kho theo nội dung (utils/upload_store.py) và trả về
+    tên file (hoặc None nếu không hợp lệ). File trùng nội dung dùng chung 1 bản.
+    Raise UploadTooLarge (HTTP 413) nếu vượt UPLOAD_MAX_FILE_BYTES.
+    Thumbnail / WebP được tạo ở background (utils/images.py).
     """
     if not file_storage or file_storage.filename == "":
         return None
@@ -19,7 +22,6 @@ def save_upload(file_storage):
         return None
 
     ext = file_storage.filename.rsplit(".", 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    file_storage.save(path)
+    filename = store_stream(file_storage.stream, ext)
+    schedule_derivatives(filename)
     return filename
@@ -0,0 +1,80 @@
+# utils/http_cache.py
+"""
+ETag theo revision dữ liệu cho các GET endpoint.
+
+- ETag = hash(revision của các bảng liên quan + path + query string).
+- Request có If-None-Match khớp -> trả 304 ngay trong before_request,
+  không chạy query / stats.
+- Cache-Control: no-cache -> browser luôn revalidate (rẻ vì chỉ là 304).
+"""
+import hashlib
+
+from flask import current_app, g, request, make_response
+
+from db import get_connection
+from models.revisions import get_revisions
+
+# prefix URL -> các bảng mà response phụ thuộc
+ETAG_PREFIXES = (
+    ("/api/trades", ("trades",)),
+    ("/api/stats", ("trades",)),
+    ("/api/playbook", ("setups",)),
+    ("/api/reviews", ("reviews",)),
+    ("/api/search", ("trades", "setups")),
+    ("/api/instruments", ("instrument_specs",)),
+)
+
+
+def _tables_for_path(path):
+    for prefix, tables in ETAG_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return tables
+    return None
+
+
+def compute_etag(revisions, full_path):
+    key = ";".join(f"{name}={revisions.get(name, 0)}" for name in sorted(revisions))
+    return hashlib.sha1(f"{key}|{full_path}".encode("utf-8")).hexdigest()
+
+
+def no_etag(view):
+    """Đánh dấu endpoint không phụ thuộc revision dữ liệu (vd: counters)."""
+    view._no_etag = True
+    return view
+
+
+def _check_etag():
+    if request.method != "GET":
+        return None
+    tables = _tables_for_path(request.path)
+    if not tables:
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, "_no_etag", False):
+        return None
+
+    revisions = get_revisions(get_connection(), tables)
+    g.revisions = revisions  # dùng lại cho stats cache trong cùng request
+    etag = compute_etag(revisions, request.full_path)
+    g.etag = etag
+
+    if etag in request.if_none_match:
+        response = make_response("", 304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return None
+
+
+def _set_etag(response):
+    etag = g.pop("etag", None)
+    if etag and response.status_code == 200 and not response.get_etag()[0]:
+        response.set_etag(etag)
+        response.headers.setdefault("Cache-Control", "no-cache")
+    return response
+
+
+def register_http_cache(app):
+    app.before_request(_check_etag)
+    app.after_request(_set_etag)
@@ -0,0 +1,160 @@
+# utils/images.py
+"""
+Ảnh thu nhỏ (WebP) cho chart upload.
+
+- Mỗi file upload sinh các bản phái sinh theo IMAGE_DERIVATIVES
+  (vd: thumb 320px, medium 1280px), lưu cạnh file gốc (cùng thư mục con):
+      abc.png -> abc.png.thumb.webp, abc.png.medium.webp
+- Tạo trên thread pool riêng (schedule_derivatives), request upload không chờ.
+- Chưa có bản phái sinh (đang tạo / Pillow chưa cài) thì /api/uploads trả file gốc.
+
+Pillow là dependency tùy chọn: PIL_AVAILABLE = False nếu chưa cài.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow là tùy chọn
+    Image = ImageOps = None
+
+from flask import url_for
+
+from utils.upload_store import upload_path
+
+from config import IMAGE_DERIVATIVES, IMAGE_WEBP_QUALITY, IMAGE_WORKERS
+
+PIL_AVAILABLE = Image is not None
+
+DERIVATIVE_EXT = "webp"
+
+_executor = None
+_executor_lock = Lock()
+_pending = set()  # file đang chờ / đang tạo, tránh xếp lịch trùng
+
+
+def derivative_name(filename: str, size: str) -> str:
+    return f"{filename}.{size}.{DERIVATIVE_EXT}"
+
+
+def split_derivative_name(filename: str):
+    """"abc.png.thumb.webp" -> ("abc.png", "thumb"); file gốc -> (filename, None)."""
+    parts = filename.rsplit(".", 2)
+    if len(parts) == 3 and parts[2] == DERIVATIVE_EXT and parts[1] in IMAGE_DERIVATIVES:
+        return parts[0], parts[1]
+    return filename, None
+
+
+def is_derivative(filename: str) -> bool:
+    return split_derivative_name(filename)[1] is not None
+
+
+def chart_urls(filename):
+    """URL file gốc + các bản phái sinh của 1 chart (None nếu không có chart)."""
+    if not filename:
+        return None
+    urls = {"original": url_for("trades.uploaded_file", filename=filename)}
+    for size in IMAGE_DERIVATIVES:
+        urls[size] = url_for("trades.uploaded_file", filename=derivative_name(filename, size))
+    return urls
+
+
+# (field, cột nguồn, hàm) cho RowEncoder (utils/serializer.py): cùng kết quả với add_chart_urls
+CHART_URL_FIELDS = (
+    ("chart_before_urls", "chart_before", chart_urls),
+    ("chart_after_urls", "chart_after", chart_urls),
+)
+
+
+def add_chart_urls(trade: dict) -> dict:
+    """Thêm chart_before_urls / chart_after_urls cạnh các field chart có trong trade."""
+    for field in ("chart_before", "chart_after"):
+        if field in trade:
+            trade[f"{field}_urls"] = chart_urls(trade[field])
+    return trade
+
+
+def _save_webp(img, path):
+    # Ghi ra file tạm rồi rename để không phục vụ file ghi dở
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    img.save(tmp_path, "WEBP", quality=IMAGE_WEBP_QUALITY, method=4)
+    os.replace(tmp_path, path)
+
+
+def generate_derivatives(filename: str, force: bool = False) -> int:
+    """
+    Tạo các bản WebP cho 1 file trong kho upload, trả về số file đã tạo.
+    Bản đã có (mới hơn file gốc) được giữ nguyên trừ khi force.
+    """
+    if not PIL_AVAILABLE:
+        return 0
+
+    src = upload_path(filename)
+    if not os.path.isfile(src):
+        return 0
+    src_mtime = os.path.getmtime(src)
+
+    todo = []
+    for size, max_px in IMAGE_DERIVATIVES.items():
+        dst = upload_path(derivative_name(filename, size))
+        if force or not os.path.exists(dst) or os.path.getmtime(dst) < src_mtime:
+            todo.append((max_px, dst))
+    if not todo:
+        return 0
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+        # Lớn -> nhỏ: bản nhỏ resize từ bản lớn, nhanh hơn resize từ ảnh gốc
+        for max_px, dst in sorted(todo, reverse=True):
+            img = img.copy()
+            img.thumbnail((max_px, max_px), Image.LANCZOS)
+            _save_webp(img, dst)
+    return len(todo)
+
+
+def _generate_quietly(filename: str):
+    try:
+        generate_derivatives(filename)
+    except Exception as e:
+        print(f"[IMAGES] Cannot build derivatives for {filename}: {e}")
+    finally:
+        with _executor_lock:
+            _pending.discard(filename)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+        return _executor
+
+
+def schedule_derivatives(filename):
+    """Tạo bản phái sinh ở background (không chặn request). Không làm gì nếu thiếu Pillow."""
+    if not filename or not PIL_AVAILABLE:
+        return None
+    with _executor_lock:
+        if filename in _pending:
+            return None
+        _pending.add(filename)
+    return _get_executor().submit(_generate_quietly, filename)
+
+
+def remove_derivatives(filename):
+    """Xóa các bản phái sinh của 1 file (bỏ qua nếu không có)."""
+    if not filename:
+        return
+    for size in IMAGE_DERIVATIVES:
+        path = upload_path(derivative_name(filename, size))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[IMAGES] Cannot remove {path}: {e}")
@@ -0,0 +1,113 @@
+# utils/instruments.py
+"""
+Thông số hợp đồng theo symbol (bảng instrument_specs) + risk model (config)
+-> profit / profit_pct khi đóng lệnh. Dùng chung cho update_exit, bulk,
+import và re-price hàng loạt (utils/repricer.py).
+
+- load_instrument_specs(conn): {symbol: InstrumentSpec}, cache trong process,
+  chỉ đọc lại bảng khi revision 'instrument_specs' đổi (1 query nhỏ / lần gọi).
+- spec_for(specs, symbol): thông số của symbol, mặc định theo config nếu chưa khai báo.
+- Risk model:
+    percent : risk = capital x risk_percent (của symbol, hoặc RISK_PERCENT)
+    fixed   : risk = RISK_FIXED_AMOUNT $ / lệnh
+  Lot = risk / (stop pips x pip value), làm tròn xuống theo lot_step nếu có.
+- risk_for(spec, capital): $ risk đó (= 1R), lưu vào trades.risk_amount cùng
+  profit để R-multiple của stats khớp với cách tính profit.
+"""
+import threading
+from typing import NamedTuple, Optional
+
+from config import (
+    DEFAULT_PIP_SIZE,
+    DEFAULT_PIP_VALUE_PER_LOT,
+    RISK_FIXED_AMOUNT,
+    RISK_MODEL,
+    RISK_PERCENT,
+)
+from models.instruments import INSTRUMENT_SPEC_COLUMNS
+from models.revisions import get_revisions
+from utils.risk import calculate_profit_and_pct
+
+RISK_MODELS = ("percent", "fixed")
+
+if RISK_MODEL not in RISK_MODELS:
+    raise ValueError(f"Unknown RISK_MODEL: {RISK_MODEL} (expected one of {', '.join(RISK_MODELS)})")
+
+
+class InstrumentSpec(NamedTuple):
+    pip_size: float
+    pip_value_per_lot: float
+    lot_step: Optional[float] = None
+    risk_percent: float = RISK_PERCENT
+
+    @property
+    def pip_multiplier(self) -> float:
+        return 1 / self.pip_size
+
+
+DEFAULT_SPEC = InstrumentSpec(DEFAULT_PIP_SIZE, DEFAULT_PIP_VALUE_PER_LOT)
+
+
+def normalize_symbol(symbol) -> str:
+    return (symbol or "").strip().upper()
+
+
+def risk_amount():
+    """$ risk cố định / lệnh (RISK_MODEL = fixed), None = theo % vốn."""
+    return RISK_FIXED_AMOUNT if RISK_MODEL == "fixed" else None
+
+
+def risk_for(spec, capital):
+    """$ risk / lệnh mà price_exit dùng; None nếu không tính được profit (vốn <= 0)."""
+    capital = capital or 0
+    if capital <= 0:
+        return None
+    fixed = risk_amount()
+    return float(fixed) if fixed is not None else capital * spec.risk_percent
+
+
+# === CACHE ===
+_lock = threading.Lock()
+_cached = {"revision": None, "specs": {}}
+
+
+def load_instrument_specs(conn):
+    """{symbol (chữ hoa): InstrumentSpec}, đọc lại bảng chỉ khi revision đổi."""
+    revision = get_revisions(conn, ("instrument_specs",)).get("instrument_specs")
+    with _lock:
+        if revision is not None and revision == _cached["revision"]:
+            return _cached["specs"]
+
+    cur = conn.cursor()
+    cur.execute(f"SELECT {', '.join(INSTRUMENT_SPEC_COLUMNS)} FROM instrument_specs")
+    specs = {
+        normalize_symbol(symbol): InstrumentSpec(
+            pip_size, pip_value_per_lot, lot_step, risk_percent or RISK_PERCENT
+        )
+        for symbol, pip_size, pip_value_per_lot, lot_step, risk_percent in cur.fetchall()
+    }
+    with _lock:
+        _cached["revision"] = revision
+        _cached["specs"] = specs
+    return specs
+
+
+def spec_for(specs, symbol) -> InstrumentSpec:
+    return specs.get(normalize_symbol(symbol), DEFAULT_SPEC)
+
+
+def price_exit(spec, exit_price, entry, direction, capital, sl, tp):
+    """(profit, profit_pct) khi đóng lệnh tại exit_price theo thông số spec."""
+    return calculate_profit_and_pct(
+        exit_price=exit_price,
+        entry=entry,
+        direction=direction,
+        capital=capital,
+        sl=sl,
+        tp=tp,
+        risk_percent=spec.risk_percent,
+        pip_multiplier=spec.pip_multiplier,
+        pip_value_per_lot=spec.pip_value_per_lot,
+        lot_step=spec.lot_step,
+        risk_amount=risk_amount(),
+    )
@@ -0,0 +1,291 @@
+# utils/metrics.py
+"""
+Metrics theo request, xuất ra /api/_metrics dạng Prometheus text (không cần
+thư viện ngoài).
+
+Mỗi request (trừ chính /api/_metrics) được chia thời gian thành:
+  - sql      : execute + fetch qua InstrumentedCursor (db.ManagedConnection.cursor)
+  - serialize: encode / dumps JSON của app.json (jsonify)
+  - app      : phần còn lại (dict_trade, stats, format response...)
+và đếm số câu SQL / số dòng fetch. Dữ liệu của request đang chạy nằm trong
+thread-local nên thread nền (ảnh, GC...) không bị tính vào request nào.
+
+Request được chốt ở teardown; riêng response stream (export) được chốt khi
+response đóng (call_on_close) để tính cả thời gian / SQL trong lúc stream.
+"""
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from functools import partial
+from types import GeneratorType
+
+from flask import Response, request
+
+from config import METRICS_BUCKETS
+from utils.serializer import AppJSONProvider
+
+METRICS_PATH = "/api/_metrics"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name -> (type, help)
+METRICS = {
+    "trade_http_requests_total": ("counter", "HTTP requests by endpoint and status."),
+    "trade_http_request_duration_seconds": ("histogram", "Request latency."),
+    "trade_request_phase_seconds": ("histogram", "Request time split into sql / serialize / app."),
+    "trade_sql_statements_total": ("counter", "SQL statements executed."),
+    "trade_sql_statement_duration_seconds": ("histogram", "Duration of a single SQL execute()."),
+    "trade_sql_rows_fetched_total": ("counter", "Rows fetched from SQLite."),
+}
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    __slots__ = (
+        "start", "sql_seconds", "serialize_seconds", "statements", "rows",
+        "statement_durations", "status", "deferred",
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.statement_durations = []
+        self.status = None
+        self.deferred = False
+
+
+def current_request_metrics():
+    return getattr(_local, "metrics", None)
+
+
+# === SQL ===
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor đo thời gian execute / fetch và đếm dòng cho request hiện tại."""
+
+    def _record(self, start, rows=0, statement=False):
+        m = current_request_metrics()
+        if m is None:
+            return
+        elapsed = time.perf_counter() - start
+        m.sql_seconds += elapsed
+        m.rows += rows
+        if statement:
+            m.statements += 1
+            m.statement_durations.append(elapsed)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(start, statement=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(start, statement=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(start, rows=0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._record(start, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(start, rows=len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._record(start, rows=1)
+        return row
+
+
+def cursor_factory():
+    """Cursor class cho connection: chỉ đo khi đang trong 1 request được ghi metrics."""
+    return InstrumentedCursor if current_request_metrics() is not None else sqlite3.Cursor
+
+
+# === JSON ===
+class TimedJSONProvider(AppJSONProvider):
+    """JSON provider của app, cộng thời gian encode / dumps vào phase serialize."""
+
+    def _timed(self, fn, obj, **kwargs):
+        m = current_request_metrics()
+        if m is None:
+            return fn(obj, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(obj, **kwargs)
+        finally:
+            m.serialize_seconds += time.perf_counter() - start
+
+    def encode(self, obj) -> bytes:
+        return self._timed(super().encode, obj)
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(super().dumps, obj, **kwargs)
+
+
+# === REGISTRY ===
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)  # bucket cuối = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """Counter + histogram theo (tên, labels), thread-safe, render Prometheus text."""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, *values):
+        key = (name, tuple(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(len(self.buckets))
+            for value in values:
+                hist.counts[bisect_left(self.buckets, value)] += 1
+                hist.sum += value
+                hist.count += 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in counters:
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+
+            for (metric, labels), (counts, total, count) in histograms:
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# === FLASK ===
+def _endpoint_label():
+    # url rule (vd: /api/stats/<...>) thay vì path thật -> số label có giới hạn
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def _start_request():
+    if request.path == METRICS_PATH:
+        return
+    _local.metrics = RequestMetrics()
+
+
+def _finish(m, method, endpoint):
+    if getattr(_local, "metrics", None) is m:
+        _local.metrics = None
+
+    total = time.perf_counter() - m.start
+    status = m.status if m.status is not None else 500
+
+    registry.inc("trade_http_requests_total", (("method", method), ("endpoint", endpoint), ("status", status)))
+    registry.observe("trade_http_request_duration_seconds", (("method", method), ("endpoint", endpoint)), total)
+    app_seconds = max(0.0, total - m.sql_seconds - m.serialize_seconds)
+    for phase, seconds in (("sql", m.sql_seconds), ("serialize", m.serialize_seconds), ("app", app_seconds)):
+        registry.observe("trade_request_phase_seconds", (("endpoint", endpoint), ("phase", phase)), seconds)
+    registry.inc("trade_sql_statements_total", (("endpoint", endpoint),), m.statements)
+    registry.inc("trade_sql_rows_fetched_total", (("endpoint", endpoint),), m.rows)
+    if m.statement_durations:
+        registry.observe("trade_sql_statement_duration_seconds", (("endpoint", endpoint),), *m.statement_durations)
+
+
+def _record_response(response):
+    m = current_request_metrics()
+    if m is not None:
+        m.status = response.status_code
+        if isinstance(response.response, GeneratorType):
+            # Response stream (export): chốt khi stream xong, không phải lúc view return
+            m.deferred = True
+            response.call_on_close(partial(_finish, m, request.method, _endpoint_label()))
+    return response
+
+
+def _finish_request(exc=None):
+    m = current_request_metrics()
+    if m is not None and not m.deferred:
+        _finish(m, request.method, _endpoint_label())
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def register_metrics(app):
+    """Gọi trong create_app trước các before_request khác (để tính cả SQL của ETag)."""
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_record_response)
+    app.teardown_request(_finish_request)
+    app.add_url_rule(METRICS_PATH, "metrics", metrics_view, methods=["GET"])
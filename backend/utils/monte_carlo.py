@@ -0,0 +1,184 @@
+# utils/monte_carlo.py
+"""
+Monte Carlo equity theo R: tạo hàng nghìn đường equity từ R-multiples của
+các lệnh đã đóng (sau filter), trả về dải percentile, phân phối max drawdown
+và risk-of-ruin.
+
+- method = "bootstrap": lấy mẫu có hoàn lại (độ dài tùy chọn)
+          "shuffle"  : hoán vị thứ tự các lệnh thực tế (cùng equity cuối)
+- Tính vector hóa theo từng block đường (MONTE_CARLO_BLOCK_PATHS) để giới hạn
+  RAM: 10k đường x 5k lệnh không bao giờ nằm trọn trong 1 mảng.
+- Mỗi block có seed riêng sinh từ SeedSequence(seed) -> cùng seed cho cùng kết
+  quả, dù chạy trong process hay chia cho process pool (MONTE_CARLO_WORKERS).
+- "Ruin" tại ngưỡng X: equity chạm -X R so với lúc bắt đầu.
+
+Cần NumPy (NUMPY_AVAILABLE).
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Any, Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy là tùy chọn
+    np = None
+
+from config import (
+    MONTE_CARLO_BLOCK_PATHS,
+    MONTE_CARLO_POOL_MIN_CELLS,
+    MONTE_CARLO_WORKERS,
+)
+
+NUMPY_AVAILABLE = np is not None
+
+MONTE_CARLO_METHODS = ("bootstrap", "shuffle")
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95, 99)
+MAX_BAND_POINTS = 200
+DRAWDOWN_BINS = 20
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _band_steps(n_trades: int) -> "np.ndarray":
+    """Các bước (1-based) được lấy mẫu cho dải percentile, tối đa MAX_BAND_POINTS điểm."""
+    if n_trades <= MAX_BAND_POINTS:
+        return np.arange(1, n_trades + 1)
+    return np.unique(np.linspace(1, n_trades, MAX_BAND_POINTS).round().astype(np.int64))
+
+
+def simulate_block(r, n_paths, n_trades, method, seed_seq, steps, thresholds):
+    """
+    Mô phỏng 1 block đường. Trả về dict mảng:
+      bands (n_paths x len(steps)), max_dd, final, ruined (n_paths x len(thresholds)).
+    Hàm cấp module để chạy được trong ProcessPoolExecutor.
+    """
+    rng = np.random.default_rng(seed_seq)
+    if method == "shuffle":
+        paths = rng.permuted(np.tile(r, (n_paths, 1)), axis=1)[:, :n_trades]
+    else:
+        paths = r[rng.integers(0, len(r), size=(n_paths, n_trades))]
+
+    equity = np.cumsum(paths, axis=1, out=paths)
+    # Đỉnh tính cả điểm xuất phát (equity = 0)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    max_dd = (peak - equity).max(axis=1)
+    low = np.minimum(equity.min(axis=1), 0.0)
+
+    return {
+        "bands": equity[:, steps - 1],
+        "max_dd": max_dd,
+        "final": equity[:, -1].copy(),
+        "ruined": low[:, None] <= -np.asarray(thresholds, dtype=float)[None, :],
+    }
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MONTE_CARLO_WORKERS)
+        return _pool
+
+
+def _percentiles(values: "np.ndarray", qs) -> Dict[str, float]:
+    return {f"p{q}": round(float(v), 2) for q, v in zip(qs, np.percentile(values, qs))}
+
+
+def run_monte_carlo(
+    r,
+    n_paths: int,
+    n_trades: int = None,
+    method: str = "bootstrap",
+    seed: int = 0,
+    ruin_thresholds=(10, 20, 50),
+) -> Dict[str, Any]:
+    """
+    r: R-multiple của các lệnh đã đóng (theo thời gian).
+    n_trades: số lệnh mỗi đường (mặc định = len(r); "shuffle" tối đa len(r)).
+    """
+    r = np.asarray(r, dtype=np.float64)
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    if n_trades is None or method == "shuffle":
+        n_trades = min(n_trades or len(r), len(r))
+
+    thresholds = sorted(float(t) for t in ruin_thresholds)
+    result = {
+        "method": method,
+        "paths": n_paths,
+        "trades_per_path": n_trades,
+        "seed": seed,
+        "sample_size": len(r),
+    }
+    if len(r) == 0 or n_trades == 0:
+        result.update({"steps": [], "bands": {}, "max_drawdown_r": {}, "final_equity_r": {},
+                       "risk_of_ruin": [{"threshold_r": t, "probability": 0.0} for t in thresholds]})
+        return result
+
+    steps = _band_steps(n_trades)
+    block_sizes = [
+        min(MONTE_CARLO_BLOCK_PATHS, n_paths - start)
+        for start in range(0, n_paths, MONTE_CARLO_BLOCK_PATHS)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    jobs = [(r, size, n_trades, method, s, steps, thresholds) for size, s in zip(block_sizes, seeds)]
+
+    use_pool = (
+        MONTE_CARLO_WORKERS > 1
+        and len(jobs) > 1
+        and n_paths * n_trades >= MONTE_CARLO_POOL_MIN_CELLS
+    )
+    if use_pool:
+        blocks = list(_get_pool().map(simulate_block, *zip(*jobs)))
+    else:
+        blocks = [simulate_block(*job) for job in jobs]
+
+    bands = np.concatenate([b["bands"] for b in blocks])
+    max_dd = np.concatenate([b["max_dd"] for b in blocks])
+    final = np.concatenate([b["final"] for b in blocks])
+    ruined = np.concatenate([b["ruined"] for b in blocks])
+
+    band_values = np.percentile(bands, BAND_PERCENTILES, axis=0)
+    counts, edges = np.histogram(max_dd, bins=DRAWDOWN_BINS)
+
+    result.update({
+        "steps": steps.tolist(),
+        "bands": {
+            f"p{q}": np.round(values, 2).tolist()
+            for q, values in zip(BAND_PERCENTILES, band_values)
+        },
+        "max_drawdown_r": {
+            **_percentiles(max_dd, SUMMARY_PERCENTILES),
+            "mean": round(float(max_dd.mean()), 2),
+            "histogram": {
+                "edges": np.round(edges, 2).tolist(),
+                "counts": counts.tolist(),
+            },
+        },
+        "final_equity_r": {
+            **_percentiles(final, SUMMARY_PERCENTILES),
+            "mean": round(float(final.mean()), 2),
+            "prob_positive": round(float(np.mean(final > 0)), 4),
+        },
+        "risk_of_ruin": [
+            {"threshold_r": t, "probability": round(float(p), 4)}
+            for t, p in zip(thresholds, ruined.mean(axis=0))
+        ],
+    })
+    return result
+
+
+def parse_thresholds(raw, default=(10, 20, 50)) -> List[float]:
+    """ruin=10,20,50 -> [10.0, 20.0, 50.0]. Raise ValueError nếu không hợp lệ."""
+    if not raw:
+        return list(default)
+    try:
+        values = [float(v) for v in raw.split(",") if v.strip()]
+    except ValueError:
+        raise ValueError("ruin must be a comma-separated list of numbers")
+    if not values or any(not math.isfinite(v) or v <= 0 for v in values):
+        raise ValueError("ruin thresholds must be finite numbers > 0")
+    return values
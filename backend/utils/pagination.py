@@ -0,0 +1,36 @@
+# utils/pagination.py
+import base64
+import json
+
+PAGE_LIMIT_MAX = 1000
+
+
+def parse_limit(raw, max_limit: int = PAGE_LIMIT_MAX):
+    """limit=N -> int (1..max_limit); None / "" -> None (không phân trang)."""
+    if raw is None or raw == "":
+        return None
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be >= 1")
+    return min(limit, max_limit)
+
+
+def encode_cursor(values) -> str:
+    """Cursor keyset (vd: [date, id]) -> chuỗi base64 url-safe."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int = 2):
+    """Ngược lại encode_cursor. Raise ValueError nếu cursor hỏng."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
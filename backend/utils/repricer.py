@@ -0,0 +1,223 @@
+# utils/repricer.py
+"""
+Re-price hàng loạt: tính lại rr / profit / profit_pct / risk_amount của các lệnh đã đóng
+theo instrument_specs + risk model hiện tại (sau khi sửa thông số symbol,
+đổi RISK_MODEL / RISK_PERCENT...). Chạy bằng: flask --app app trades-reprice
+
+- Duyệt trades theo id (keyset, chunk_size lệnh / chunk), mỗi chunk 1
+  transaction; chỉ UPDATE các dòng có giá trị đổi (executemany).
+- Tính vector hóa bằng NumPy nếu có (utils/columnar_stats.py), không thì từng
+  dòng bằng price_exit. Cả 2 cho kết quả giống hệt update_exit / calculate_rr.
+- Tiến độ (last_id, scanned, updated) được ghi vào reprice_state cùng
+  transaction với chunk -> resume=True chạy tiếp sau chunk cuối đã commit.
+- Chỉ lệnh đã đóng (exit != 0). Lệnh import (import_key) mặc định bị bỏ qua
+  vì profit có thể lấy từ statement của broker.
+"""
+import math
+
+from db import run_with_busy_retry
+from config import REPRICE_CHUNK_SIZE
+from utils.columnar_stats import NUMPY_AVAILABLE, _round2
+from utils.instruments import load_instrument_specs, price_exit, risk_amount, risk_for, spec_for
+from utils.risk import calculate_rr
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+REPRICE_STATE_COLUMNS = (
+    "last_id", "include_imported", "total", "scanned", "updated", "started_at", "finished_at",
+)
+
+_ROW_COLUMNS = (
+    "id, symbol, direction, entry, sl, tp, exit, capital, rr, profit, profit_pct, risk_amount"
+)
+
+UPDATE_PRICING_SQL = (
+    "UPDATE trades SET rr = ?, profit = ?, profit_pct = ?, risk_amount = ? WHERE id = ?"
+)
+
+
+def _candidates_sql(include_imported):
+    sql = "exit IS NOT NULL AND exit != 0"
+    return sql if include_imported else sql + " AND import_key IS NULL"
+
+
+def get_reprice_state(conn):
+    """Trạng thái lần re-price gần nhất (dict) hoặc None nếu chưa chạy lần nào."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT {', '.join(REPRICE_STATE_COLUMNS)} FROM reprice_state WHERE id = 1")
+    row = cur.fetchone()
+    if row is None:
+        return None
+    state = dict(zip(REPRICE_STATE_COLUMNS, row))
+    state["include_imported"] = bool(state["include_imported"])
+    return state
+
+
+# === PRICING ===
+def _price_rows_python(rows, specs):
+    out = []
+    for _, symbol, direction, entry, sl, tp, exit_price, capital, *_ in rows:
+        spec = spec_for(specs, symbol)
+        profit, profit_pct = price_exit(spec, exit_price, entry, direction, capital, sl, tp)
+        out.append((calculate_rr(entry, sl, tp), profit, profit_pct, risk_for(spec, capital)))
+    return out
+
+
+def _column(rows, index):
+    return np.array([r[index] or 0.0 for r in rows], dtype=float)
+
+
+def _price_rows_numpy(rows, specs):
+    """
+    Cùng công thức, cùng thứ tự phép tính với calculate_profit_and_pct /
+    calculate_rr (float giống hệt), round 2 chữ số như round() của Python.
+    """
+    entry, sl, tp, exit_price, capital = (_column(rows, i) for i in (3, 4, 5, 6, 7))
+    short = np.array([(r[2] or "").lower() == "short" for r in rows], dtype=bool)
+
+    # Thông số theo symbol: tra 1 lần / symbol, rồi trải ra theo mã của từng dòng
+    codes = {}
+    row_codes = np.fromiter(
+        (codes.setdefault(r[1], len(codes)) for r in rows), dtype=np.intp, count=len(rows)
+    )
+    table = [spec_for(specs, symbol) for symbol in codes]
+
+    def per_row(values):
+        return np.array(values, dtype=float)[row_codes]
+
+    pip_multiplier = per_row([s.pip_multiplier for s in table])
+    pip_value = per_row([s.pip_value_per_lot for s in table])
+    lot_step = per_row([s.lot_step or 0.0 for s in table])
+
+    fixed = risk_amount()
+    if fixed is None:
+        risk = capital * per_row([s.risk_percent for s in table])
+    else:
+        risk = np.full(len(rows), float(fixed))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rr = np.where(
+            (entry != sl) & (sl != 0), np.abs((tp - entry) / (entry - sl)), 0.0
+        )
+
+        stop_pips = np.abs(entry - sl) * pip_multiplier
+        valid = (capital > 0) & (stop_pips != 0)
+        pip_diff = np.abs(exit_price - entry) * pip_multiplier
+        lot_size = risk / (stop_pips * pip_value)
+
+        # floor_to_step: chỉ các dòng có lot / step sát số nguyên mới có thể bị
+        # round 9 chữ số đổi kết quả floor -> tính lại bằng Python
+        stepped = valid & (lot_step > 0)
+        steps = np.where(stepped, lot_step, 1.0)
+        units = lot_size / steps
+        floored = np.floor(units)
+        for i in np.flatnonzero(stepped & (np.abs(units - np.rint(units)) < 1e-6)):
+            floored[i] = math.floor(round(float(units[i]), 9))
+        lot_size = np.where(stepped, floored * steps, lot_size)
+
+        profit = pip_diff * lot_size * pip_value
+        losing = np.where(short, exit_price > entry, exit_price < entry)
+        profit = np.where(losing, -profit, profit)
+        profit_pct = (profit / capital) * 100
+
+    profit = _round2(np.where(valid, profit, 0.0))
+    profit_pct = _round2(np.where(valid, profit_pct, 0.0))
+    # risk_for: None khi vốn <= 0
+    risk = [v if c > 0 else None for c, v in zip(capital.tolist(), risk.tolist())]
+    return list(zip(rr.tolist(), profit.tolist(), profit_pct.tolist(), risk))
+
+
+# === CHUNKS ===
+def _reprice_chunk(conn, chunk_size, price_rows):
+    """
+    1 chunk sau reprice_state.last_id trong 1 transaction.
+    Trả về trạng thái sau chunk (finished_at != None khi đã hết lệnh).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        state = get_reprice_state(conn)
+        cur.execute(
+            f"SELECT {_ROW_COLUMNS} FROM trades "
+            f"WHERE id > ? AND {_candidates_sql(state['include_imported'])} "
+            "ORDER BY id LIMIT ?",
+            (state["last_id"], chunk_size),
+        )
+        rows = cur.fetchall()
+
+        changes = []
+        if rows:
+            priced = price_rows(rows, load_instrument_specs(conn))
+            changes = [
+                (*values, row[0])
+                for row, values in zip(rows, priced)
+                if values != tuple(row[8:12])
+            ]
+            if changes:
+                cur.executemany(UPDATE_PRICING_SQL, changes)
+
+        cur.execute(
+            "UPDATE reprice_state SET last_id = ?, scanned = scanned + ?, updated = updated + ?, "
+            "finished_at = CASE WHEN ? THEN datetime('now') END WHERE id = 1",
+            (rows[-1][0] if rows else state["last_id"], len(rows), len(changes), len(rows) < chunk_size),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return get_reprice_state(conn)
+
+
+def start_reprice(conn, include_imported=False):
+    """Bắt đầu lần re-price mới từ đầu bảng (ghi đè trạng thái cũ)."""
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"SELECT COUNT(*) FROM trades WHERE {_candidates_sql(include_imported)}")
+        total = cur.fetchone()[0]
+        cur.execute(
+            "INSERT OR REPLACE INTO reprice_state(id, last_id, include_imported, total, "
+            "scanned, updated, started_at, finished_at) "
+            "VALUES (1, 0, ?, ?, 0, 0, datetime('now'), NULL)",
+            (int(include_imported), total),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return get_reprice_state(conn)
+
+
+def reprice_trades(
+    conn,
+    chunk_size=REPRICE_CHUNK_SIZE,
+    resume=False,
+    include_imported=False,
+    progress=None,
+    engine="auto",
+):
+    """
+    Tính lại rr / profit / profit_pct / risk_amount cho mọi lệnh đã đóng, trả về trạng thái cuối
+    {last_id, include_imported, total, scanned, updated, started_at, finished_at}.
+    - resume=True: chạy tiếp lần trước chưa xong (giữ include_imported của lần đó);
+      không có lần nào dở dang thì bắt đầu lần mới.
+    - progress(state): gọi sau mỗi chunk đã commit.
+    - engine: auto | numpy | python.
+    """
+    if engine == "numpy" and not NUMPY_AVAILABLE:
+        raise ValueError("NumPy is not installed (pip install numpy)")
+    if engine not in ("auto", "numpy", "python"):
+        raise ValueError(f"Unknown engine: {engine}")
+    use_numpy = NUMPY_AVAILABLE and engine != "python"
+    price_rows = _price_rows_numpy if use_numpy else _price_rows_python
+
+    state = get_reprice_state(conn) if resume else None
+    if state is None or state["finished_at"]:
+        state = start_reprice(conn, include_imported)
+
+    while not state["finished_at"]:
+        state = run_with_busy_retry(_reprice_chunk, conn, chunk_size, price_rows)
+        if progress is not None:
+            progress(state)
+    return state
@@ -1,4 +1,15 @@
 # utils/risk.py
+import math
+
+
+def calculate_rr(entry: float, sl: float, tp: float) -> float:
+    """RR (risk:reward) theo entry / SL / TP; 0 nếu không có SL hoặc SL = entry."""
+    entry = entry or 0
+    sl = sl or 0
+    tp = tp or 0
+    return abs((tp - entry) / (entry - sl)) if entry != sl and sl != 0 else 0
+
+
 def calculate_profit_and_pct(
     exit_price: float,
     entry: float,
@@ -9,12 +20,15 @@ def calculate_profit_and_pct(
     risk_percent: float = 0.01,
     pip_multiplier: int = 10000,
     pip_value_per_lot: float = 10.0,
+    lot_step: float = None,
+    risk_amount: float = None,
 ):
     """
     Tính profit ($) và profit_pct (%) dựa trên:
-      - risk 1% / lệnh (mặc định)
+      - risk 1% / lệnh (mặc định), hoặc risk_amount $ cố định nếu có
       - pip_multiplier: 10000 cho cặp 4-digit
       - pip_value_per_lot: 10$ / pip cho 1 lot (chuẩn forex)
+      - lot_step: lot làm tròn xuống theo bước của broker (None = không làm tròn)
     """
 
     capital = capital or 0
@@ -34,10 +48,13 @@ def calculate_profit_and_pct(
     pip_diff = abs(exit_price - entry) * pip_multiplier
 
     # Số tiền risk cho 1 lệnh
-    risk_amount = capital * risk_percent
+    if risk_amount is None:
+        risk_amount = capital * risk_percent
 
     # Lot size dựa trên risk và stop_pips
     lot_size = risk_amount / (stop_pips * pip_value_per_lot)
+    if lot_step:
+        lot_size = floor_to_step(lot_size, lot_step)
 
     # Profit theo $
     profit = pip_diff * lot_size * pip_value_per_lot
@@ -55,3 +72,8 @@ def calculate_profit_and_pct(
     profit_pct = (profit / capital) * 100 if capital > 0 else 0
 
     return round(profit, 2), round(profit_pct, 2)
+
+
+def floor_to_step(value: float, step: float) -> float:
+    """Làm tròn xuống theo bước (lot_step); bỏ sai số float (0.3 / 0.1 = 2.999...)."""
+    return math.floor(round(value / step, 9)) * step
@@ -0,0 +1,321 @@
+# utils/rollup_stats.py
+"""
+Stats đọc từ bảng trade_rollups: O(số nhóm) thay vì O(số trades).
+
+- Chỉ dùng được khi request không filter theo ngày (from / to), vì rollup
+  chỉ chia theo tháng. Filter symbol / setup / session / timeframe được hỗ trợ.
+- max_drawdown_r phụ thuộc thứ tự lệnh nên không thể cộng dồn: phần này lấy
+  từ 1 lần đọc hẹp (capital, profit, risk_amount) theo index date, id, rồi giữ trạng thái
+  (theo filter + nhóm) trong process:
+    * revision trades không đổi -> không đọc lệnh nào
+    * chỉ ghi vào tail (thêm lệnh mới, đóng / review lệnh cuối; revision
+      trades_history không đổi) -> chỉ đọc lại từ đầu tail
+    * còn lại (sửa / xóa lệnh cũ, thêm lệnh lùi ngày) -> đọc lại từ đầu
+- Output cùng format với compute_overview_stats / compute_grouped_stats /
+  compute_monthly_pnl. Tổng float được cộng theo thứ tự khác nên số đã round
+  có thể lệch ±0.01 ở trường hợp sát biên .005.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import ROLLUP_DRAWDOWN_CACHE_ENTRIES
+from models.revisions import get_revisions
+from models.rollups import (
+    ROLLUP_DIMENSIONS,
+    ROLLUP_METRICS,
+    REBUILD_TRADE_ROLLUPS_SQL,
+    TRADES_HISTORY_REVISION,
+    CLOSED_TRADE_SQL,
+)
+from models.trades import build_trade_filters, TRADE_TAG_FILTERS
+from utils.trade_stats import (
+    RISK_PERCENT_DEFAULT,
+    StatsAccumulator,
+    r_multiple,
+    _grouped_result,
+    _safe_float,
+)
+
+# Tolerance khi so sánh tổng float (rollup cộng/trừ dần theo thời gian)
+ROLLUP_FLOAT_TOLERANCE = 1e-6
+
+
+def rollups_supported(args) -> bool:
+    """Rollup trả lời được khi không có filter ngày / filter tag."""
+    if any(args.get(name) for name, _ in TRADE_TAG_FILTERS):
+        return False
+    return not args.get("from") and not args.get("to")
+
+
+def _sum_metrics_sql():
+    return ", ".join(f"SUM({m})" for m in ROLLUP_METRICS)
+
+
+def _row_totals(row) -> Dict[str, Any]:
+    return dict(zip(ROLLUP_METRICS, row))
+
+
+def _merge_totals(target: Dict[str, Any], totals: Dict[str, Any]):
+    for m in ROLLUP_METRICS:
+        target[m] = target.get(m, 0) + (totals.get(m) or 0)
+
+
+# === MAX DRAWDOWN ===
+class _DrawdownState(NamedTuple):
+    trades_revision: int
+    history_revision: int
+    last: Optional[tuple]  # (date, id) của lệnh cuối cùng trước tail (None = từ đầu)
+    base: Dict[Any, StatsAccumulator]  # trạng thái sau lệnh last
+    accs: Dict[Any, StatsAccumulator]  # kết quả đầy đủ (cả tail) của trades_revision
+
+
+_drawdown_lock = threading.Lock()
+_drawdown_states = OrderedDict()  # (where_sql, params, group_col, risk_percent) -> _DrawdownState
+
+
+def clear_drawdown_cache():
+    with _drawdown_lock:
+        _drawdown_states.clear()
+
+
+def _copy_accs(accs):
+    return {k: copy.copy(acc) for k, acc in accs.items()}
+
+
+def _after_sql(last):
+    """Điều kiện (date, id) > last theo ORDER BY date, id (NULL đứng đầu)."""
+    last_date, last_id = last
+    if last_date is None:
+        return " AND (date IS NOT NULL OR id > ?)", [last_id]
+    # date >= ?: range trên index (date, id) / (symbol, date)...
+    return " AND date >= ? AND (date, id) > (?, ?)", [last_date, last_date, last_id]
+
+
+def _tail_start(cur):
+    """
+    (date, id) đầu tail (models/rollups.py): lệnh đã đóng cuối cùng, hoặc
+    ("", 0) = mọi lệnh có ngày nếu không có lệnh đã đóng nào có ngày.
+    """
+    cur.execute(
+        f"SELECT date, id FROM trades WHERE {CLOSED_TRADE_SQL} ORDER BY date DESC, id DESC LIMIT 1"
+    )
+    row = cur.fetchone()
+    return row if row is not None and row[0] is not None else ("", 0)
+
+
+def _scan_drawdowns(conn, args, group_col=None, risk_percent=RISK_PERCENT_DEFAULT):
+    """
+    Max drawdown (R) theo từng nhóm, đọc lệnh có profit theo thứ tự date, id.
+    Trả về dict {group_key: StatsAccumulator} (chỉ dùng cum_r / peak / max_dd,
+    không được sửa), thứ tự key = thứ tự xuất hiện đầu tiên.
+    Trạng thái trước tail được giữ lại: lần sau, nếu revision trades_history
+    không đổi, chỉ đọc từ đầu tail (đóng / review / thêm lệnh mới không phải
+    đọc lại cả bảng).
+    """
+    where_sql, params = build_trade_filters(args)
+    where_sql += (" AND" if where_sql else " WHERE") + " profit IS NOT NULL"
+    key = (where_sql, tuple(params), group_col, risk_percent)
+
+    revisions = get_revisions(conn, ("trades", TRADES_HISTORY_REVISION))
+    trades_rev = revisions.get("trades", 0)
+    history_rev = revisions.get(TRADES_HISTORY_REVISION, 0)
+
+    with _drawdown_lock:
+        state = _drawdown_states.get(key)
+    if state is not None and state.trades_revision == trades_rev:
+        return state.accs
+
+    if state is not None and state.history_revision == history_rev:
+        # Chỉ tail đổi: đọc tiếp sau lệnh cuối cùng trước tail
+        accs = _copy_accs(state.base)
+        last = state.last
+    else:
+        accs, last = {}, None
+
+    cur = conn.cursor()
+    # Đọc sau revision: tail có thể đã dài thêm -> base chỉ sớm hơn, vẫn đúng
+    tail_date, tail_id = _tail_start(cur)
+
+    scan_sql, scan_params = where_sql, list(params)
+    if last is not None:
+        after_sql, after_params = _after_sql(last)
+        scan_sql += after_sql
+        scan_params += after_params
+
+    select_group = group_col if group_col else "NULL"
+    cur.execute(
+        f"SELECT {select_group}, capital, profit, risk_amount, date, id FROM trades{scan_sql} "
+        "ORDER BY date ASC, id ASC",
+        scan_params,
+    )
+
+    base = None
+    prev = None
+    for row in cur:
+        if base is None:
+            d = row[4]
+            if d is not None and d >= tail_date and (d > tail_date or row[5] >= tail_id):
+                base = (prev[4:] if prev is not None else last, _copy_accs(accs))
+        group_value, capital, profit, risk = row[:4]
+        group = (group_value or "UNKNOWN") if group_col else None
+        acc = accs.get(group)
+        if acc is None:
+            acc = accs[group] = StatsAccumulator()
+        acc.add(r_multiple(capital, profit, risk_percent, risk), 0.0, 0.0)
+        prev = row
+    if base is None:
+        # Không lệnh nào của filter nằm trong tail
+        base = (prev[4:] if prev is not None else last, _copy_accs(accs))
+
+    with _drawdown_lock:
+        current = _drawdown_states.get(key)
+        # Không ghi đè trạng thái mới hơn (request khác đã đọc sau 1 lần ghi)
+        if current is None or current.trades_revision <= trades_rev:
+            _drawdown_states[key] = _DrawdownState(trades_rev, history_rev, *base, accs)
+            _drawdown_states.move_to_end(key)
+            while len(_drawdown_states) > ROLLUP_DRAWDOWN_CACHE_ENTRIES:
+                _drawdown_states.popitem(last=False)
+    return accs
+
+
+def compute_overview_from_rollups(conn, args) -> Dict[str, Any]:
+    where_sql, params = build_trade_filters(args)
+    cur = conn.cursor()
+    cur.execute(f"SELECT {_sum_metrics_sql()} FROM trade_rollups{where_sql}", params)
+    totals = _row_totals(cur.fetchone())
+
+    drawdowns = _scan_drawdowns(conn, args)
+    max_dd = drawdowns[None].max_dd if None in drawdowns else 0.0
+    return StatsAccumulator.from_totals(totals, max_dd).to_dict()
+
+
+def compute_grouped_from_rollups(conn, args, group_key: str) -> List[Dict[str, Any]]:
+    if group_key not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"Unsupported rollup group key: {group_key}")
+
+    where_sql, params = build_trade_filters(args)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {group_key}, {_sum_metrics_sql()} FROM trade_rollups{where_sql} "
+        f"GROUP BY {group_key} HAVING SUM(trade_count) > 0",
+        params,
+    )
+
+    # '' (NULL) và 0 đều thành "UNKNOWN" giống compute_grouped_stats
+    totals_by_key = {}
+    for row in cur.fetchall():
+        key = row[0] or "UNKNOWN"
+        _merge_totals(totals_by_key.setdefault(key, {}), _row_totals(row[1:]))
+
+    drawdowns = _scan_drawdowns(conn, args, group_col=group_key)
+
+    # Giữ thứ tự xuất hiện theo thời gian để các nhóm bằng net_r sort giống bản gốc
+    ordered_keys = [k for k in drawdowns if k in totals_by_key]
+    ordered_keys += [k for k in totals_by_key if k not in drawdowns]
+
+    groups = {}
+    for key in ordered_keys:
+        acc = drawdowns.get(key)
+        groups[key] = StatsAccumulator.from_totals(
+            totals_by_key[key], acc.max_dd if acc else 0.0
+        )
+    return _grouped_result(groups)
+
+
+def compute_monthly_pnl_from_rollups(conn, args) -> List[Dict[str, Any]]:
+    where_sql, params = build_trade_filters(args)
+    where_sql += (" AND" if where_sql else " WHERE") + " month != ''"
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT month, SUM(sum_profit) FROM trade_rollups{where_sql} "
+        f"GROUP BY month HAVING SUM(trade_count) > 0 ORDER BY month",
+        params,
+    )
+    return [{"month": month, "profit": round(pnl or 0.0, 2)} for month, pnl in cur.fetchall()]
+
+
+# === REBUILD / VERIFY ===
+def recompute_rollups(conn, risk_percent=RISK_PERCENT_DEFAULT) -> Dict[tuple, Dict[str, Any]]:
+    """Tính lại rollup từ bảng trades bằng Python (nguồn đối chiếu độc lập với trigger)."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT symbol, setup, session, timeframe, grade, date, capital, profit, profit_pct, "
+        "risk_amount FROM trades"
+    )
+
+    expected = {}
+    for symbol, setup, session, timeframe, grade, date, capital, profit, pct, risk in cur:
+        month = str(date)[:7] if date is not None else ""
+        key = (
+            symbol if symbol is not None else "",
+            setup if setup is not None else "",
+            session if session is not None else "",
+            timeframe if timeframe is not None else "",
+            grade if grade is not None else "",
+            month,
+        )
+        closed = profit is not None
+        r = r_multiple(capital, profit, risk_percent, risk) if closed else 0.0
+        p = _safe_float(profit, 0.0)
+
+        t = expected.setdefault(key, {m: 0 for m in ROLLUP_METRICS})
+        t["trade_count"] += 1
+        t["sum_profit"] += p
+        if p > 0:
+            t["gross_profit"] += p
+        elif p < 0:
+            t["gross_loss"] += p
+        if not closed:
+            continue
+        t["closed_count"] += 1
+        t["sum_profit_pct"] += _safe_float(pct, 0.0)
+        t["sum_r"] += r
+        if r > 0:
+            t["win_count"] += 1
+            t["sum_win_r"] += r
+        elif r < 0:
+            t["loss_count"] += 1
+            t["sum_loss_r"] += r
+        else:
+            t["breakeven_count"] += 1
+    return expected
+
+
+def verify_rollups(conn) -> List[str]:
+    """So sánh trade_rollups với recompute_rollups, trả về list mô tả sai lệch."""
+    expected = recompute_rollups(conn)
+
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {', '.join(ROLLUP_DIMENSIONS + ROLLUP_METRICS)} FROM trade_rollups "
+        f"WHERE trade_count != 0"
+    )
+    n_dims = len(ROLLUP_DIMENSIONS)
+    actual = {tuple(row[:n_dims]): _row_totals(row[n_dims:]) for row in cur.fetchall()}
+
+    problems = []
+    for key in sorted(set(expected) | set(actual), key=repr):
+        exp = expected.get(key)
+        act = actual.get(key)
+        if exp is None or act is None:
+            problems.append(f"{key}: expected={exp is not None} actual={act is not None}")
+            continue
+        for m in ROLLUP_METRICS:
+            if abs((exp[m] or 0) - (act[m] or 0)) > ROLLUP_FLOAT_TOLERANCE:
+                problems.append(f"{key}: {m} expected {exp[m]} got {act[m]}")
+    return problems
+
+
+def rebuild_rollups(conn):
+    """Dựng lại toàn bộ trade_rollups từ trades trong 1 transaction."""
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        for sql in REBUILD_TRADE_ROLLUPS_SQL:
+            cur.execute(sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
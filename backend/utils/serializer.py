@@ -0,0 +1,124 @@
+# utils/serializer.py
+"""
+Serialize response JSON nhanh hơn jsonify mặc định.
+
+- AppJSONProvider: JSON provider của app, backend cắm được (JSON_BACKEND):
+    "auto"  : orjson nếu đã cài, không thì json stdlib
+    "orjson": như auto (orjson là tùy chọn)
+    "stdlib": luôn dùng json stdlib
+  Backend stdlib cho ra đúng từng byte như jsonify (sort_keys, ensure_ascii,
+  compact). orjson cho cùng giá trị JSON, chỉ khác cách viết (ký tự non-ASCII
+  để nguyên UTF-8, số mũ float dạng 1e16); giá trị orjson không encode được
+  (vd: int > 64 bit) tự rơi về stdlib.
+- RowEncoder: dựng payload từ row tuple theo tên cột (cursor.description),
+  không qua dict_trade; arrays() encode thẳng tuple thành JSON array.
+"""
+import json
+from operator import itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+from config import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson là tùy chọn
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+
+_USE_ORJSON = JSON_BACKEND != "stdlib" and ORJSON_AVAILABLE
+
+
+def json_backend() -> str:
+    return "orjson" if _USE_ORJSON else "stdlib"
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    """
+    jsonify / response JSON qua encode() (bytes). dumps() giữ nguyên hành vi
+    của Flask cho code gọi flask.json.dumps trực tiếp.
+    """
+
+    def _orjson_options(self):
+        # date / datetime đi qua self.default như Flask (http_date), không dùng ISO của orjson
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def encode(self, obj) -> bytes:
+        """Encode compact (như body của jsonify, không có newline cuối)."""
+        if _USE_ORJSON:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+            except TypeError:
+                pass
+        return json.dumps(
+            obj,
+            default=self.default,
+            ensure_ascii=self.ensure_ascii,
+            sort_keys=self.sort_keys,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)  # debug: indent cho dễ đọc
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+class RowEncoder:
+    """
+    Payload từ row tuple theo tên cột, không tạo dict_trade:
+      - objects(rows): [ {field: value, ...}, ... ]  (dict(zip) chạy ở C)
+      - arrays(rows):  { "columns": [...], "rows": [[...], ...] }  (không tạo dict nào)
+    fields: cột cần trả về (theo thứ tự), mặc định tất cả.
+    computed: [(tên field, cột nguồn, hàm)] -> field tính thêm từ 1 cột,
+              vd: ("chart_before_urls", "chart_before", chart_urls).
+    """
+
+    def __init__(self, names, fields=None, computed=()):
+        names = list(names)
+        self.fields = tuple(fields or names)
+        positions = [names.index(f) for f in self.fields]
+        self._identity = positions == list(range(len(names)))
+        if len(positions) == 1:
+            index = positions[0]
+            self._project = lambda row: (row[index],)
+        else:
+            self._project = itemgetter(*positions)
+        self.computed = [
+            (name, names.index(source), fn)
+            for name, source, fn in computed
+            if source in names
+        ]
+        self.columns = list(self.fields) + [name for name, _, _ in self.computed]
+
+    @classmethod
+    def from_cursor(cls, cursor, fields=None, computed=()) -> "RowEncoder":
+        """Tên cột lấy từ cursor.description (gọi ngay sau execute)."""
+        return cls([d[0] for d in cursor.description], fields, computed)
+
+    def _values(self, row):
+        values = self._project(row)
+        if self.computed:
+            values += tuple(fn(row[index]) for _, index, fn in self.computed)
+        return values
+
+    def objects(self, rows) -> list:
+        keys = self.columns
+        if not self.computed:
+            project = self._project
+            return [dict(zip(keys, project(r))) for r in rows]
+        values = self._values
+        return [dict(zip(keys, values(r))) for r in rows]
+
+    def arrays(self, rows) -> dict:
+        if self._identity and not self.computed:
+            data = rows if isinstance(rows, list) else list(rows)
+        else:
+            data = [self._values(r) for r in rows]
+        return {"columns": self.columns, "rows": data}
@@ -0,0 +1,153 @@
+# utils/stats_cache.py
+"""
+Cache in-process cho kết quả stats.
+
+- Key = (endpoint, filter đã chuẩn hóa, revision bảng trades).
+- LRU: giới hạn số entry, bỏ entry ít dùng nhất khi đầy; TTL tùy chọn.
+- Invalidate chính xác: khi revision trades tăng (có ghi dữ liệu), mọi entry
+  của revision cũ bị xóa; ghi vào setups / reviews không ảnh hưởng.
+- Counters hits / misses / evictions / invalidations / expirations cho monitoring.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from config import STATS_CACHE_MAX_ENTRIES, STATS_CACHE_TTL_SECONDS
+from db import get_connection
+from models.revisions import get_revisions
+
+_MISSING = object()
+
+
+def normalize_args(args):
+    """
+    Query args (hoặc dict) -> tuple sort sẵn, bỏ giá trị rỗng, để
+    ?a=1&b= và ?b=&a=1 trùng key. Chỉ lấy giá trị đầu như args.get().
+    """
+    return tuple(
+        (key, args.get(key)) for key in sorted(args.keys()) if args.get(key)
+    )
+
+
+class StatsCache:
+    def __init__(self, max_entries=256, ttl_seconds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (revision, created_at, value)
+        self._lock = threading.Lock()
+        self._revision = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def _sync_revision(self, revision):
+        """
+        Gọi khi đang giữ lock. Revision mới hơn -> xóa các entry của revision cũ.
+        Trả về False nếu revision cũ hơn revision hiện tại (request đọc DB trước
+        1 lần ghi nhưng xong sau): không đọc / ghi cache, không xóa entry mới.
+        """
+        if revision == self._revision:
+            return True
+        if self._revision is not None and revision < self._revision:
+            return False
+        stale = [k for k, (rev, _, _) in self._entries.items() if rev != revision]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += len(stale)
+        self._revision = revision
+        return True
+
+    def get(self, key, revision):
+        with self._lock:
+            entry = self._entries.get(key) if self._sync_revision(revision) else None
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+
+            _, created_at, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, revision, value):
+        with self._lock:
+            if not self._sync_revision(revision):
+                return
+            self._entries[key] = (revision, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, revision, compute):
+        value = self.get(key, revision)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, revision, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "revision": self._revision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations,
+            }
+
+
+stats_cache = StatsCache(STATS_CACHE_MAX_ENTRIES, STATS_CACHE_TTL_SECONDS)
+
+
+def trades_revision():
+    """Revision bảng trades (dùng lại giá trị http_cache đã đọc trong request nếu có)."""
+    revisions = g.get("revisions")
+    if revisions is None or "trades" not in revisions:
+        revisions = get_revisions(get_connection(), ("trades",))
+    return revisions.get("trades", 0)
+
+
+def cached_stats(view):
+    """
+    Decorator cho stats endpoint: cache body JSON đã serialize theo
+    (endpoint, args, revision trades). Chỉ cache response 200.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.endpoint, normalize_args(request.args))
+        revision = trades_revision()
+
+        cached = stats_cache.get(key, revision)
+        if cached is not _MISSING:
+            body, mimetype = cached
+            return current_app.response_class(body, status=200, mimetype=mimetype)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            stats_cache.put(key, revision, (response.get_data(), response.mimetype))
+        return response
+
+    return wrapper
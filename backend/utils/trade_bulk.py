@@ -0,0 +1,182 @@
+# utils/trade_bulk.py
+"""
+Áp dụng hàng loạt thao tác lên trades trong 1 transaction (POST /api/trades/bulk),
+cùng kết quả như gọi lần lượt từng endpoint đơn lẻ:
+  - exit   : như POST /update_exit/<id> (tính profit / profit_pct theo
+             instrument_specs của symbol)
+  - review : như PATCH /trades/<id> (ghi đè grade, mistakes, exit_reason,
+             note, psychological_tags, lessons)
+  - delete : như DELETE /trades/<id>
+
+Trades liên quan được đọc bằng vài câu SELECT ... IN (...), exit được tính
+profit trong Python, rồi mỗi loại thao tác ghi bằng 1 executemany. Thao tác
+lỗi (sai dữ liệu, trade không tồn tại / đã bị xóa ở thao tác trước trong cùng
+batch) chỉ bị bỏ qua, không làm hỏng các thao tác còn lại.
+"""
+import json
+import math
+
+from db import run_with_busy_retry
+from utils.instruments import load_instrument_specs, price_exit, risk_for, spec_for
+
+BULK_OPS = ("exit", "review", "delete")
+
+# Số id / câu SELECT ... IN (...) (dưới giới hạn 999 tham số của SQLite cũ)
+_ID_CHUNK_SIZE = 500
+
+UPDATE_EXIT_SQL = (
+    "UPDATE trades SET exit = ?, profit = ?, profit_pct = ?, risk_amount = ? WHERE id = ?"
+)
+
+UPDATE_REVIEW_SQL = (
+    "UPDATE trades SET grade = ?, mistakes = ?, exit_reason = ?, "
+    "note = ?, psychological_tags = ?, lessons = ? WHERE id = ?"
+)
+
+DELETE_TRADE_SQL = "DELETE FROM trades WHERE id = ?"
+
+# Khoảng giá trị của INTEGER (int64) trong SQLite
+_SQLITE_INT_MIN, _SQLITE_INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def review_values(data):
+    """
+    Body review -> (grade, mistakes, exit_reason, note, psychological_tags, lessons)
+    theo thứ tự của UPDATE_REVIEW_SQL. Field thiếu -> giá trị rỗng (ghi đè).
+    """
+    mistakes = data.get("mistakes", [])
+    psych_tags = data.get("psychological_tags", [])
+    return (
+        data.get("grade"),
+        json.dumps(mistakes) if isinstance(mistakes, list) else "[]",
+        data.get("exit_reason", ""),
+        data.get("note", ""),
+        json.dumps(psych_tags) if isinstance(psych_tags, list) else "[]",
+        data.get("lessons", ""),
+    )
+
+
+def _parse_operation(item):
+    """1 phần tử của operations -> (op, id, payload). Raise ValueError nếu sai."""
+    if not isinstance(item, dict):
+        raise ValueError("Operation must be an object")
+    op = item.get("op")
+    if op not in BULK_OPS:
+        raise ValueError(f"Unknown op: {op}")
+    trade_id = item.get("id")
+    if not isinstance(trade_id, int) or isinstance(trade_id, bool):
+        raise ValueError("id must be an integer")
+    if not _SQLITE_INT_MIN <= trade_id <= _SQLITE_INT_MAX:
+        raise ValueError("id is out of range")
+
+    if op == "exit":
+        if "exit" not in item:
+            raise ValueError("exit is required")
+        try:
+            exit_price = float(item["exit"])
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("exit must be a number")
+        if not math.isfinite(exit_price):
+            raise ValueError("exit must be a finite number")
+        return op, trade_id, exit_price
+    if op == "review":
+        return op, trade_id, review_values(item)
+    return op, trade_id, None
+
+
+def _fetch_targets(cur, ids):
+    """id -> (symbol, entry, direction, capital, sl, tp, chart_before, chart_after)."""
+    ids = list(ids)
+    rows = {}
+    for start in range(0, len(ids), _ID_CHUNK_SIZE):
+        chunk = ids[start:start + _ID_CHUNK_SIZE]
+        cur.execute(
+            "SELECT id, symbol, entry, direction, capital, sl, tp, chart_before, chart_after "
+            f"FROM trades WHERE id IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        )
+        for row in cur.fetchall():
+            rows[row[0]] = row[1:]
+    return rows
+
+
+def _apply(conn, parsed):
+    """
+    Đọc trades + ghi mọi thao tác trong 1 transaction (BEGIN IMMEDIATE: không
+    trade nào bị sửa / xóa giữa lúc đọc và ghi).
+    Trả về (index -> kết quả, [(index, chart_before, chart_after)] của trades bị xóa).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        targets = _fetch_targets(cur, {trade_id for _, (_, trade_id, _) in parsed})
+        specs = load_instrument_specs(conn)
+
+        outcomes = {}
+        exits, reviews, deletes, released = [], [], [], []
+        deleted = set()
+        for index, (op, trade_id, payload) in parsed:
+            target = targets.get(trade_id)
+            if target is None or trade_id in deleted:
+                outcomes[index] = {"status": 404, "error": "Trade not found"}
+                continue
+
+            if op == "exit":
+                symbol, entry, direction, capital, sl, tp = target[:6]
+                spec = spec_for(specs, symbol)
+                profit, profit_pct = price_exit(spec, payload, entry, direction, capital, sl, tp)
+                exits.append((payload, profit, profit_pct, risk_for(spec, capital), trade_id))
+                outcomes[index] = {
+                    "status": 200, "exit": payload, "profit": profit, "profit_pct": profit_pct,
+                }
+            elif op == "review":
+                reviews.append((*payload, trade_id))
+                outcomes[index] = {"status": 200}
+            else:
+                deletes.append((trade_id,))
+                deleted.add(trade_id)
+                released.append((index, target[6], target[7]))
+                outcomes[index] = {"status": 200}
+
+        # Thao tác sau delete của cùng id đã bị 404 ở trên -> ghi theo nhóm
+        # (exit, review, rồi delete) cho cùng kết quả với ghi lần lượt
+        if exits:
+            cur.executemany(UPDATE_EXIT_SQL, exits)
+        if reviews:
+            cur.executemany(UPDATE_REVIEW_SQL, reviews)
+        if deletes:
+            cur.executemany(DELETE_TRADE_SQL, deletes)
+        conn.commit()
+        return outcomes, released
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def apply_bulk(conn, operations):
+    """
+    Áp dụng operations (list [{op, id, ...}]) rồi trả về (results, released):
+      - results: mỗi thao tác 1 phần tử, cùng thứ tự:
+        {index, op, id, status: 200 | 400 | 404, error?, exit?, profit?, profit_pct?}
+      - released: [(result, chart_before, chart_after)] của trades đã bị xóa,
+        để caller giải phóng file chart sau commit.
+    Lỗi SQLite -> rollback toàn bộ batch và raise.
+    """
+    results = []
+    parsed = []
+    for index, item in enumerate(operations):
+        result = {"index": index}
+        if isinstance(item, dict):
+            result.update(op=item.get("op"), id=item.get("id"))
+        results.append(result)
+        try:
+            parsed.append((index, _parse_operation(item)))
+        except ValueError as e:
+            result.update(status=400, error=str(e))
+    if not parsed:
+        return results, []
+
+    outcomes, released = run_with_busy_retry(_apply, conn, parsed)
+    for index, outcome in outcomes.items():
+        results[index].update(outcome)
+    return results, [(results[index], before, after) for index, before, after in released]
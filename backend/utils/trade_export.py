@@ -0,0 +1,70 @@
+# utils/trade_export.py
+"""
+Export trades dạng stream: đọc cursor theo từng batch (fetchmany) và yield
+từng chunk bytes, bộ nhớ không phụ thuộc số lượng trades.
+
+1 câu SELECT duy nhất nên dữ liệu export là 1 snapshot nhất quán (WAL).
+"""
+import csv
+import io
+import json
+import zlib
+
+from config import EXPORT_BATCH_SIZE
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def iter_cursor_batches(cur, batch_size=EXPORT_BATCH_SIZE):
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_csv_chunks(batches, columns):
+    """Header + các dòng CSV, mỗi batch -> 1 chunk bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson_chunks(batches, columns):
+    """Mỗi trade 1 dòng JSON, mỗi batch -> 1 chunk bytes."""
+    for rows in batches:
+        lines = [json.dumps(dict(zip(columns, r)), ensure_ascii=False) for r in rows]
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Nén gzip dạng stream (không giữ toàn bộ output trong RAM)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = header gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(cur, columns, fmt, gzip=False):
+    """Generator bytes cho response export (cur đã execute SELECT các cột columns)."""
+    batches = iter_cursor_batches(cur)
+    if fmt == "csv":
+        chunks = iter_csv_chunks(batches, columns)
+    else:
+        chunks = iter_ndjson_chunks(batches, columns)
+    return gzip_chunks(chunks) if gzip else chunks
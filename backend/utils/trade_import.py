@@ -0,0 +1,362 @@
+# utils/trade_import.py
+"""
+Import hàng loạt trades từ file CSV hoặc statement MT4 / MT5 (export ra CSV).
+
+- File được đọc dạng stream: parse từng dòng, chỉ giữ tối đa 1 chunk trong RAM.
+- Mỗi chunk INSERT bằng executemany trong 1 transaction riêng (BEGIN IMMEDIATE),
+  retry khi DB bị lock. Chunk lỗi không làm mất các chunk đã commit; import lại
+  cùng file an toàn vì trùng lặp bị bỏ qua.
+- Chống trùng theo import_key (UNIQUE index + INSERT OR IGNORE):
+    * có ticket / position -> "ticket:<số>"
+    * không có -> hash (thời gian vào lệnh nguyên văn, symbol, direction,
+      entry, sl, tp, exit, size); dòng giống hệt nhau trong cùng file (vd:
+      scale-in cùng giá) được đánh số "#2", "#3"... theo thứ tự xuất hiện
+      trong khối cùng thời gian vào lệnh -> import lại file vẫn ra cùng key.
+  Dòng bị bỏ qua vì trùng được liệt kê trong report (duplicate_rows: line, import_key).
+- rr / profit / profit_pct tính giống add_trade / update_exit (calculate_rr,
+  price_exit theo instrument_specs). File có sẵn profit thì giữ nguyên:
+    * csv: cột profit / profit_pct
+    * mt4 / mt5: Profit + Commission + Swap (+ Taxes) = lãi / lỗ ròng của broker,
+      profit_pct = profit / capital (0 nếu không có capital)
+
+Định dạng:
+  csv : header = tên cột bảng trades (date, symbol, direction, entry, sl, tp,
+        exit, capital, ...), thêm cột ticket nếu có. Cột lạ bị bỏ qua.
+  mt4 : Ticket, Open Time, Type, Size, Item, Price, S / L, T / P, Close Time, Price, ...
+  mt5 : Time, Position, Symbol, Type, Volume, Price, S / L, T / P, Time, Price, ...
+  Chỉ lấy dòng Type = buy / sell (bỏ balance, lệnh chờ...).
+"""
+import codecs
+import csv
+import hashlib
+import io
+import re
+from functools import lru_cache
+from itertools import islice
+
+from config import IMPORT_CHUNK_SIZE
+from db import run_with_busy_retry
+from models.trades import IMPORT_TRADE_COLUMNS, INSERT_IMPORTED_TRADE_SQL, TRADE_COLUMNS
+from utils.json_helpers import to_json_list
+from utils.instruments import load_instrument_specs, price_exit, risk_for, spec_for
+from utils.risk import calculate_rr
+
+IMPORT_FORMATS = ("auto", "csv", "mt4", "mt5")
+
+# Số lỗi / dòng trùng tối đa trả về trong report (vẫn đếm đủ trong error_count / duplicates)
+MAX_REPORTED_ERRORS = 50
+
+# Số import_key / câu SELECT ... IN (...) (dưới giới hạn 999 tham số của SQLite cũ)
+_KEY_CHUNK_SIZE = 500
+
+_LIST_FIELDS = ("confluence", "entry_model", "psychological_tags", "mistakes")
+_CSV_FIELDS = set(TRADE_COLUMNS[1:]) | {"ticket", "size"}
+
+# Header MT4 / MT5 (đã chuẩn hóa) -> field nội bộ.
+# "price" / "time" xuất hiện 2 lần: lần đầu là lúc vào lệnh, lần sau là lúc đóng.
+_MT_HEADER_ALIASES = {
+    "ticket": "ticket",
+    "position": "ticket",
+    "opentime": "open_time",
+    "closetime": "close_time",
+    "type": "type",
+    "item": "symbol",
+    "symbol": "symbol",
+    "s/l": "sl",
+    "t/p": "tp",
+    "size": "size",
+    "volume": "size",
+    "profit": "profit",
+    "commission": "commission",
+    "swap": "swap",
+    "taxes": "taxes",
+}
+# Các khoản cộng vào lãi / lỗ ròng của lệnh MT4 / MT5
+_MT_PROFIT_FIELDS = ("profit", "commission", "swap", "taxes")
+_MT_DIRECTIONS = {"buy": "long", "sell": "short"}
+
+# Field dạng list thường lặp lại giữa các dòng -> cache kết quả chuẩn hóa
+_json_list = lru_cache(maxsize=4096)(to_json_list)
+
+_DATE_RE = re.compile(r"^(\d{4})[.\-/](\d{2})[.\-/](\d{2})")
+
+
+def _norm_header(name) -> str:
+    return re.sub(r"\s+", "", str(name or "")).lower()
+
+
+def open_text_stream(binary):
+    """
+    Bọc stream bytes thành text, nhận BOM UTF-8 / UTF-16 (MT4 / MT5 hay export
+    UTF-16). Stream phải seek được (file upload của Werkzeug / file trên đĩa).
+    """
+    head = binary.read(4)
+    binary.seek(0)
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = "utf-16"
+    else:
+        encoding = "utf-8-sig"
+    return io.TextIOWrapper(binary, encoding=encoding, errors="replace", newline="")
+
+
+def detect_format(header) -> str:
+    names = {_norm_header(h) for h in header}
+    if "ticket" in names and "item" in names:
+        return "mt4"
+    if "position" in names and "symbol" in names and "s/l" in names:
+        return "mt5"
+    if "symbol" in names or "date" in names:
+        return "csv"
+    raise ValueError("Unrecognized import header")
+
+
+def _column_names(header, fmt):
+    """Field nội bộ cho từng cột của header (None = bỏ qua cột)."""
+    if fmt == "csv":
+        return [n if n in _CSV_FIELDS else None for n in (_norm_header(h) for h in header)]
+
+    names = []
+    seen = {"price": 0, "time": 0}
+    for h in header:
+        key = _norm_header(h)
+        if key in seen:
+            first, second = ("entry", "exit") if key == "price" else ("open_time", "close_time")
+            names.append(first if seen[key] == 0 else second)
+            seen[key] += 1
+        else:
+            names.append(_MT_HEADER_ALIASES.get(key))
+    return names
+
+
+def _to_float(value, default=0.0):
+    if value is None:
+        return default
+    value = str(value).strip().replace(" ", "")
+    if value == "":
+        return default
+    return float(value)
+
+
+def _parse_date(value):
+    """"2024.03.05 10:15:22" / "2024-03-05" -> "2024-03-05" (rỗng -> None)."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    m = _DATE_RE.match(value)
+    if not m:
+        raise ValueError(f"Invalid date: {value}")
+    return "-".join(m.groups())
+
+
+def _opened_at(fields, fmt):
+    """Thời gian vào lệnh nguyên văn (giữ giờ phút giây nếu file có)."""
+    return (fields.get("date" if fmt == "csv" else "open_time") or "").strip()
+
+
+def _import_key(fields, fmt, direction, entry, sl, tp, exit_price):
+    ticket = (fields.get("ticket") or "").strip()
+    if ticket:
+        return f"ticket:{ticket}"
+    raw = "|".join(
+        str(v) for v in (
+            _opened_at(fields, fmt), (fields.get("symbol") or "").strip(), direction,
+            entry, sl, tp, exit_price, (fields.get("size") or "").strip(),
+        )
+    )
+    return "sha1:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_import_row(fields, fmt, default_capital=0.0, specs=None):
+    """
+    Dict field thô của 1 dòng -> tuple giá trị theo IMPORT_TRADE_COLUMNS.
+    Trả về None nếu dòng không phải lệnh (balance, lệnh chờ...).
+    Raise ValueError nếu dữ liệu hỏng.
+    specs: {symbol: InstrumentSpec} từ load_instrument_specs (None = mặc định config).
+    """
+    if fmt == "csv":
+        direction = (fields.get("direction") or "").strip().lower()
+        date = _parse_date(fields.get("date"))
+    else:
+        direction = _MT_DIRECTIONS.get((fields.get("type") or "").strip().lower())
+        if direction is None:
+            return None
+        date = _parse_date(fields.get("open_time"))
+
+    entry, sl, tp, exit_price = (_to_float(fields.get(f)) for f in ("entry", "sl", "tp", "exit"))
+    capital = _to_float(fields.get("capital"), default_capital)
+
+    # Lệnh chưa đóng: exit / profit = 0 giống add_trade
+    spec = spec_for(specs or {}, fields.get("symbol"))
+    has_profit = bool((fields.get("profit") or "").strip())
+    if has_profit and fmt == "csv":
+        profit = _to_float(fields.get("profit"))
+        profit_pct = _to_float(fields.get("profit_pct"))
+    elif has_profit:
+        profit = round(sum(_to_float(fields.get(f)) for f in _MT_PROFIT_FIELDS), 2)
+        profit_pct = round(profit / capital * 100, 2) if capital > 0 else 0.0
+    elif exit_price:
+        profit, profit_pct = price_exit(spec, exit_price, entry, direction, capital, sl, tp)
+    else:
+        profit, profit_pct = 0, 0
+
+    grade = (fields.get("grade") or "").strip()
+    values = {
+        "date": date,
+        "symbol": (fields.get("symbol") or "").strip(),
+        "direction": direction,
+        "entry": entry,
+        "sl": sl,
+        "tp": tp,
+        "exit": exit_price,
+        "capital": capital,
+        "rr": calculate_rr(entry, sl, tp),
+        "profit": profit,
+        "profit_pct": profit_pct,
+        # 1R của lệnh đã đóng theo thông số hiện tại (kể cả profit lấy từ file)
+        "risk_amount": risk_for(spec, capital) if has_profit or exit_price else None,
+        "grade": int(float(grade)) if grade else None,
+        "chart_before": None,
+        "chart_after": None,
+        "import_key": _import_key(fields, fmt, direction, entry, sl, tp, exit_price),
+    }
+    for name in _LIST_FIELDS:
+        values[name] = _json_list(fields.get(name))
+
+    return tuple([
+        values[c] if c in values else (fields.get(c) or "")
+        for c in IMPORT_TRADE_COLUMNS
+    ])
+
+
+def iter_import_rows(text, fmt="auto", default_capital=0.0, report=None, specs=None):
+    """
+    Generator: parse stream text -> (số dòng, tuple giá trị) của từng lệnh hợp lệ.
+    Dòng bị bỏ qua / lỗi được ghi vào report (dict) nếu truyền vào.
+    """
+    report = report if report is not None else new_import_report()
+
+    header_line = ""
+    while not header_line.strip():
+        header_line = text.readline()
+        if not header_line:
+            raise ValueError("Empty import file")
+
+    delimiter = max((",", ";", "\t"), key=header_line.count)
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    if fmt == "auto":
+        fmt = detect_format(header)
+    report["format"] = fmt
+    names = _column_names(header, fmt)
+
+    # Số lần gặp mỗi key hash trong khối dòng cùng thời gian vào lệnh (file xếp
+    # theo thời gian -> dict luôn nhỏ)
+    occurrences = {}
+    opened_block = None
+
+    reader = csv.reader(text, delimiter=delimiter)
+    for cells in reader:
+        if not any(c.strip() for c in cells):
+            continue
+        report["rows"] += 1
+        fields = {n: v for n, v in zip(names, cells) if n}
+        try:
+            row = normalize_import_row(fields, fmt, default_capital, specs)
+        except (TypeError, ValueError) as e:
+            report["error_count"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                # +1 vì dòng header đã đọc riêng
+                report["errors"].append({"line": reader.line_num + 1, "error": str(e)})
+            continue
+        if row is None:
+            report["skipped"] += 1
+            continue
+
+        key = row[-1]
+        if key.startswith("sha1:"):
+            opened = _opened_at(fields, fmt)
+            if opened != opened_block:
+                occurrences.clear()
+                opened_block = opened
+            n = occurrences[key] = occurrences.get(key, 0) + 1
+            if n > 1:
+                row = row[:-1] + (f"{key}#{n}",)
+        # +1 vì dòng header đã đọc riêng
+        yield reader.line_num + 1, row
+
+
+def new_import_report():
+    return {
+        "format": None,
+        "rows": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "duplicate_rows": [],
+        "skipped": 0,
+        "error_count": 0,
+        "errors": [],
+    }
+
+
+def _insert_chunk(conn, chunk):
+    """
+    INSERT 1 chunk [(số dòng, row)] trong 1 transaction.
+    Trả về (số lệnh đã ghi, [(số dòng, import_key)] của dòng trùng).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        keys = [row[-1] for _, row in chunk]
+        existing = set()
+        for start in range(0, len(keys), _KEY_CHUNK_SIZE):
+            part = keys[start:start + _KEY_CHUNK_SIZE]
+            cur.execute(
+                f"SELECT import_key FROM trades WHERE import_key IN ({', '.join('?' for _ in part)})",
+                part,
+            )
+            existing.update(k for (k,) in cur.fetchall())
+
+        rows, duplicates = [], []
+        for line, row in chunk:
+            if row[-1] in existing:
+                duplicates.append((line, row[-1]))
+            else:
+                existing.add(row[-1])
+                rows.append(row)
+        cur.executemany(INSERT_IMPORTED_TRADE_SQL, rows)
+        inserted = cur.rowcount
+        conn.commit()
+        return inserted, duplicates
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def import_trades(conn, binary, fmt="auto", default_capital=0.0, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import file (stream bytes) vào bảng trades, trả về report:
+    rows / inserted / duplicates / duplicate_rows / skipped / error_count / errors.
+    Raise ValueError nếu header không nhận dạng được.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    report = new_import_report()
+    specs = load_instrument_specs(conn)
+    rows = iter_import_rows(open_text_stream(binary), fmt, default_capital, report, specs)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        inserted, duplicates = run_with_busy_retry(_insert_chunk, conn, chunk)
+        report["inserted"] += inserted
+        report["duplicates"] += len(chunk) - inserted
+        room = MAX_REPORTED_ERRORS - len(report["duplicate_rows"])
+        report["duplicate_rows"].extend(
+            {"line": line, "import_key": key} for line, key in duplicates[:max(room, 0)]
+        )
+
+    if report["inserted"]:
+        # Cập nhật thống kê planner sau khi bảng thay đổi nhiều
+        conn.execute("PRAGMA optimize")
+    return report
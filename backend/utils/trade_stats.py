@@ -1,5 +1,8 @@
 # utils/trade_stats.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable
+from collections import deque
+from datetime import date, timedelta
+from itertools import combinations
 import json
 
 
@@ -18,14 +21,26 @@ def _safe_float(value, default=0.0):
 def compute_r_multiple(trade: Dict[str, Any], risk_percent: float = RISK_PERCENT_DEFAULT) -> float:
     """
     Tính R-multiple của 1 lệnh:
-      R = profit / (capital * risk_percent)
+      R = profit / risk_amount  (risk lưu lúc tính profit, xem utils/instruments.risk_for)
 
-    Giả định:
+    Lệnh chưa có risk_amount (tính trước migration 13):
       - risk mỗi lệnh = risk_percent * capital (mặc định 1% vốn)
     """
-    capital = _safe_float(trade.get("capital"), 0.0)
-    profit = _safe_float(trade.get("profit"), 0.0)
+    return r_multiple(
+        trade.get("capital"), trade.get("profit"), risk_percent, trade.get("risk_amount")
+    )
+
+
+def r_multiple(
+    capital, profit, risk_percent: float = RISK_PERCENT_DEFAULT, risk_amount=None
+) -> float:
+    """R-multiple từ giá trị cột capital / profit / risk_amount (không cần dict trade)."""
+    profit = _safe_float(profit, 0.0)
+    stored_risk = _safe_float(risk_amount, 0.0)
+    if stored_risk > 0:
+        return profit / stored_risk
 
+    capital = _safe_float(capital, 0.0)
     if capital <= 0 or risk_percent <= 0:
         return 0.0
 
@@ -260,6 +275,8 @@ def compute_grouped_stats(
     # Sắp xếp nhóm theo net_r giảm dần (setup/sess tốt nhất lên đầu)
     result.sort(key=lambda g: g["stats"].get("net_r", 0.0), reverse=True)
     return result
+
+
 def compute_monthly_pnl(trades: List[Dict[str, Any]]):
     """
     Group theo tháng (YYYY-MM), tính tổng profit theo $.
@@ -308,25 +325,29 @@ def compute_mistakes_counts(trades: List[Dict[str, Any]]):
     counts = {}
 
     for t in trades:
-        raw = t.get("mistakes")
-        if not raw:
-            continue
+        for label in _iter_mistakes(t.get("mistakes")):
+            counts[label] = counts.get(label, 0) + 1
 
-        try:
-            arr = json.loads(raw)
-        except Exception:
-            continue
+    return counts
 
-        if not isinstance(arr, list):
-            continue
 
-        for m in arr:
-            label = str(m).strip()
-            if not label:
-                continue
-            counts[label] = counts.get(label, 0) + 1
+def _iter_mistakes(raw):
+    """Parse cột mistakes (JSON list) -> các label đã strip, bỏ qua giá trị lỗi."""
+    if not raw:
+        return
 
-    return counts
+    try:
+        arr = json.loads(raw)
+    except Exception:
+        return
+
+    if not isinstance(arr, list):
+        return
+
+    for m in arr:
+        label = str(m).strip()
+        if label:
+            yield label
 
 def _closed_trades(trades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Chỉ lấy trade đã đóng (có profit)."""
@@ -405,3 +426,628 @@ def compute_review_package(trades: List[Dict[str, Any]], risk_percent: float = R
         "worst_trade": worst,
         "win_streak": streak,
     }
+
+
+# === REVIEW NHIỀU KỲ (TUẦN / THÁNG) ===
+PERIOD_BUCKETS = ("week", "month")
+
+
+def period_windows(bucket: str, count: int, anchor: date) -> List[Dict[str, str]]:
+    """
+    count kỳ liên tiếp, kỳ cuối chứa ngày anchor, cũ -> mới:
+      [{"period": "2024-05" | "2024-W19", "from": "YYYY-MM-DD", "to": "YYYY-MM-DD"}, ...]
+    Tuần bắt đầu từ thứ Hai (ISO week).
+    """
+    windows = []
+    if bucket == "week":
+        start = anchor - timedelta(days=anchor.weekday())
+        for _ in range(count):
+            year, week, _ = start.isocalendar()
+            windows.append({
+                "period": f"{year}-W{week:02d}",
+                "from": start.isoformat(),
+                "to": (start + timedelta(days=6)).isoformat(),
+            })
+            start -= timedelta(days=7)
+    else:
+        start = anchor.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        for _ in range(count):
+            windows.append({
+                "period": start.strftime("%Y-%m"),
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+            })
+            end = start - timedelta(days=1)
+            start = end.replace(day=1)
+    windows.reverse()
+    return windows
+
+
+def compute_period_reviews(
+    trades: List[Dict[str, Any]],
+    windows: List[Dict[str, str]],
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> List[Dict[str, Any]]:
+    """
+    Review package (như compute_review_package) cho từng kỳ của period_windows.
+    trades phải theo thứ tự date tăng dần (như _fetch_trades_with_filters):
+    chia vào các kỳ trong 1 lần duyệt (so sánh chuỗi ISO, không parse ngày).
+    """
+    buckets = [[] for _ in windows]
+    i = 0
+    for t in trades:
+        d = t.get("date")
+        if not d:
+            continue
+        # so sánh chuỗi như filter SQL "date >= from AND date <= to" của /stats/review
+        while i < len(windows) and d > windows[i]["to"]:
+            i += 1
+        if i == len(windows):
+            break
+        if d >= windows[i]["from"]:
+            buckets[i].append(t)
+
+    return [
+        {**window, **compute_review_package(bucket, risk_percent)}
+        for window, bucket in zip(windows, buckets)
+    ]
+
+
+class StatsAccumulator:
+    """
+    Cộng dồn các chỉ số của compute_overview_stats trong 1 lần duyệt.
+
+    - add() phải được gọi theo thứ tự (date, id) tăng dần để max drawdown
+      khớp với compute_equity_curve.
+    - to_dict() trả về đúng format của compute_overview_stats.
+    """
+
+    __slots__ = (
+        "total", "wins", "losses", "breakeven",
+        "net_profit", "net_profit_pct", "net_r",
+        "sum_win_r", "sum_loss_r", "gross_profit", "gross_loss",
+        "cum_r", "peak", "max_dd",
+    )
+
+    def __init__(self):
+        self.total = 0
+        self.wins = 0
+        self.losses = 0
+        self.breakeven = 0
+        self.net_profit = 0.0
+        self.net_profit_pct = 0.0
+        self.net_r = 0.0
+        self.sum_win_r = 0.0
+        self.sum_loss_r = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.cum_r = 0.0
+        self.peak = float("-inf")
+        self.max_dd = 0.0
+
+    def add(self, r: float, profit: float, pct: float) -> float:
+        """Thêm 1 lệnh đã đóng, trả về equity_r (đã round) sau lệnh này."""
+        self.total += 1
+        if r > 0:
+            self.wins += 1
+            self.sum_win_r += r
+        elif r < 0:
+            self.losses += 1
+            self.sum_loss_r += r
+        else:
+            self.breakeven += 1
+
+        self.net_profit += profit
+        self.net_profit_pct += pct
+        self.net_r += r
+
+        if profit > 0:
+            self.gross_profit += profit
+        elif profit < 0:
+            self.gross_loss += profit
+
+        # Drawdown tính trên equity đã round giống compute_max_drawdown_from_curve
+        self.cum_r += r
+        equity = round(self.cum_r, 2)
+        if equity > self.peak:
+            self.peak = equity
+        dd = self.peak - equity
+        if dd > self.max_dd:
+            self.max_dd = dd
+        return equity
+
+    @classmethod
+    def from_totals(cls, totals: Dict[str, Any], max_dd: float = 0.0) -> "StatsAccumulator":
+        """Dựng accumulator từ tổng đã tính sẵn (vd: bảng trade_rollups)."""
+        acc = cls()
+        acc.total = int(totals.get("closed_count") or 0)
+        acc.wins = int(totals.get("win_count") or 0)
+        acc.losses = int(totals.get("loss_count") or 0)
+        acc.breakeven = int(totals.get("breakeven_count") or 0)
+        acc.net_profit = float(totals.get("sum_profit") or 0.0)
+        acc.net_profit_pct = float(totals.get("sum_profit_pct") or 0.0)
+        acc.net_r = float(totals.get("sum_r") or 0.0)
+        acc.sum_win_r = float(totals.get("sum_win_r") or 0.0)
+        acc.sum_loss_r = float(totals.get("sum_loss_r") or 0.0)
+        acc.gross_profit = float(totals.get("gross_profit") or 0.0)
+        acc.gross_loss = float(totals.get("gross_loss") or 0.0)
+        acc.max_dd = max_dd
+        return acc
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.total
+        if total == 0:
+            return compute_overview_stats([])
+
+        winrate = (self.wins / total) * 100
+        p_win = self.wins / total
+        p_loss = self.losses / total
+        avg_win_r = self.sum_win_r / self.wins if self.wins > 0 else 0.0
+        avg_loss_r = abs(self.sum_loss_r) / self.losses if self.losses > 0 else 0.0
+        expectancy_r = p_win * avg_win_r - p_loss * avg_loss_r
+
+        gross_loss = abs(self.gross_loss)
+        if gross_loss > 0:
+            profit_factor = round(self.gross_profit / gross_loss, 2)
+        elif self.gross_profit > 0:
+            profit_factor = None
+        else:
+            profit_factor = 0.0
+
+        return {
+            "total_trades": total,
+            "win_trades": self.wins,
+            "loss_trades": self.losses,
+            "breakeven_trades": self.breakeven,
+            "winrate": round(winrate, 2),
+            "net_profit": round(self.net_profit, 2),
+            "avg_profit": round(self.net_profit / total, 2),
+            "net_profit_pct": round(self.net_profit_pct, 2),
+            "avg_profit_pct": round(self.net_profit_pct / total, 2),
+            "net_r": round(self.net_r, 2),
+            "avg_r": round(self.net_r / total, 2),
+            "expectancy_r": round(expectancy_r, 3),
+            "expectancy_profit": round(self.net_profit / total, 2),
+            "profit_factor": profit_factor,
+            "max_drawdown_r": round(self.max_dd, 2),
+        }
+
+
+# Các section của /stats/dashboard -> group key (nếu là grouped stats)
+DASHBOARD_SECTIONS = (
+    "overview",
+    "equity_curve",
+    "by_setup",
+    "by_session",
+    "by_timeframe",
+    "by_grade",
+    "monthly_pnl",
+    "mistakes",
+)
+
+_DASHBOARD_GROUP_KEYS = {
+    "by_setup": "setup",
+    "by_session": "session",
+    "by_timeframe": "timeframe",
+    "by_grade": "grade",
+}
+
+
+def _trade_sort_key(t: Dict[str, Any]):
+    return ((t.get("date") or ""), t.get("id") or 0)
+
+
+def _grouped_result(groups: Dict[Any, StatsAccumulator]) -> List[Dict[str, Any]]:
+    """Format output giống compute_grouped_stats (sort theo net_r giảm dần)."""
+    result = [
+        {"key": key, "label": key, "stats": acc.to_dict()}
+        for key, acc in groups.items()
+    ]
+    result.sort(key=lambda g: g["stats"].get("net_r", 0.0), reverse=True)
+    return result
+
+
+def compute_dashboard_stats(
+    trades: List[Dict[str, Any]],
+    sections: Optional[Iterable[str]] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    """
+    Tính tất cả section của Dashboard trong 1 lần duyệt trades.
+
+    Output (chỉ gồm các section được chọn, mặc định là tất cả):
+      {
+        "overview": {... compute_overview_stats ...},
+        "equity_curve": [... compute_equity_curve ...],
+        "by_setup" / "by_session" / "by_timeframe" / "by_grade": [... compute_grouped_stats ...],
+        "monthly_pnl": [... compute_monthly_pnl ...],
+        "mistakes": {... compute_mistakes_counts ...},
+      }
+    """
+    wanted = set(DASHBOARD_SECTIONS if sections is None else sections)
+
+    want_overview = "overview" in wanted
+    want_curve = "equity_curve" in wanted
+    want_monthly = "monthly_pnl" in wanted
+    want_mistakes = "mistakes" in wanted
+    group_keys = [(s, k) for s, k in _DASHBOARD_GROUP_KEYS.items() if s in wanted]
+
+    overall = StatsAccumulator()
+    curve = []
+    groups = {section: {} for section, _ in group_keys}
+    monthly = {}
+    mistakes = {}
+
+    # trades từ DB đã ORDER BY date, id -> sort lại gần như O(n), chỉ để chắc chắn
+    for t in sorted(trades, key=_trade_sort_key):
+        profit_raw = t.get("profit")
+
+        if want_monthly:
+            date_str = t.get("date")
+            if date_str:
+                month_key = str(date_str)[:7]
+                monthly[month_key] = monthly.get(month_key, 0.0) + _safe_float(profit_raw, 0.0)
+
+        if want_mistakes:
+            for label in _iter_mistakes(t.get("mistakes")):
+                mistakes[label] = mistakes.get(label, 0) + 1
+
+        # Nhóm được tạo kể cả khi lệnh chưa đóng (giống compute_grouped_stats)
+        group_accs = [
+            groups[section].setdefault(t.get(key) or "UNKNOWN", StatsAccumulator())
+            for section, key in group_keys
+        ]
+
+        if profit_raw is None:
+            continue
+
+        r = compute_r_multiple(t, risk_percent)
+        profit = _safe_float(profit_raw, 0.0)
+        pct = _safe_float(t.get("profit_pct"), 0.0)
+
+        equity = overall.add(r, profit, pct)
+        for acc in group_accs:
+            acc.add(r, profit, pct)
+
+        if want_curve:
+            curve.append({
+                "id": t["id"],
+                "date": t.get("date"),
+                "symbol": t.get("symbol"),
+                "r": round(r, 2),
+                "equity_r": equity,
+            })
+
+    result = {}
+    if want_overview:
+        result["overview"] = overall.to_dict()
+    if want_curve:
+        result["equity_curve"] = curve
+    for section, _ in group_keys:
+        result[section] = _grouped_result(groups[section])
+    if want_monthly:
+        result["monthly_pnl"] = sorted(
+            ({"month": month, "profit": round(pnl, 2)} for month, pnl in monthly.items()),
+            key=lambda x: x["month"],
+        )
+    if want_mistakes:
+        result["mistakes"] = mistakes
+    return result
+
+
+# === PIVOT (NHIỀU CHIỀU) ===
+PIVOT_DIMENSIONS = ("setup", "session", "timeframe", "grade", "symbol", "direction", "month")
+PIVOT_MAX_DIMS = 3
+
+
+def pivot_subsets(dims) -> List[tuple]:
+    """Mọi tổ hợp con khác rỗng của dims (giữ thứ tự), tổ hợp đầy đủ ở cuối."""
+    return [c for k in range(1, len(dims) + 1) for c in combinations(dims, k)]
+
+
+def _pivot_value(t: Dict[str, Any], dim: str):
+    if dim == "month":
+        date = t.get("date")
+        return str(date)[:7] if date else "UNKNOWN"
+    return t.get(dim) or "UNKNOWN"
+
+
+def _pivot_sort_value(value):
+    # profit_factor = None nghĩa là không có lệnh thua (vô cực)
+    return float("inf") if value is None else value
+
+
+def _pivot_result(
+    dims,
+    cells: Dict[tuple, Dict[tuple, StatsAccumulator]],
+    total: StatsAccumulator,
+    sort: str = "net_r",
+    descending: bool = True,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Output của compute_pivot_stats:
+      {
+        "dims": [...], "sort": ..., "order": "desc" | "asc",
+        "total": {... overview ...},
+        "cells": [ { "key": {dim: value, ...}, "stats": {...} }, ... ],   # đủ mọi chiều
+        "margins": { "setup": [...], "setup,session": [...], ... },       # tổng theo tổ hợp con
+      }
+    Mỗi list được sort theo stats[sort] rồi cắt limit (nếu có).
+    """
+    def rows(subset):
+        out = [
+            {"key": dict(zip(subset, key)), "stats": acc.to_dict()}
+            for key, acc in cells[subset].items()
+        ]
+        out.sort(key=lambda c: _pivot_sort_value(c["stats"].get(sort)), reverse=descending)
+        return out[:limit] if limit else out
+
+    subsets = pivot_subsets(dims)
+    return {
+        "dims": list(dims),
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "total": total.to_dict(),
+        "cells": rows(subsets[-1]),
+        "margins": {",".join(s): rows(s) for s in subsets[:-1]},
+    }
+
+
+def compute_pivot_stats(
+    trades: List[Dict[str, Any]],
+    dims: Iterable[str],
+    sort: str = "net_r",
+    descending: bool = True,
+    limit: Optional[int] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    """
+    Stats cho mọi ô của bảng pivot theo dims (vd: setup x session x direction)
+    và mọi tổng biên (từng chiều, từng cặp...) trong 1 lần duyệt trades.
+    dims: tối đa PIVOT_MAX_DIMS chiều trong PIVOT_DIMENSIONS; "month" = YYYY-MM.
+    """
+    dims = tuple(dims)
+    subsets = pivot_subsets(dims)
+    cells = {s: {} for s in subsets}
+    total = StatsAccumulator()
+
+    for t in sorted(trades, key=_trade_sort_key):
+        values = {d: _pivot_value(t, d) for d in dims}
+        # Ô được tạo kể cả khi lệnh chưa đóng (giống compute_grouped_stats)
+        accs = [
+            cells[s].setdefault(tuple(values[d] for d in s), StatsAccumulator())
+            for s in subsets
+        ]
+
+        profit_raw = t.get("profit")
+        if profit_raw is None:
+            continue
+
+        r = compute_r_multiple(t, risk_percent)
+        profit = _safe_float(profit_raw, 0.0)
+        pct = _safe_float(t.get("profit_pct"), 0.0)
+        total.add(r, profit, pct)
+        for acc in accs:
+            acc.add(r, profit, pct)
+
+    return _pivot_result(dims, cells, total, sort, descending, limit)
+
+
+# === ROLLING (CỬA SỔ TRƯỢT) ===
+ROLLING_UNITS = ("trades", "days")
+ROLLING_GROUP_KEYS = ("setup", "session", "timeframe", "grade", "symbol", "direction")
+
+
+def _dd_merge(a, b):
+    """Gộp (max, min, max_dd) của 2 đoạn equity liên tiếp (a trước b)."""
+    return (
+        max(a[0], b[0]),
+        min(a[1], b[1]),
+        max(a[2], b[2], a[0] - b[1]),
+    )
+
+
+class RollingAccumulator:
+    """
+    Chỉ số của N lệnh gần nhất (unit="trades") hoặc N ngày gần nhất (unit="days"),
+    cập nhật O(1) khấu hao mỗi lệnh thay vì tính lại cả cửa sổ.
+
+    - Tổng (wins, net_r, gross_profit...) cộng khi thêm, trừ khi lệnh rời cửa sổ.
+    - Max drawdown trong cửa sổ: hàng đợi 2 stack, mỗi phần tử giữ (max, min,
+      max_dd) của đoạn equity tới nó -> lấy/gộp O(1) khi cửa sổ trượt.
+      Đỉnh của cửa sổ giữ bằng deque đơn điệu (giảm dần) để ra drawdown hiện tại.
+    - Equity là cumsum R đã round như compute_equity_curve.
+    """
+
+    __slots__ = (
+        "window", "unit", "entries", "cum_r", "seq",
+        "wins", "losses", "net_r", "sum_win_r", "sum_loss_r",
+        "gross_profit", "gross_loss", "_peaks", "_front", "_back",
+    )
+
+    def __init__(self, window: int, unit: str = "trades"):
+        self.window = window
+        self.unit = unit
+        self.entries = deque()  # (day, r, profit)
+        self.cum_r = 0.0
+        self.seq = 0
+        self.wins = 0
+        self.losses = 0
+        self.net_r = 0.0
+        self.sum_win_r = 0.0
+        self.sum_loss_r = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self._peaks = deque()  # (seq, equity), equity giảm dần
+        self._front = []       # phần tử cũ nhất ở cuối list, agg = (nó .. đáy stack)
+        self._back = []        # phần tử mới nhất ở cuối list, agg = (đáy stack .. nó)
+
+    def _apply(self, r: float, profit: float, sign: int):
+        if r > 0:
+            self.wins += sign
+            self.sum_win_r += sign * r
+        elif r < 0:
+            self.losses += sign
+            self.sum_loss_r += sign * r
+        self.net_r += sign * r
+        if profit > 0:
+            self.gross_profit += sign * profit
+        elif profit < 0:
+            self.gross_loss += sign * profit
+
+    def _pop_oldest(self):
+        day, r, profit = self.entries.popleft()
+        self._apply(r, profit, -1)
+
+        if not self._front:
+            agg = None
+            while self._back:
+                equity, _ = self._back.pop()
+                single = (equity, equity, 0.0)
+                agg = single if agg is None else _dd_merge(single, agg)
+                self._front.append((equity, agg))
+        self._front.pop()
+
+        if self._peaks and self._peaks[0][0] <= self.seq - len(self.entries):
+            self._peaks.popleft()
+
+    def add(self, day: Optional[int], r: float, profit: float):
+        """Thêm 1 lệnh đã đóng (theo thứ tự thời gian), bỏ các lệnh ra khỏi cửa sổ."""
+        if self.unit == "days":
+            while self.entries and self.entries[0][0] <= day - self.window:
+                self._pop_oldest()
+        elif len(self.entries) >= self.window:
+            self._pop_oldest()
+
+        self.entries.append((day, r, profit))
+        self._apply(r, profit, 1)
+
+        self.seq += 1
+        self.cum_r += r
+        equity = round(self.cum_r, 2)
+        while self._peaks and self._peaks[-1][1] <= equity:
+            self._peaks.pop()
+        self._peaks.append((self.seq, equity))
+
+        single = (equity, equity, 0.0)
+        self._back.append((equity, _dd_merge(self._back[-1][1], single) if self._back else single))
+
+    def _drawdown_agg(self):
+        if self._front and self._back:
+            return _dd_merge(self._front[-1][1], self._back[-1][1])
+        return (self._front or self._back)[-1][1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = len(self.entries)
+        p_win = self.wins / total
+        p_loss = self.losses / total
+        avg_win_r = self.sum_win_r / self.wins if self.wins > 0 else 0.0
+        avg_loss_r = abs(self.sum_loss_r) / self.losses if self.losses > 0 else 0.0
+
+        gross_loss = abs(self.gross_loss)
+        if gross_loss > 1e-9:
+            profit_factor = round(self.gross_profit / gross_loss, 2)
+        elif self.gross_profit > 1e-9:
+            profit_factor = None
+        else:
+            profit_factor = 0.0
+
+        current = round(self.cum_r, 2)
+        return {
+            "trades": total,
+            "winrate": round(p_win * 100, 2),
+            "net_r": round(self.net_r, 2),
+            "avg_r": round(self.net_r / total, 2),
+            "expectancy_r": round(p_win * avg_win_r - p_loss * avg_loss_r, 3),
+            "profit_factor": profit_factor,
+            "drawdown_r": round(self._peaks[0][1] - current, 2),
+            "max_drawdown_r": round(self._drawdown_agg()[2], 2),
+        }
+
+
+def _day_number(value) -> Optional[int]:
+    """'YYYY-MM-DD...' -> số ngày (date.toordinal), None nếu không đọc được."""
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def _rolling_result(
+    rows: Iterable[tuple],
+    window: int,
+    unit: str = "trades",
+    group_key: Optional[str] = None,
+    min_trades: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    rows: (group, id, date, r, profit) của lệnh đã đóng theo thứ tự (date, id).
+    Mỗi lệnh cho 1 điểm của series thuộc nhóm của nó (khi cửa sổ có >= min_trades lệnh).
+    unit="days": lệnh không có date hợp lệ bị bỏ qua.
+    """
+    if min_trades is None:
+        min_trades = window if unit == "trades" else 1
+
+    windows = {}
+    series = {}
+    for group, tid, date_str, r, profit in rows:
+        day = None
+        if unit == "days":
+            day = _day_number(date_str)
+            if day is None:
+                continue
+        acc = windows.get(group)
+        if acc is None:
+            acc = windows[group] = RollingAccumulator(window, unit)
+            series[group] = []
+        acc.add(day, r, profit)
+        if len(acc.entries) >= min_trades:
+            series[group].append({"id": tid, "date": date_str, **acc.to_dict()})
+
+    return {
+        "window": window,
+        "unit": unit,
+        "group_by": group_key,
+        "min_trades": min_trades,
+        "series": [{"key": key, "points": points} for key, points in series.items()],
+    }
+
+
+def compute_rolling_stats(
+    trades: List[Dict[str, Any]],
+    window: int,
+    unit: str = "trades",
+    group_key: Optional[str] = None,
+    min_trades: Optional[int] = None,
+    risk_percent: float = RISK_PERCENT_DEFAULT,
+) -> Dict[str, Any]:
+    """
+    Winrate / expectancy / profit factor / avg R / drawdown trên cửa sổ trượt
+    (N lệnh hoặc N ngày gần nhất) trong 1 lần duyệt, theo từng nhóm nếu có
+    group_key (vd: setup) để thấy edge suy giảm.
+
+    Output:
+      {
+        "window": 50, "unit": "trades", "group_by": "setup", "min_trades": 50,
+        "series": [
+          { "key": "OB", "points": [ { "id", "date", "trades", "winrate", "net_r", "avg_r",
+                                       "expectancy_r", "profit_factor", "drawdown_r",
+                                       "max_drawdown_r" }, ... ] },
+          ...
+        ]
+      }
+    """
+    rows = (
+        (
+            (t.get(group_key) or "UNKNOWN") if group_key else "ALL",
+            t["id"],
+            t.get("date"),
+            compute_r_multiple(t, risk_percent),
+            _safe_float(t.get("profit"), 0.0),
+        )
+        for t in sorted(trades, key=_trade_sort_key)
+        if t.get("profit") is not None
+    )
+    return _rolling_result(rows, window, unit, group_key, min_trades)
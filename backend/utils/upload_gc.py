@@ -0,0 +1,158 @@
+# utils/upload_gc.py
+"""
+Dọn file upload mồ côi: file trong UPLOAD_FOLDER không còn trade nào tham
+chiếu qua chart_before / chart_after (insert lỗi, chart bị thay...).
+
+- Duyệt kho theo từng batch, tra refcount trong bảng uploads, rồi đối chiếu lại
+  trực tiếp với trades trước khi xóa (phòng refcount lệch).
+- Bỏ qua file mới hơn UPLOAD_GC_GRACE_SECONDS: add_trade lưu file trước rồi mới
+  INSERT trade.
+- Bản WebP phái sinh bị xóa cùng file gốc (hoặc khi file gốc không còn).
+- File tạm (*.part) cũ hơn grace cũng bị xóa.
+"""
+import os
+import threading
+import time
+from itertools import islice
+
+from config import (
+    UPLOAD_GC_BATCH_SIZE,
+    UPLOAD_GC_GRACE_SECONDS,
+    UPLOAD_GC_INTERVAL_SECONDS,
+)
+from db import get_connection, close_connection
+from models.uploads import CHART_COLUMNS
+from utils.files import allowed_file
+from utils.images import split_derivative_name
+from utils.upload_store import TMP_DIR, iter_upload_names, upload_path
+
+
+def _referenced(conn, names):
+    """Tập tên (trong names) còn được trade tham chiếu: refcount, rồi xác nhận với trades."""
+    placeholders = ", ".join("?" for _ in names)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT name FROM uploads WHERE refcount > 0 AND name IN ({placeholders})",
+        tuple(names),
+    )
+    referenced = {row[0] for row in cur.fetchall()}
+
+    candidates = [n for n in names if n not in referenced]
+    if candidates:
+        placeholders = ", ".join("?" for _ in candidates)
+        union = " UNION ".join(
+            f"SELECT {c} FROM trades WHERE {c} IN ({placeholders})" for c in CHART_COLUMNS
+        )
+        cur.execute(union, tuple(candidates) * len(CHART_COLUMNS))
+        referenced.update(row[0] for row in cur.fetchall())
+    return referenced
+
+
+def _remove(path, dry_run):
+    """Xóa 1 file, trả về số bytes thu hồi (0 nếu không xóa được)."""
+    try:
+        size = os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        print(f"[UPLOAD GC] Cannot remove {path}: {e}")
+        return 0
+
+
+def _sweep_tmp(cutoff, dry_run, report):
+    if not os.path.isdir(TMP_DIR):
+        return
+    for name in os.listdir(TMP_DIR):
+        path = os.path.join(TMP_DIR, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+        except OSError:
+            continue
+        report["temp_files"] += 1
+        report["bytes_reclaimed"] += _remove(path, dry_run)
+
+
+def sweep_orphan_uploads(conn, grace_seconds=UPLOAD_GC_GRACE_SECONDS,
+                         batch_size=UPLOAD_GC_BATCH_SIZE, dry_run=False) -> dict:
+    """
+    Xóa file không còn được tham chiếu, trả về report:
+    scanned / orphans / derivatives / temp_files / bytes_reclaimed / dry_run.
+    """
+    cutoff = time.time() - grace_seconds
+    report = {
+        "scanned": 0,
+        "orphans": 0,
+        "derivatives": 0,
+        "temp_files": 0,
+        "bytes_reclaimed": 0,
+        "dry_run": dry_run,
+    }
+
+    names = (n for n in iter_upload_names() if allowed_file(n))
+    while True:
+        batch = list(islice(names, batch_size))
+        if not batch:
+            break
+        report["scanned"] += len(batch)
+
+        # file gốc của từng file (bản phái sinh -> file gốc tương ứng)
+        originals = {name: split_derivative_name(name)[0] for name in batch}
+        referenced = _referenced(conn, sorted(set(originals.values())))
+
+        released = []
+        for name, original in originals.items():
+            if original in referenced:
+                continue
+            path = upload_path(name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except OSError:
+                continue
+            if name == original:
+                report["orphans"] += 1
+                released.append(name)
+            else:
+                report["derivatives"] += 1
+            report["bytes_reclaimed"] += _remove(path, dry_run)
+
+        if released and not dry_run:
+            cur = conn.cursor()
+            cur.executemany(
+                "DELETE FROM uploads WHERE name = ? AND refcount <= 0",
+                [(n,) for n in released],
+            )
+            conn.commit()
+
+    _sweep_tmp(cutoff, dry_run, report)
+    return report
+
+
+# === CHẠY ĐỊNH KỲ TRONG APP (UPLOAD_GC_INTERVAL_SECONDS) ===
+def _run_scheduled(interval):
+    try:
+        report = sweep_orphan_uploads(get_connection())
+        print(f"[UPLOAD GC] {report}")
+    except Exception as e:
+        print(f"[UPLOAD GC] Sweep failed: {e}")
+    finally:
+        close_connection()
+        _schedule(interval)
+
+
+def _schedule(interval):
+    timer = threading.Timer(interval, _run_scheduled, args=(interval,))
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def start_gc_scheduler(interval=UPLOAD_GC_INTERVAL_SECONDS):
+    """Bật sweep định kỳ trên thread nền (None / 0 = tắt). Cron: `flask --app app uploads-gc`."""
+    if not interval:
+        return None
+    return _schedule(interval)
@@ -0,0 +1,77 @@
+# utils/upload_migrate.py
+"""
+Chuyển file upload cũ (uuid.ext nằm phẳng trong UPLOAD_FOLDER) sang kho
+theo nội dung (utils/upload_store.py) và đổi tên trong trades.
+
+Thứ tự an toàn khi bị ngắt giữa chừng (chạy lại được):
+  1. copy file vào kho (file cũ vẫn còn)
+  2. UPDATE chart_before / chart_after trong 1 transaction (trigger chỉnh refcount)
+  3. sau commit mới xóa file cũ; bản WebP cũ được đổi tên theo file mới
+"""
+import os
+
+from config import UPLOAD_FOLDER, IMAGE_DERIVATIVES
+from models.uploads import CHART_COLUMNS
+from utils.files import allowed_file
+from utils.images import derivative_name, is_derivative
+from utils.upload_store import import_flat_file, is_content_addressed, upload_path
+
+
+def iter_flat_uploads():
+    """Tên các file gốc dạng cũ (không tính bản WebP phái sinh)."""
+    for name in sorted(os.listdir(UPLOAD_FOLDER)):
+        if not os.path.isfile(os.path.join(UPLOAD_FOLDER, name)):
+            continue
+        if is_content_addressed(name) or is_derivative(name) or not allowed_file(name):
+            continue
+        yield name
+
+
+def _move_derivatives(old, new):
+    for size in IMAGE_DERIVATIVES:
+        src = os.path.join(UPLOAD_FOLDER, derivative_name(old, size))
+        if not os.path.exists(src):
+            continue
+        dst = upload_path(derivative_name(new, size))
+        if os.path.exists(dst):
+            os.remove(src)
+        else:
+            os.replace(src, dst)
+
+
+def migrate_flat_uploads(conn) -> dict:
+    """Trả về {"files": số file cũ, "deduplicated": số file trùng nội dung, "references": số trade đã đổi}."""
+    mapping = {}
+    for name in iter_flat_uploads():
+        ext = name.rsplit(".", 1)[1].lower()
+        mapping[name] = import_flat_file(os.path.join(UPLOAD_FOLDER, name), ext)
+
+    references = 0
+    if mapping:
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for column in CHART_COLUMNS:
+                cur.executemany(
+                    f"UPDATE trades SET {column} = ? WHERE {column} = ?",
+                    [(new, old) for old, new in mapping.items()],
+                )
+                references += cur.rowcount
+            cur.executemany(
+                "DELETE FROM uploads WHERE name = ? AND refcount <= 0",
+                [(old,) for old in mapping],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    for old, new in mapping.items():
+        _move_derivatives(old, new)
+        os.remove(os.path.join(UPLOAD_FOLDER, old))
+
+    return {
+        "files": len(mapping),
+        "deduplicated": len(mapping) - len(set(mapping.values())),
+        "references": references,
+    }
@@ -0,0 +1,187 @@
+# utils/upload_store.py
+"""
+Kho file upload theo nội dung (content-addressed), chia thư mục con.
+
+- Tên file = sha256(nội dung) + đuôi, vd: 3fa9...c1.png, lưu tại
+      UPLOAD_FOLDER/3f/a9/3fa9...c1.png
+  -> cùng 1 ảnh upload nhiều lần chỉ lưu 1 bản; mỗi thư mục con ít file.
+- Giới hạn mỗi file (UPLOAD_MAX_FILE_BYTES) được kiểm tra ngay khi Werkzeug
+  parse multipart (UploadRequest: part vượt giới hạn -> 413, phần còn lại
+  không bị spool); giới hạn cả request: MAX_CONTENT_LENGTH.
+- Ghi dạng stream: đọc từng chunk, vừa hash vừa ghi ra file tạm (kiểm tra lại
+  giới hạn cho stream không qua form).
+- DB chỉ lưu tên file (không có thư mục), route /api/uploads/<filename> không đổi.
+- File cũ dạng phẳng (uuid.ext trong UPLOAD_FOLDER) vẫn đọc được cho tới khi
+  chạy `flask --app app uploads-migrate`.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import UPLOAD_FOLDER, UPLOAD_CHUNK_SIZE, UPLOAD_MAX_FILE_BYTES
+
+_HASH_NAME_RE = re.compile(r"^[0-9a-f]{64}\.")
+TMP_DIR = os.path.join(UPLOAD_FOLDER, "tmp")
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """File vượt UPLOAD_MAX_FILE_BYTES -> HTTP 413."""
+
+
+class _LimitedSpooledFile(tempfile.SpooledTemporaryFile):
+    """File chứa 1 part upload khi parse form: ghi quá max_bytes -> UploadTooLarge."""
+
+    def __init__(self, max_bytes, spool_bytes):
+        super().__init__(max_size=spool_bytes)
+        self._max_bytes = max_bytes
+        self._written = 0
+
+    def write(self, data):
+        self._written += len(data)
+        if self._written > self._max_bytes:
+            raise UploadTooLarge(f"File exceeds {self._max_bytes} bytes")
+        return super().write(data)
+
+
+class UploadRequest(Request):
+    """
+    Request class của app: mỗi file trong multipart bị giới hạn
+    UPLOAD_MAX_FILE_BYTES ngay lúc parse, trước khi cả part được spool.
+    """
+
+    # Part nhỏ hơn giữ trong RAM, lớn hơn ghi ra file tạm (như Werkzeug mặc định)
+    upload_spool_bytes = 500 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if UPLOAD_MAX_FILE_BYTES and content_length is not None and content_length > UPLOAD_MAX_FILE_BYTES:
+            raise UploadTooLarge(f"File exceeds {UPLOAD_MAX_FILE_BYTES} bytes")
+        if not UPLOAD_MAX_FILE_BYTES:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return _LimitedSpooledFile(UPLOAD_MAX_FILE_BYTES, self.upload_spool_bytes)
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(_HASH_NAME_RE.match(name))
+
+
+def upload_relpath(name: str) -> str:
+    """Đường dẫn tương đối trong UPLOAD_FOLDER (file cũ dạng phẳng giữ nguyên)."""
+    if is_content_addressed(name):
+        return f"{name[0:2]}/{name[2:4]}/{name}"
+    return name
+
+
+def upload_path(name: str) -> str:
+    return os.path.join(UPLOAD_FOLDER, *upload_relpath(name).split("/"))
+
+
+def iter_upload_names():
+    """Tên mọi file trong kho (cả dạng phẳng cũ lẫn thư mục con), bỏ qua file tạm."""
+    for root, dirs, files in os.walk(UPLOAD_FOLDER):
+        if root == UPLOAD_FOLDER:
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != TMP_DIR]
+        for name in files:
+            yield name
+
+
+def _place(tmp_path, name):
+    """
+    Đưa file tạm vào kho; đã có bản giống hệt thì bỏ file tạm.
+    Bản có sẵn được cập nhật mtime: GC (utils/upload_gc.py) tính thời gian ân
+    hạn theo mtime, bản cũ đang mồ côi không bị xóa trước khi trade kịp INSERT.
+    """
+    dst = upload_path(name)
+    try:
+        os.utime(dst)
+    except FileNotFoundError:
+        pass  # chưa có (hoặc GC vừa xóa) -> ghi bản mới
+    else:
+        os.remove(tmp_path)
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(tmp_path, dst)
+
+
+def store_stream(stream, ext: str, max_bytes: int = UPLOAD_MAX_FILE_BYTES) -> str:
+    """
+    Ghi stream vào kho, trả về tên file (sha256.ext).
+    Raise UploadTooLarge nếu vượt max_bytes (file tạm bị xóa).
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        name = f"{digest.hexdigest()}.{ext}"
+        _place(tmp_path, name)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def import_flat_file(path: str, ext: str) -> str:
+    """
+    Copy 1 file cũ (dạng phẳng) vào kho, trả về tên mới. File gốc được giữ lại
+    để DB vẫn hợp lệ tới khi commit xong; người gọi xóa sau.
+    """
+    name = f"{hash_file(path)}.{ext}"
+    dst = upload_path(name)
+    if not os.path.exists(dst):
+        os.makedirs(TMP_DIR, exist_ok=True)
+        tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+        shutil.copy2(path, tmp_path)
+        _place(tmp_path, name)
+    return name
+
+
+def remove_upload_file(name: str) -> bool:
+    try:
+        os.remove(upload_path(name))
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"[UPLOADS] Cannot remove {name}: {e}")
+        return False
+
+
+def release_upload(conn, name) -> bool:
+    """
+    Gọi sau khi commit thao tác bỏ tham chiếu tới file (xóa trade / chart).
+    Refcount về 0 -> xóa record + file; trả về True nếu file đã bị xóa.
+    """
+    if not name:
+        return False
+    cur = conn.cursor()
+    cur.execute("DELETE FROM uploads WHERE name = ? AND refcount <= 0", (name,))
+    released = cur.rowcount == 1
+    conn.commit()
+    if not released:
+        return False
+    return remove_upload_file(name)
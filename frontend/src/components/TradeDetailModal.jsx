@@ -236,9 +236,14 @@ export default function TradeDetailModal({
                   className="block"
                 >
                   <img
-                    src={`${API_BASE_URL}/api/uploads/${encodeURIComponent(
-                      trade.chart_before
-                    )}`}
+                    src={
+                      trade.chart_before_urls?.medium
+                        ? `${API_BASE_URL}${trade.chart_before_urls.medium}`
+                        : `${API_BASE_URL}/api/uploads/${encodeURIComponent(
+                            trade.chart_before
+                          )}`
+                    }
+                    loading="lazy"
                     alt="Before"
                     className="w-full max-h-52 object-contain rounded-lg shadow-md hover:shadow-lg transition"
                   />
@@ -259,9 +264,14 @@ export default function TradeDetailModal({
                   className="block"
                 >
                   <img
-                    src={`${API_BASE_URL}/api/uploads/${encodeURIComponent(
-                      trade.chart_after
-                    )}`}
+                    src={
+                      trade.chart_after_urls?.medium
+                        ? `${API_BASE_URL}${trade.chart_after_urls.medium}`
+                        : `${API_BASE_URL}/api/uploads/${encodeURIComponent(
+                            trade.chart_after
+                          )}`
+                    }
+                    loading="lazy"
                     alt="After"
                     className="w-full max-h-52 object-contain rounded-lg shadow-md hover:shadow-lg transition"
                   />
@@ -35,65 +35,25 @@ export default function useDashboardStats(timeFilter, extraFilters = {}) {
       setLoading(true);
       setError(null);
       try {
-        const [
-          overviewRes,
-          equityRes,
-          setupRes,
-          sessionRes,
-          tfRes,
-          monthlyRes,
-          mistakesRes,
-          gradeRes,
-        ] = await Promise.all([
-          fetch(`${API_BASE_URL}/api/stats/overview${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/equity-curve${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/by-setup${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/by-session${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/by-timeframe${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/monthly-pnl${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/mistakes${query}`, {
-            signal: controller.signal,
-          }),
-          fetch(`${API_BASE_URL}/api/stats/by-grade${query}`, {
-            signal: controller.signal,
-          }),
-        ]);
+        // 1 request duy nhất: backend query + tính toàn bộ stats trong 1 lần duyệt
+        const res = await fetch(`${API_BASE_URL}/api/stats/dashboard${query}`, {
+          signal: controller.signal,
+        });
 
-        if (!overviewRes.ok) {
+        if (!res.ok) {
           throw new Error("Failed to load overview stats");
         }
 
-        const [
-          overviewData,
-          equityData,
-          setupData,
-          sessionData,
-          tfData,
-          monthlyData,
-          mistakesData,
-          gradeData,
-        ] = await Promise.all([
-          overviewRes.json(),
-          equityRes.json(),
-          setupRes.json(),
-          sessionRes.json(),
-          tfRes.json(),
-          monthlyRes.json(),
-          mistakesRes.json(),
-          gradeRes.json(),
-        ]);
+        const {
+          overview: overviewData,
+          equity_curve: equityData,
+          by_setup: setupData,
+          by_session: sessionData,
+          by_timeframe: tfData,
+          monthly_pnl: monthlyData,
+          mistakes: mistakesData,
+          by_grade: gradeData,
+        } = await res.json();
 
         setOverview(overviewData);
         setEquityCurve(equityData || []);
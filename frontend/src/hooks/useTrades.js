@@ -1,14 +1,19 @@
 import { useEffect, useState } from "react";
 import { API_BASE_URL } from "../config/api";
 
-export default function useTrades() {
+/**
+ * Lấy toàn bộ trades.
+ * - fields (tùy chọn): "symbol,setup,..." -> backend chỉ trả về các cột này
+ */
+export default function useTrades({ fields } = {}) {
   const [trades, setTrades] = useState([]);
 
   useEffect(() => {
-    fetch(`${API_BASE_URL}/api/trades`)
+    const query = fields ? `?fields=${encodeURIComponent(fields)}` : "";
+    fetch(`${API_BASE_URL}/api/trades${query}`)
       .then(r => r.json())
       .then(setTrades);
-  }, []);
+  }, [fields]);
 
   return trades;
-}
\ No newline at end of file
+}
@@ -27,8 +27,8 @@ export default function Dashboard({ theme = "dark" }) {
   const [sessionFilter, setSessionFilter] = useState("All");
   const [timeframeFilter, setTimeframeFilter] = useState("All");
 
-  // Dùng toàn bộ trades để lấy list value cho dropdown
-  const allTrades = useTrades();
+  // Dùng toàn bộ trades để lấy list value cho dropdown (chỉ cần 4 cột)
+  const allTrades = useTrades({ fields: "symbol,setup,session,timeframe" });
 
   // Tất cả stats chính lấy từ backend (đã filter theo thời gian + advanced filters)
   const {
@@ -74,7 +74,10 @@ export default function PlaybookPage({ theme = "dark" }) {
     const fetchTrades = async () => {
       try {
         setLoadingTrades(true);
-        const res = await fetch(`${API_BASE_URL}/api/trades`);
+        // Chỉ lấy các cột dùng cho thống kê / list trades của setup
+        const res = await fetch(
+          `${API_BASE_URL}/api/trades?fields=id,date,symbol,setup,direction,rr,profit`
+        );
         const data = await res.json();
         setTrades(Array.isArray(data) ? data : []);
       } catch (err) {